@@ -1,11 +1,17 @@
-import csv
 from pathlib import Path
+from time import monotonic
 
+import numpy as np
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from bus_info_per_train_station_table.models import BusInfo
+from imports.ingest import read_csv_frame
+from imports.manifest import previous_import, record_import, skip_message, source_fingerprint
+from imports.profiling import ProfiledCommandMixin, add_profile_arguments
+from shiluvim.sheet_cache import read_excel_cached
+from stations.lookup import StationResolver
 
 
 REQUIRED_COLUMNS = (
@@ -54,7 +60,10 @@ REQUIRED_TEXT_FIELDS = ("train_station_name", "operator", "bus_station_name")
 OPTIONAL_TEXT_FIELDS = ("alternative", "line_type", "start_stopcode", "end_stopcode", "week_period", "bus_direction")
 
 
-class Command(BaseCommand):
+MANIFEST_COMMAND = "import_bus_info_per_train_station"
+
+
+class Command(ProfiledCommandMixin, BaseCommand):
     help = (
         "Import rows into bus_info_per_train_station_table_businfo "
         "from CSV/XLSX using deduplicating insert semantics."
@@ -76,8 +85,19 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Reserved for future bulk operations; currently used for progress reporting only.",
+            help="Number of rows inserted per bulk operation (also the progress reporting interval).",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Re-parse XLSX input instead of loading it from SHEET_CACHE_DIR.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-import the file even if the import manifest shows it unchanged.",
         )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
         source_path = Path(options["file"]).expanduser()
@@ -90,25 +110,34 @@ class Command(BaseCommand):
         if not source_path.exists():
             raise CommandError(f"Source file not found: {source_path}")
 
-        rows = self._read_rows(source_path)
-        if not rows:
+        fingerprint = source_fingerprint(source_path)
+        if not options["force"]:
+            manifest = previous_import(MANIFEST_COMMAND, fingerprint)
+            if manifest is not None:
+                self.stdout.write(self.style.WARNING(skip_message(source_path, manifest)))
+                return
+        started = monotonic()
+        self.stations = StationResolver()
+
+        with self.profiler.phase("read") as phase:
+            df = self._read_frame(source_path, use_cache=not options["no_cache"])
+            phase.rows += len(df)
+        if df.empty:
             self.stdout.write(self.style.WARNING("No rows found. Nothing to import."))
             return
 
-        normalized_rows = []
-        for index, row in enumerate(rows, start=2):
-            try:
-                normalized_rows.append(self._normalize_row(row, index))
-            except CommandError:
-                if strict:
-                    raise
-                normalized_rows.append({"__invalid__": True, "__row_number__": index, "__raw__": row})
+        with self.profiler.phase("normalize") as phase:
+            df = self._validate_columns(df)
+            normalized_rows = self._normalize_frame(df, strict=strict)
+            phase.rows += len(normalized_rows)
 
-        if strict and not dry_run:
-            with transaction.atomic():
+        with self.profiler.phase("db write") as phase:
+            if strict and not dry_run:
+                with transaction.atomic():
+                    totals = self._process_rows(normalized_rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            else:
                 totals = self._process_rows(normalized_rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
-        else:
-            totals = self._process_rows(normalized_rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            phase.rows += totals["total_rows"]
 
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("Import completed."))
@@ -121,53 +150,28 @@ class Command(BaseCommand):
         if strict and totals["invalid"] > 0:
             raise CommandError("Import failed in --strict mode due to invalid rows.")
 
-    def _read_rows(self, source_path: Path):
+        if not dry_run:
+            record_import(MANIFEST_COMMAND, fingerprint, totals, monotonic() - started)
+
+    def _read_frame(self, source_path: Path, use_cache=True):
         suffix = source_path.suffix.lower()
         if suffix == ".csv":
-            with source_path.open("r", encoding="utf-8-sig", newline="") as fp:
-                reader = csv.DictReader(fp)
-                if reader.fieldnames is None:
-                    raise CommandError("CSV file is missing a header row.")
-                return list(reader)
+            try:
+                # Read every cell as text, exactly as csv.DictReader would hand it over.
+                return read_csv_frame(source_path, dtype=str, keep_default_na=False)
+            except pd.errors.EmptyDataError as exc:
+                raise CommandError("CSV file is missing a header row.") from exc
 
         if suffix in (".xlsx", ".xls"):
-            df = pd.read_excel(source_path)
-            return df.to_dict(orient="records")
+            return read_excel_cached(source_path, use_cache=use_cache)
 
         raise CommandError("Unsupported file extension. Use .csv, .xlsx, or .xls.")
 
-    def _normalize_keys(self, row):
-        normalized = {}
-        for key, value in row.items():
-            raw_key = str(key).strip()
-            canonical_key = COLUMN_ALIASES.get(raw_key, raw_key)
-            normalized[canonical_key] = value
-        return normalized
-
-    def _normalize_int(self, value, field_name, row_number):
-        try:
-            if value is None:
-                raise ValueError
-            text = str(value).strip()
-            if text == "":
-                raise ValueError
-            return int(float(text))
-        except (TypeError, ValueError) as exc:
-            raise CommandError(f"Row {row_number}: {field_name} must be a valid integer.") from exc
-
-    def _normalize_text(self, value):
-        if value is None:
-            return ""
-        text = str(value).strip()
-        if text.lower() == "nan":
-            return ""
-        return text
-
-    def _normalize_row(self, row, row_number):
-        row = self._normalize_keys(row)
-
-        missing = [name for name in REQUIRED_COLUMNS if name not in row]
-        extras = [name for name in row if name not in REQUIRED_COLUMNS]
+    def _validate_columns(self, df):
+        # The schema is checked once per file; every row shares the header.
+        columns = [COLUMN_ALIASES.get(str(name).strip(), str(name).strip()) for name in df.columns]
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        extras = [name for name in columns if name not in REQUIRED_COLUMNS]
         if missing or extras:
             details = []
             if missing:
@@ -175,26 +179,52 @@ class Command(BaseCommand):
             if extras:
                 details.append(f"unexpected columns: {', '.join(extras)}")
             raise CommandError(
-                f"Row {row_number}: source columns must match expected schema after alias mapping; "
-                + "; ".join(details)
+                "Source columns must match expected schema after alias mapping; " + "; ".join(details)
             )
+        df = df.copy()
+        df.columns = columns
+        return df
+
+    def _normalize_frame(self, df, strict):
+        columns = {}
+        errors = pd.Series("", index=df.index, dtype=object)
 
-        normalized = {}
         for field_name in INTEGER_FIELDS:
-            normalized[field_name] = self._normalize_int(row[field_name], field_name, row_number)
+            numbers = pd.to_numeric(self._text_column(df[field_name]), errors="coerce")
+            valid = np.isfinite(numbers.to_numpy(dtype=float, na_value=np.nan))
+            columns[field_name] = np.trunc(numbers.where(valid, 0)).astype("int64")
+            errors = errors.where((errors != "") | valid, f"{field_name} must be a valid integer.")
 
         for field_name in REQUIRED_TEXT_FIELDS:
-            normalized[field_name] = self._normalize_text(row[field_name])
-            if not normalized[field_name]:
-                raise CommandError(f"Row {row_number}: {field_name} cannot be blank.")
+            columns[field_name] = self._text_column(df[field_name])
+            blank = columns[field_name] == ""
+            errors = errors.where((errors != "") | ~blank, f"{field_name} cannot be blank.")
 
         for field_name in OPTIONAL_TEXT_FIELDS:
-            normalized[field_name] = self._normalize_text(row[field_name])
+            columns[field_name] = self._text_column(df[field_name])
+
+        fields = list(columns)
+        normalized_rows = []
+        for row_number, error, values in zip(
+            range(2, len(df) + 2), errors.tolist(), zip(*(columns[name].tolist() for name in fields))
+        ):
+            if error:
+                if strict:
+                    raise CommandError(f"Row {row_number}: {error}")
+                normalized_rows.append({"__invalid__": True, "__row_number__": row_number})
+                continue
+            normalized_rows.append(dict(zip(fields, values)))
+        return normalized_rows
 
-        return normalized
+    def _text_column(self, series):
+        text = series.where(series.notna(), "").astype(str).str.strip()
+        return text.where(text.str.lower() != "nan", "")
 
     def _process_rows(self, rows, dry_run, strict, batch_size):
         totals = {"total_rows": 0, "inserted": 0, "existing": 0, "invalid": 0}
+        # One snapshot of the file's stations replaces a get_or_create round trip per row.
+        existing = self._existing_rows(rows)
+        pending = []
 
         for row in rows:
             totals["total_rows"] += 1
@@ -204,30 +234,40 @@ class Command(BaseCommand):
                 if strict:
                     raise CommandError(f"Row {row['__row_number__']}: invalid data.")
             else:
-                try:
-                    created = self._insert_if_new(row, dry_run=dry_run)
-                    if created:
-                        totals["inserted"] += 1
-                    else:
-                        totals["existing"] += 1
-                except CommandError as exc:
-                    totals["invalid"] += 1
-                    if strict:
-                        raise
-                    self.stderr.write(self.style.WARNING(str(exc)))
-
+                key = tuple(row[name] for name in REQUIRED_COLUMNS)
+                if key in existing:
+                    totals["existing"] += 1
+                else:
+                    existing.add(key)
+                    pending.append(row)
+                    totals["inserted"] += 1
+
+            if len(pending) >= batch_size:
+                self._flush(pending, dry_run, batch_size)
+                pending = []
             if totals["total_rows"] % batch_size == 0:
-                self.stdout.write(
-                    f"Processed {totals['total_rows']} rows "
-                    f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
-                )
+                self._report_progress(totals)
+
+        if pending:
+            self._flush(pending, dry_run, batch_size)
 
         return totals
 
-    def _insert_if_new(self, payload, dry_run=False):
+    def _flush(self, payloads, dry_run, batch_size):
         if dry_run:
-            exists = BusInfo.objects.filter(**payload).exists()
-            return not exists
+            return
+        BusInfo.objects.bulk_create(
+            [BusInfo(**payload, **BusInfo.station_keys(payload, self.stations)) for payload in payloads],
+            batch_size=batch_size,
+        )
+
+    def _report_progress(self, totals):
+        self.stdout.write(
+            f"Processed {totals['total_rows']} rows "
+            f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
+        )
 
-        _, created = BusInfo.objects.get_or_create(**payload)
-        return created
+    def _existing_rows(self, rows):
+        valid = [p for p in rows if not p.get("__invalid__")]
+        queryset = BusInfo.objects.filter(train_station_name__in={p["train_station_name"] for p in valid})
+        return set(queryset.values_list(*REQUIRED_COLUMNS))
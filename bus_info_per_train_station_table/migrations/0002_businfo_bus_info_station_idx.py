@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info_per_train_station_table', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='businfo',
+            index=models.Index(fields=['train_station_name'], name='bus_info_station_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info_per_train_station_table', '0002_businfo_bus_info_station_idx'),
+        ('stations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='businfo',
+            name='bus_info_station_idx',
+        ),
+        migrations.AddField(
+            model_name='businfo',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddIndex(
+            model_name='businfo',
+            index=models.Index(fields=['station'], name='bus_info_station_idx'),
+        ),
+    ]
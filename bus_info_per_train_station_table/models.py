@@ -1,9 +1,14 @@
 # bus_info_per_train_station_table/models.py
 from django.db import models
 
+from stations.lookup import StationKeyMixin
+
+
+class BusInfo(StationKeyMixin, models.Model):
+    STATION_KEYS = (("station", "train_station_name", None),)
 
-class BusInfo(models.Model):
     train_station_name = models.CharField(max_length=255)
+    station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     operator = models.CharField(max_length=255)
     bus_code_name = models.IntegerField()
     bus_station_name = models.CharField(max_length=255)
@@ -17,5 +22,10 @@ class BusInfo(models.Model):
     week_period = models.CharField(max_length=255)
     bus_direction = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=("station",), name="bus_info_station_idx"),
+        ]
+
     def __str__(self):
         return f"{self.train_station_name} - line {self.line}"
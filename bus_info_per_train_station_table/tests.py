@@ -1,4 +1,5 @@
 import tempfile
+from io import StringIO
 from pathlib import Path
 
 import pandas as pd
@@ -110,3 +111,39 @@ class ImportBusInfoPerTrainStationCommandTests(TestCase):
         call_command("import_bus_info_per_train_station", "--file", str(xlsx_path))
 
         self.assertTrue(BusInfo.objects.filter(train_station_name="אשקלון", operator="אגד").exists())
+
+    def test_bulk_import_counts_in_file_duplicates_as_existing(self):
+        header = "train_station_name,operator,bus_code_name,bus_station_name,officelineid,line,direction,alternative,line_type,start_stopcode,end_stopcode,week_period,bus_direction\n"
+        csv_path = self._write_csv(
+            header
+            + "Lod,Afikim,1,Station E,10,1,1,,City,1,2,Weekday,North\n"
+            + "Lod,Afikim,1,Station E,10,1,1,,City,1,2,Weekday,North\n"
+            + "Lod,Afikim,2,Station F,11,2,1,,City,3,4,Weekday,South\n"
+            + "Lod,Afikim,x,Station G,12,3,1,,City,5,6,Weekday,East\n"
+        )
+        out = StringIO()
+
+        call_command("import_bus_info_per_train_station", "--file", str(csv_path), "--batch-size", "1", stdout=out)
+
+        self.assertEqual(BusInfo.objects.filter(train_station_name="Lod").count(), 2)
+        self.assertIn("Inserted: 2", out.getvalue())
+        self.assertIn("Existing (duplicate): 1", out.getvalue())
+        self.assertIn("Invalid: 1", out.getvalue())
+
+    def test_unexpected_column_fails_once_for_whole_file(self):
+        csv_path = self._write_csv(
+            "train_station_name,operator,bus_code_name,bus_station_name,officelineid,line,direction,alternative,line_type,start_stopcode,end_stopcode,week_period,bus_direction,notes\n"
+            "Ramla,Dan,11,Station H,3,4,1,,City,10,20,Weekday,East,x\n"
+            "Ramla,Dan,12,Station I,3,4,1,,City,10,20,Weekday,East,y\n"
+        )
+
+        with self.assertRaisesMessage(CommandError, "unexpected columns: notes"):
+            call_command("import_bus_info_per_train_station", "--file", str(csv_path))
+        self.assertFalse(BusInfo.objects.exists())
+
+
+class BusInfoIndexTests(TestCase):
+    def test_station_lookup_uses_station_index(self):
+        queryset = BusInfo.objects.filter(station_id__in=[1])
+
+        self.assertIn("bus_info_station_idx", queryset.explain())
@@ -1,7 +1,8 @@
 ﻿from django.contrib import admin
 
-from .models import ConvergenceBusToRail, ConvergenceRailToBus
+from .models import ConvergenceBusToRail, ConvergenceRailToBus, StationMonthSummary
 
 
 admin.site.register(ConvergenceBusToRail)
 admin.site.register(ConvergenceRailToBus)
+admin.site.register(StationMonthSummary)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from convergence.models import ConvergenceBusToRail
+from convergence.summary import build_month_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the tables derived from bus_to_rail rows: convergence_stationmonthsummary (read by "
+        "main_page) and convergence_convergencetrend (read by the trend charts)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild months of this year.")
+        parser.add_argument("--month", type=int, help="Only rebuild this month (1-12).")
+
+    def handle(self, *args, **options):
+        queryset = ConvergenceBusToRail.objects.exclude(year_month=None)
+        if options["year"] is not None:
+            queryset = queryset.filter(year_month__range=(options["year"] * 100 + 1, options["year"] * 100 + 12))
+        if options["month"] is not None:
+            queryset = queryset.filter(month=options["month"])
+
+        months = list(queryset.values_list("year_month", flat=True).distinct().order_by("year_month"))
+        summaries, trends = build_month_summaries(months)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Months rebuilt: {len(months)} ({summaries} station month rows, {trends} trend points)"
+        ))
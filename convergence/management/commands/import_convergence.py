@@ -1,12 +1,25 @@
-﻿from decimal import Decimal, InvalidOperation
+﻿from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from itertools import chain
 from pathlib import Path
+from time import monotonic
 
+import django
+import numpy as np
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Q
 from django.db.utils import DatabaseError, ProgrammingError
 
+from convergence import partitions
 from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus, RawBusData
+from convergence.summary import build_month_summaries
+from imports.ingest import SourceError, chunked, clean_text, open_csv, to_decimal, to_float, to_int, to_year_month
+from imports.manifest import previous_import, record_import, skip_message, source_fingerprint
+from imports.profiling import ProfiledCommandMixin, add_profile_arguments
+from shiluvim.sheet_cache import read_excel_sheets
+from stations.lookup import StationResolver
 
 
 SHEET_BUS_TO_RAIL = "bus_to_rail"
@@ -83,8 +96,67 @@ RAIL_LOOKUP_FIELDS = (
     "departure_time",
 )
 
+REQUIRED_TEXT_FIELDS = ("week_period", "train_station_name", "rail_direction")
+
+COMMON_FIELD_TYPES = {
+    "year": "int",
+    "month": "int",
+    "train_number": "int",
+    "operator": "text",
+    "train_station_code": "int",
+    "makat": "int",
+    "direction": "int",
+    "alternative": "text",
+    "departure_time": "text",
+    "avg_passengers_per_trip": "float",
+    "signage": "int",
+    "is_gold_train": "text",
+    "is_bus_on_time": "int",
+}
+
+BUS_TO_RAIL_FIELD_TYPES = {
+    "rishui_train_arrival_time": "text",
+    "train_ascending_amount": "int",
+    "arrival_time_to_station": "text",
+    "arrival_time_window": "text",
+    "minutes_gap_bus_to_rail": "float",
+    "recommended_minutes": "int",
+    "observations_count": "int",
+    "on_time_count": "int",
+    "on_time_percentage": "decimal",
+    "on_time_percentage_by_makat": "decimal",
+    "on_time_percentage_by_train": "decimal",
+    "on_time_percentage_by_train_station": "decimal",
+    "express_train": "text",
+    "duration_from_current_station_to_hashalom": "int",
+}
+
+RAIL_TO_BUS_FIELD_TYPES = {
+    "rishui_train_arrival_time": "text",
+    "train_descending_amount": "int",
+    "minutes_gap_rail_to_bus": "float",
+    "recommended_minutes": "int",
+    "duration_from_hashalom_to_current_station": "int",
+    "express_train": "text",
+}
+
+SHEET_SPECS = (
+    (SHEET_BUS_TO_RAIL, ConvergenceBusToRail, BUS_TO_RAIL_OPTIONAL, BUS_TO_RAIL_FIELD_TYPES, BUS_LOOKUP_FIELDS),
+    (SHEET_RAIL_TO_BUS, ConvergenceRailToBus, RAIL_TO_BUS_OPTIONAL, RAIL_TO_BUS_FIELD_TYPES, RAIL_LOOKUP_FIELDS),
+)
 
-class Command(BaseCommand):
+RAW_BUS_MODE_REPLACE = "replace"
+RAW_BUS_MODE_APPEND = "append"
+
+MANIFEST_COMMAND = "import_convergence"
+
+
+def _parse_file_in_worker(source_path, use_cache=True):
+    # Runs in a pool process: reads and normalizes only, never touches the DB connection.
+    return Command()._parse_file(source_path, use_cache=use_cache)
+
+
+class Command(ProfiledCommandMixin, BaseCommand):
     help = (
         "Import convergence rows from XLSX files into convergence_convergencebustorail "
         "and convergence_convergencerailtobus using upsert semantics, and optionally "
@@ -114,6 +186,15 @@ class Command(BaseCommand):
             default="tables",
             help="Directory to scan for raw_bus_data_*.csv files.",
         )
+        parser.add_argument(
+            "--raw-bus-mode",
+            choices=(RAW_BUS_MODE_REPLACE, RAW_BUS_MODE_APPEND),
+            default=RAW_BUS_MODE_REPLACE,
+            help=(
+                "How RawBusData CSV rows are loaded: 'replace' swaps out the (year, month) slices "
+                "covered by each file, 'append' inserts rows next to whatever is already there."
+            ),
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
@@ -128,18 +209,48 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Progress reporting interval.",
+            help="Number of rows written per bulk operation (also the progress reporting interval).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Number of processes used to read and normalize convergence XLSX files. "
+                "DB writes always happen in this process, in file order."
+            ),
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Re-parse XLSX sheets instead of loading them from SHEET_CACHE_DIR.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-import files even if the import manifest shows them unchanged.",
         )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
         strict = options["strict"]
         batch_size = options["batch_size"]
+        raw_bus_mode = options["raw_bus_mode"]
+        workers = options["workers"]
+        use_cache = not options["no_cache"]
         explicit_xlsx_files = bool(options["file"])
         explicit_raw_bus_files = bool(options["raw_bus_file"])
 
         if batch_size <= 0:
             raise CommandError("--batch-size must be a positive integer.")
+        if workers <= 0:
+            raise CommandError("--workers must be a positive integer.")
+        self.stations = StationResolver()
+        self.summary_months = set()
+        self.raw_months = set()
+        # Dry runs write nothing, so rows earlier batches would have written are remembered here, per model.
+        self.dry_run_rows = {}
 
         files = self._resolve_files(
             options["file"],
@@ -157,16 +268,29 @@ class Command(BaseCommand):
             )
         self._ensure_tables_available()
 
+        skipped = 0
+        if not options["force"]:
+            files, skipped_xlsx = self._drop_unchanged(files)
+            raw_bus_files, skipped_csv = self._drop_unchanged(raw_bus_files)
+            skipped = skipped_xlsx + skipped_csv
+        if not files and not raw_bus_files:
+            self.stdout.write(self.style.SUCCESS(f"All {skipped} source files are unchanged. Nothing to import."))
+            return
+
         if strict and not dry_run:
             with transaction.atomic():
-                totals = self._process_files(files, dry_run=dry_run, strict=strict, batch_size=batch_size)
+                totals = self._process_files(
+                    files, dry_run=dry_run, strict=strict, batch_size=batch_size, workers=workers, use_cache=use_cache
+                )
                 raw_totals = self._process_raw_bus_files(
-                    raw_bus_files, dry_run=dry_run, strict=strict, batch_size=batch_size
+                    raw_bus_files, dry_run=dry_run, strict=strict, batch_size=batch_size, mode=raw_bus_mode
                 )
         else:
-            totals = self._process_files(files, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            totals = self._process_files(
+                files, dry_run=dry_run, strict=strict, batch_size=batch_size, workers=workers, use_cache=use_cache
+            )
             raw_totals = self._process_raw_bus_files(
-                raw_bus_files, dry_run=dry_run, strict=strict, batch_size=batch_size
+                raw_bus_files, dry_run=dry_run, strict=strict, batch_size=batch_size, mode=raw_bus_mode
             )
 
         self.stdout.write("")
@@ -175,15 +299,34 @@ class Command(BaseCommand):
         self.stdout.write(f"Convergence rows processed: {totals['total_rows']}")
         self.stdout.write(f"Inserted: {totals['inserted']}")
         self.stdout.write(f"Updated: {totals['updated']}")
+        self.stdout.write(f"Unchanged: {totals['unchanged']}")
         self.stdout.write(f"Invalid: {totals['invalid'] + raw_totals['invalid']}")
         self.stdout.write(f"RawBusData CSV files processed: {raw_totals['files']}")
         self.stdout.write(f"RawBusData rows processed: {raw_totals['total_rows']}")
         self.stdout.write(f"RawBusData inserted: {raw_totals['inserted']}")
+        self.stdout.write(f"RawBusData replaced (deleted): {raw_totals['deleted']}")
+        self.stdout.write(f"Unchanged files skipped: {skipped}")
         self.stdout.write(f"Dry run: {'yes' if dry_run else 'no'}")
 
         if strict and (totals["invalid"] > 0 or raw_totals["invalid"] > 0):
             raise CommandError("Import failed in --strict mode due to invalid rows.")
 
+        if not dry_run and self.raw_months:
+            # Months written next to the partitions (append mode, --strict) get one of their own.
+            months = sorted(self.raw_months)
+            if connection.in_atomic_block:
+                # Called inside a transaction (import_month): DDL would commit it, so split once it has.
+                transaction.on_commit(lambda: partitions.ensure_month_partitions(months))
+            else:
+                for name in partitions.ensure_month_partitions(months):
+                    self.stdout.write(f"RawBusData partition created: {name}")
+
+        if not dry_run and self.summary_months:
+            # Keep the tables derived from bus_to_rail (main_page's station months, the trends) in step.
+            with self.profiler.phase("summaries"):
+                build_month_summaries(self.summary_months)
+            self.stdout.write(f"Month summaries rebuilt: {len(self.summary_months)}")
+
     def _resolve_files(self, file_args, scan_dir, auto_scan=True):
         files = []
 
@@ -218,93 +361,203 @@ class Command(BaseCommand):
 
         return sorted(set(files))
 
-    def _process_files(self, files, dry_run, strict, batch_size):
-        totals = {"files": 0, "total_rows": 0, "inserted": 0, "updated": 0, "invalid": 0}
-
+    def _drop_unchanged(self, files):
+        pending = []
         for source_path in files:
-            totals["files"] += 1
+            fingerprint = source_fingerprint(source_path)
+            manifest = previous_import(MANIFEST_COMMAND, fingerprint)
+            if manifest is not None:
+                self.stdout.write(skip_message(source_path, manifest))
+                continue
+            pending.append(source_path)
+        return pending, len(files) - len(pending)
 
-            for sheet_name, model, sheet_optional, lookup_fields in (
-                (SHEET_BUS_TO_RAIL, ConvergenceBusToRail, BUS_TO_RAIL_OPTIONAL, BUS_LOOKUP_FIELDS),
-                (SHEET_RAIL_TO_BUS, ConvergenceRailToBus, RAIL_TO_BUS_OPTIONAL, RAIL_LOOKUP_FIELDS),
-            ):
-                try:
-                    df = pd.read_excel(source_path, sheet_name=sheet_name)
-                except Exception as exc:
-                    msg = f"{source_path.name}/{sheet_name}: failed to read sheet: {exc}"
-                    if strict:
-                        raise CommandError(msg) from exc
-                    self.stderr.write(self.style.WARNING(msg))
-                    continue
-
-                rows = df.to_dict(orient="records")
-                for idx, row in enumerate(rows, start=2):
-                    if self._is_empty_row(row):
-                        continue
-                    totals["total_rows"] += 1
-                    try:
-                        payload = self._normalize_row(row, sheet_optional, source_path.name, sheet_name, idx)
-                        outcome = self._upsert(model, payload, lookup_fields, dry_run=dry_run)
-                        totals[outcome] += 1
-                    except CommandError as exc:
-                        totals["invalid"] += 1
-                        if strict:
-                            raise
-                        self.stderr.write(self.style.WARNING(str(exc)))
+    def _record_file(self, source_path, totals, before, started):
+        file_totals = {key: totals[key] - before[key] for key in before}
+        record_import(MANIFEST_COMMAND, source_fingerprint(source_path), file_totals, monotonic() - started)
 
-                    if totals["total_rows"] % batch_size == 0:
-                        self.stdout.write(
-                            f"Processed {totals['total_rows']} rows "
-                            f"(inserted={totals['inserted']}, updated={totals['updated']}, invalid={totals['invalid']})"
-                        )
+    def _process_files(self, files, dry_run, strict, batch_size, workers=1, use_cache=True):
+        totals = {"files": 0, "total_rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0}
+        if not files:
+            return totals
+
+        executor = None
+        if workers > 1 and len(files) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(files)), initializer=django.setup)
+            # Workers read and normalize; this process only sees the time spent waiting for them.
+            parsed_files = self.profiler.iterate(
+                "read + normalize (workers)",
+                executor.map(_parse_file_in_worker, files, [use_cache] * len(files)),
+            )
+        else:
+            parsed_files = (self._parse_file(source_path, use_cache=use_cache) for source_path in files)
+
+        started = monotonic()
+        try:
+            # map() yields in submission order, so writes stay deterministic whatever finishes first.
+            for source_path, parsed_sheets in zip(files, parsed_files):
+                totals["files"] += 1
+                before = dict(totals)
+                complete = True
+                for (_, normalized, read_error), (_, model, _, _, lookup_fields) in zip(parsed_sheets, SHEET_SPECS):
+                    if read_error is not None:
+                        if strict:
+                            raise CommandError(read_error)
+                        self.stderr.write(self.style.WARNING(read_error))
+                        complete = False
+                        continue
+                    with self.profiler.phase("db write") as phase:
+                        self._write_sheet(model, lookup_fields, normalized, totals, dry_run, strict, batch_size)
+                        phase.rows += len(normalized)
+                # A file with an unreadable sheet stays out of the manifest so the next run retries it.
+                if complete and not dry_run:
+                    self._record_file(source_path, totals, before, started)
+                started = monotonic()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
 
         return totals
 
-    def _process_raw_bus_files(self, files, dry_run, strict, batch_size):
-        totals = {"files": 0, "total_rows": 0, "inserted": 0, "invalid": 0}
+    def _parse_file(self, source_path, use_cache=True):
+        # Returns one (sheet_name, normalized rows, read error message) triple per SHEET_SPECS entry.
+        sheet_names = [sheet_name for sheet_name, *_ in SHEET_SPECS]
+        with self.profiler.phase("read"):
+            try:
+                sheets = read_excel_sheets(source_path, sheet_names, use_cache=use_cache)
+            except Exception as exc:
+                sheets = {sheet_name: exc for sheet_name in sheet_names}
+
+        parsed = []
+        for sheet_name, _, sheet_optional, sheet_field_types, _ in SHEET_SPECS:
+            df = sheets[sheet_name]
+            if isinstance(df, Exception):
+                parsed.append((sheet_name, None, f"{source_path.name}/{sheet_name}: failed to read sheet: {df}"))
+                continue
+            with self.profiler.phase("normalize") as phase:
+                normalized = self._normalize_frame(df, sheet_optional, sheet_field_types, source_path.name, sheet_name)
+                phase.rows += len(normalized)
+            parsed.append((sheet_name, normalized, None))
+        return parsed
+
+    def _write_sheet(self, model, lookup_fields, normalized, totals, dry_run, strict, batch_size):
+        pending = []
+        for payload, error in normalized:
+            totals["total_rows"] += 1
+            if error is not None:
+                totals["invalid"] += 1
+                if strict:
+                    raise error
+                self.stderr.write(self.style.WARNING(str(error)))
+                continue
+
+            pending.append(payload)
+            if len(pending) >= batch_size:
+                self._flush_batch(model, pending, lookup_fields, totals, dry_run=dry_run)
+                pending = []
+
+        if pending:
+            self._flush_batch(model, pending, lookup_fields, totals, dry_run=dry_run)
+
+    def _process_raw_bus_files(self, files, dry_run, strict, batch_size, mode=RAW_BUS_MODE_REPLACE):
+        totals = {"files": 0, "total_rows": 0, "inserted": 0, "deleted": 0, "invalid": 0}
         if not files:
             return totals
 
+        # Partition swaps are DDL, which MySQL commits implicitly, so --strict's single transaction rules them out.
+        swap = (
+            mode == RAW_BUS_MODE_REPLACE
+            and not dry_run
+            and not connection.in_atomic_block
+            and partitions.is_partitioned()
+        )
         for source_path in files:
             totals["files"] += 1
+            before = dict(totals)
+            started = monotonic()
             try:
-                try:
-                    df = pd.read_csv(source_path, encoding="utf-8-sig")
-                except UnicodeDecodeError:
-                    try:
-                        df = pd.read_csv(source_path, encoding="cp1255")
-                    except UnicodeDecodeError:
-                        df = pd.read_csv(source_path, encoding="iso-8859-8")
-            except Exception as exc:
+                if swap:
+                    self._swap_raw_bus_file(source_path, totals, strict, batch_size, before, started)
+                else:
+                    # One transaction per file, so a file that fails to read part way leaves no rows behind.
+                    with transaction.atomic():
+                        self._stream_raw_bus_file(source_path, totals, dry_run, strict, batch_size, mode)
+                        if not dry_run:
+                            self._record_file(source_path, totals, before, started)
+            except SourceError as exc:
                 msg = f"{source_path.name}: failed to read csv: {exc}"
                 if strict:
                     raise CommandError(msg) from exc
                 self.stderr.write(self.style.WARNING(msg))
-                continue
+                totals.update(before)
 
-            rows = df.to_dict(orient="records")
-            for idx, row in enumerate(rows, start=2):
-                if self._is_empty_row(row):
-                    continue
-                totals["total_rows"] += 1
-                try:
-                    payload = self._normalize_raw_bus_row(row, source_path.name, idx)
-                    if not dry_run:
-                        RawBusData.objects.create(**payload)
-                    totals["inserted"] += 1
-                except CommandError as exc:
-                    totals["invalid"] += 1
-                    if strict:
-                        raise
-                    self.stderr.write(self.style.WARNING(str(exc)))
-
-                if totals["total_rows"] % batch_size == 0:
+        return totals
+
+    def _swap_raw_bus_file(self, source_path, totals, strict, batch_size, before, started):
+        # The file's months are built beside the table and swapped in whole once it has been read,
+        # so a file that fails part way leaves the live partitions untouched.
+        swap = partitions.MonthSwap()
+        try:
+            self._stream_raw_bus_file(source_path, totals, False, strict, batch_size, RAW_BUS_MODE_REPLACE, swap=swap)
+            with self.profiler.phase("raw bus partition swap"):
+                totals["deleted"] += swap.exchange()
+            self._record_file(source_path, totals, before, started)
+        finally:
+            swap.discard()
+
+    def _stream_raw_bus_file(self, source_path, totals, dry_run, strict, batch_size, mode, swap=None):
+        # In replace mode a (year, month) slice is cleared the first time the file reaches it,
+        # unless the rows go to a partition swap, which replaces the months at the end.
+        cleared = set()
+        with open_csv(source_path) as reader:
+            chunks = self.profiler.iterate("raw bus read", chunked(enumerate(reader, start=2), batch_size), count=len)
+            for chunk in chunks:
+                with self.profiler.phase("raw bus normalize") as phase:
+                    payloads = []
+                    for idx, row in chunk:
+                        if self._is_empty_row(row):
+                            continue
+                        totals["total_rows"] += 1
+                        try:
+                            payloads.append(self._normalize_raw_bus_row(row, source_path.name, idx))
+                        except CommandError as exc:
+                            totals["invalid"] += 1
+                            if strict:
+                                raise
+                            self.stderr.write(self.style.WARNING(str(exc)))
+                    phase.rows += len(chunk)
+
+                with self.profiler.phase("raw bus db write") as phase:
+                    if mode == RAW_BUS_MODE_REPLACE and swap is None:
+                        for year, month in sorted({(p["year"], p["month"]) for p in payloads} - cleared):
+                            cleared.add((year, month))
+                            slice_qs = RawBusData.objects.filter(year=str(year), month=month)
+                            if dry_run:
+                                totals["deleted"] += slice_qs.count()
+                            else:
+                                totals["deleted"] += slice_qs.delete()[0]
+
+                    if payloads and not dry_run:
+                        objs = [
+                            RawBusData(
+                                **p,
+                                **RawBusData.year_month_key(p),
+                                **RawBusData.clock_seconds(p),
+                                **RawBusData.station_keys(p, self.stations),
+                            )
+                            for p in payloads
+                        ]
+                        self.raw_months.update(obj.year_month for obj in objs)
+                        if swap is not None:
+                            swap.add(objs)
+                        else:
+                            RawBusData.objects.bulk_create(objs)
+                    totals["inserted"] += len(payloads)
                     self.stdout.write(
-                        f"Processed {totals['total_rows']} RawBusData rows "
+                        f"Processed {totals['inserted']} RawBusData rows "
                         f"(inserted={totals['inserted']}, invalid={totals['invalid']})"
                     )
-
-        return totals
+                    phase.rows += len(payloads)
 
     def _ensure_tables_available(self):
         try:
@@ -336,26 +589,138 @@ class Command(BaseCommand):
                 "raw_bus_data",
                 row_number,
             ),
-            "makat": self._to_int_or_none(pick("makat", "OfficeLineID", 'מק"ט')),
-            "direction": self._to_int_or_none(pick("direction", "Direction", "כיוון")),
-            "alternative": self._clean_text(pick("alternative", "Alternative", "חלופה")),
-            "departure_time": self._clean_text(
+            "makat": to_int(pick("makat", "OfficeLineID", 'מק"ט')),
+            "direction": to_int(pick("direction", "Direction", "כיוון")),
+            "alternative": clean_text(pick("alternative", "Alternative", "חלופה")),
+            "departure_time": clean_text(
                 pick("departure_time", "TripStartTime", "שעת יציאה מתחנת המוצא")
             ),
-            "bus_arrival_time_to_station": self._clean_text(
+            "bus_arrival_time_to_station": clean_text(
                 pick("bus_arrival_time_to_station", "ArrivalTime", "שעת הגעה לתחנה (בממוצע)")
             ),
-            "ride_counts": self._to_int_or_none(pick("ride_counts", "מספר נסיעות")),
+            "ride_counts": to_int(pick("ride_counts", "מספר נסיעות")),
         }
+        if to_year_month(payload["year"], payload["month"]) is None:
+            # Rows are filed by year_month; one that has none could never be read back.
+            raise CommandError(f"{file_name}/raw_bus_data row {row_number}: month must be between 1 and 12.")
         return payload
 
     def _is_empty_row(self, row):
         for value in row.values():
-            text = self._clean_text(value)
+            text = clean_text(value)
             if text != "":
                 return False
         return True
 
+    def _normalize_frame(self, df, sheet_optional, sheet_field_types, file_name, sheet_name):
+        # Column-wise equivalent of _normalize_row: returns (payload, error) for every non-empty row.
+        df = df.reset_index(drop=True)
+        if any(src not in df.columns for src in COMMON_REQUIRED):
+            return self._normalize_rows(df, sheet_optional, file_name, sheet_name)
+
+        texts = {
+            col: self._clean_text_column(df[col])
+            for col in df.columns
+            if not self._is_numeric_column(df[col])
+        }
+        present = {
+            col: texts[col].ne("").to_numpy() if col in texts else df[col].notna().to_numpy()
+            for col in df.columns
+        }
+        non_empty = np.logical_or.reduce(list(present.values()), initial=False)
+
+        field_types = {**COMMON_FIELD_TYPES, **sheet_field_types}
+        for field in REQUIRED_TEXT_FIELDS:
+            field_types.setdefault(field, "text")
+
+        columns = {}
+        for src, dst in chain(COMMON_REQUIRED.items(), COMMON_OPTIONAL.items(), sheet_optional.items()):
+            if dst not in field_types or src not in df.columns:
+                continue
+            values = self._typed_column(df[src], texts.get(src), field_types[dst])
+            if dst in columns:
+                # A later alias only wins when it actually carries a value.
+                values = values.where(present[src], columns[dst])
+            columns[dst] = values
+
+        empty = {"text": "", "int": None, "float": None, "decimal": None}
+        fields = list(field_types)
+        values_by_field = [
+            columns[field].tolist() if field in columns else [empty[field_types[field]]] * len(df)
+            for field in fields
+        ]
+        required = [values_by_field[fields.index(f)] for f in REQUIRED_TEXT_FIELDS]
+
+        out = []
+        for pos, row_values in enumerate(zip(*values_by_field)):
+            if not non_empty[pos]:
+                continue
+            blank_field = next((f for f, col in zip(REQUIRED_TEXT_FIELDS, required) if not col[pos]), None)
+            if blank_field is not None:
+                out.append((None, CommandError(
+                    f"{file_name}/{sheet_name} row {pos + 2}: {blank_field} cannot be blank."
+                )))
+                continue
+            out.append((dict(zip(fields, row_values)), None))
+        return out
+
+    def _normalize_rows(self, df, sheet_optional, file_name, sheet_name):
+        out = []
+        for idx, row in enumerate(df.to_dict(orient="records"), start=2):
+            if self._is_empty_row(row):
+                continue
+            try:
+                out.append((self._normalize_row(row, sheet_optional, file_name, sheet_name, idx), None))
+            except CommandError as exc:
+                out.append((None, exc))
+        return out
+
+    def _is_numeric_column(self, series):
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+    def _clean_text_column(self, series):
+        text = series.astype(str).str.strip()
+        keep = series.notna() & (text.str.lower() != "nan")
+        return text.where(keep, "").astype(object)
+
+    def _typed_column(self, series, text, kind):
+        # `text` is the cleaned text of a non-numeric column, or None for numeric dtypes.
+        if kind == "text":
+            values = self._clean_text_column(series) if text is None else text
+        elif kind == "decimal":
+            if text is None:
+                values = pd.Series(
+                    [Decimal(str(v)) if ok else None for v, ok in zip(series.tolist(), series.notna().tolist())],
+                    dtype=object,
+                )
+            else:
+                values = self._decimal_column(text)
+        elif text is None and pd.api.types.is_integer_dtype(series):
+            values = series.astype(object) if kind == "int" else series.astype(float).astype(object)
+        else:
+            if text is None:
+                numbers = series.astype(float)
+            elif kind == "float":
+                numbers = pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
+            else:
+                numbers = pd.to_numeric(text, errors="coerce")
+            values = self._int_column(numbers) if kind == "int" else self._float_column(numbers)
+        return values.reset_index(drop=True)
+
+    def _int_column(self, numbers):
+        valid = np.isfinite(numbers) & (numbers.abs() < 2**63)
+        return np.trunc(numbers.where(valid)).astype("Int64").astype(object).where(valid, None)
+
+    def _float_column(self, numbers):
+        return numbers.astype(object).where(numbers.notna(), None)
+
+    def _decimal_column(self, text):
+        text = text.str.replace("%", "", regex=False).str.replace(",", "", regex=False)
+        valid = pd.to_numeric(text, errors="coerce").notna()
+        return pd.Series(
+            [Decimal(t) if ok else None for t, ok in zip(text.tolist(), valid.tolist())], dtype=object
+        )
+
     def _normalize_row(self, row, sheet_optional, file_name, sheet_name, row_number):
         normalized = {}
 
@@ -366,13 +731,13 @@ class Command(BaseCommand):
 
         for src, dst in COMMON_OPTIONAL.items():
             candidate = row.get(src)
-            if dst in normalized and self._clean_text(normalized[dst]) and not self._clean_text(candidate):
+            if dst in normalized and clean_text(normalized[dst]) and not clean_text(candidate):
                 continue
             normalized[dst] = candidate
 
         for src, dst in sheet_optional.items():
             candidate = row.get(src)
-            if dst in normalized and self._clean_text(normalized[dst]) and not self._clean_text(candidate):
+            if dst in normalized and clean_text(normalized[dst]) and not clean_text(candidate):
                 continue
             normalized[dst] = candidate
 
@@ -381,113 +746,168 @@ class Command(BaseCommand):
             "week_period": self._require_text(normalized["week_period"], "week_period", file_name, sheet_name, row_number),
             "train_station_name": self._require_text(normalized.get("train_station_name"), "train_station_name", file_name, sheet_name, row_number),
             "rail_direction": self._require_text(normalized.get("rail_direction"), "rail_direction", file_name, sheet_name, row_number),
-            "year": self._to_int_or_none(normalized.get("year")),
-            "month": self._to_int_or_none(normalized.get("month")),
-            "train_number": self._to_int_or_none(normalized.get("train_number")),
-            "operator": self._clean_text(normalized.get("operator")),
-            "train_station_code": self._to_int_or_none(normalized.get("train_station_code")),
-            "makat": self._to_int_or_none(normalized.get("makat")),
-            "direction": self._to_int_or_none(normalized.get("direction")),
-            "alternative": self._clean_text(normalized.get("alternative")),
-            "departure_time": self._clean_text(normalized.get("departure_time")),
-            "avg_passengers_per_trip": self._to_float_or_none(normalized.get("avg_passengers_per_trip")),
-            "signage": self._to_int_or_none(normalized.get("signage")),
-            "is_gold_train": self._clean_text(normalized.get("is_gold_train")),
-            "is_bus_on_time": self._to_int_or_none(normalized.get("is_bus_on_time")),
+            "year": to_int(normalized.get("year")),
+            "month": to_int(normalized.get("month")),
+            "train_number": to_int(normalized.get("train_number")),
+            "operator": clean_text(normalized.get("operator")),
+            "train_station_code": to_int(normalized.get("train_station_code")),
+            "makat": to_int(normalized.get("makat")),
+            "direction": to_int(normalized.get("direction")),
+            "alternative": clean_text(normalized.get("alternative")),
+            "departure_time": clean_text(normalized.get("departure_time")),
+            "avg_passengers_per_trip": to_float(normalized.get("avg_passengers_per_trip")),
+            "signage": to_int(normalized.get("signage")),
+            "is_gold_train": clean_text(normalized.get("is_gold_train")),
+            "is_bus_on_time": to_int(normalized.get("is_bus_on_time")),
         }
 
         if "arrival_time_to_station" in normalized:
-            payload["rishui_train_arrival_time"] = self._clean_text(normalized.get("rishui_train_arrival_time"))
-            payload["train_ascending_amount"] = self._to_int_or_none(normalized.get("train_ascending_amount"))
-            payload["arrival_time_to_station"] = self._clean_text(normalized.get("arrival_time_to_station"))
-            payload["arrival_time_window"] = self._clean_text(normalized.get("arrival_time_window"))
-            payload["minutes_gap_bus_to_rail"] = self._to_float_or_none(normalized.get("minutes_gap_bus_to_rail"))
-            payload["recommended_minutes"] = self._to_int_or_none(normalized.get("recommended_minutes"))
-            payload["observations_count"] = self._to_int_or_none(normalized.get("observations_count"))
-            payload["on_time_count"] = self._to_int_or_none(normalized.get("on_time_count"))
-            payload["on_time_percentage"] = self._to_decimal_or_none(normalized.get("on_time_percentage"))
-            payload["on_time_percentage_by_makat"] = self._to_decimal_or_none(normalized.get("on_time_percentage_by_makat"))
-            payload["on_time_percentage_by_train"] = self._to_decimal_or_none(normalized.get("on_time_percentage_by_train"))
-            payload["on_time_percentage_by_train_station"] = self._to_decimal_or_none(normalized.get("on_time_percentage_by_train_station"))
-            payload["express_train"] = self._clean_text(normalized.get("express_train"))
-            payload["duration_from_current_station_to_hashalom"] = self._to_int_or_none(normalized.get("duration_from_current_station_to_hashalom"))
+            payload["rishui_train_arrival_time"] = clean_text(normalized.get("rishui_train_arrival_time"))
+            payload["train_ascending_amount"] = to_int(normalized.get("train_ascending_amount"))
+            payload["arrival_time_to_station"] = clean_text(normalized.get("arrival_time_to_station"))
+            payload["arrival_time_window"] = clean_text(normalized.get("arrival_time_window"))
+            payload["minutes_gap_bus_to_rail"] = to_float(normalized.get("minutes_gap_bus_to_rail"))
+            payload["recommended_minutes"] = to_int(normalized.get("recommended_minutes"))
+            payload["observations_count"] = to_int(normalized.get("observations_count"))
+            payload["on_time_count"] = to_int(normalized.get("on_time_count"))
+            payload["on_time_percentage"] = to_decimal(normalized.get("on_time_percentage"))
+            payload["on_time_percentage_by_makat"] = to_decimal(normalized.get("on_time_percentage_by_makat"))
+            payload["on_time_percentage_by_train"] = to_decimal(normalized.get("on_time_percentage_by_train"))
+            payload["on_time_percentage_by_train_station"] = to_decimal(normalized.get("on_time_percentage_by_train_station"))
+            payload["express_train"] = clean_text(normalized.get("express_train"))
+            payload["duration_from_current_station_to_hashalom"] = to_int(normalized.get("duration_from_current_station_to_hashalom"))
 
 
 
         if "minutes_gap_rail_to_bus" in normalized:
-            payload["rishui_train_arrival_time"] = self._clean_text(normalized.get("rishui_train_arrival_time"))
-            payload["train_descending_amount"] = self._to_int_or_none(normalized.get("train_descending_amount"))
-            payload["minutes_gap_rail_to_bus"] = self._to_float_or_none(normalized.get("minutes_gap_rail_to_bus"))
-            payload["recommended_minutes"] = self._to_int_or_none(normalized.get("recommended_minutes"))
-            payload["duration_from_hashalom_to_current_station"] = self._to_int_or_none( normalized.get("duration_from_hashalom_to_current_station"))
-            payload["express_train"] = self._clean_text(normalized.get("express_train"))
+            payload["rishui_train_arrival_time"] = clean_text(normalized.get("rishui_train_arrival_time"))
+            payload["train_descending_amount"] = to_int(normalized.get("train_descending_amount"))
+            payload["minutes_gap_rail_to_bus"] = to_float(normalized.get("minutes_gap_rail_to_bus"))
+            payload["recommended_minutes"] = to_int(normalized.get("recommended_minutes"))
+            payload["duration_from_hashalom_to_current_station"] = to_int( normalized.get("duration_from_hashalom_to_current_station"))
+            payload["express_train"] = clean_text(normalized.get("express_train"))
 
         return payload
 
-    def _upsert(self, model, payload, lookup_fields, dry_run=False):
-        lookup = {k: payload[k] for k in lookup_fields}
-        defaults = {k: v for k, v in payload.items() if k not in lookup_fields}
+    def _flush_batch(self, model, payloads, lookup_fields, totals, dry_run=False):
+        keyed = {}
+        for payload in payloads:
+            payload = {**payload, **model.year_month_key(payload), **model.clock_seconds(payload)}
+            key = self._natural_key(model, payload, lookup_fields)
+            if key in keyed:
+                # update_or_create would update the row inserted a moment ago.
+                totals["updated"] += 1
+            keyed[key] = payload
+        if model is ConvergenceBusToRail:
+            self.summary_months.update(payload["year_month"] for payload in keyed.values())
+
+        # Stored values come back with the keys so rows that would not change are never rewritten.
+        compare_fields = self._update_fields(keyed, lookup_fields)
+        existing = self._existing_rows(model, keyed.values(), lookup_fields, compare_fields)
         if dry_run:
-            obj = model.objects.filter(**lookup).first()
-            if obj is None:
-                return "inserted"
-            return "updated"
-
-        _, created = model.objects.update_or_create(**lookup, defaults=defaults)
-        return "inserted" if created else "updated"
-
-    def _clean_text(self, value):
-        if value is None:
-            return ""
-        text = str(value).strip()
-        if text.lower() == "nan":
-            return ""
-        return text
+            seen = self.dry_run_rows.setdefault(model, {})
+            for key in keyed.keys() & seen.keys():
+                existing[key] = (None, *(
+                    self._stored_form(model._meta.get_field(name), seen[key].get(name)) for name in compare_fields
+                ))
+        changed = {}
+        for key, payload in keyed.items():
+            if key not in existing:
+                totals["inserted"] += 1
+            elif self._is_unchanged(model, payload, existing[key][1:], compare_fields):
+                totals["unchanged"] += 1
+                continue
+            else:
+                totals["updated"] += 1
+            changed[key] = payload
+
+        if dry_run:
+            seen.update(changed)
+        elif changed:
+            self._write_batch(model, changed, existing, lookup_fields)
+
+        self.stdout.write(
+            f"Processed {totals['total_rows']} rows "
+            f"(inserted={totals['inserted']}, updated={totals['updated']}, "
+            f"unchanged={totals['unchanged']}, invalid={totals['invalid']})"
+        )
+
+    def _natural_key(self, model, values, lookup_fields):
+        return tuple(model._meta.get_field(k).to_python(values[k]) for k in lookup_fields)
+
+    def _update_fields(self, keyed, lookup_fields):
+        return sorted({k for p in keyed.values() for k in p if k not in lookup_fields})
+
+    def _is_unchanged(self, model, payload, stored, compare_fields):
+        return all(
+            self._stored_form(model._meta.get_field(name), payload.get(name)) == value
+            for name, value in zip(compare_fields, stored)
+        )
+
+    def _stored_form(self, field, value):
+        value = field.to_python(value)
+        if isinstance(value, Decimal):
+            # The DB rounds to decimal_places, so 55.00000000000001 reads back as 55.00.
+            return value.quantize(Decimal(1).scaleb(-field.decimal_places))
+        return value
+
+    def _existing_rows(self, model, payloads, lookup_fields, compare_fields=()):
+        # Maps natural key -> (pk, *compare_fields) for rows already stored; NULL key parts compare
+        # equal here, like update_or_create.
+        payloads = list(payloads)
+        makats = {p["makat"] for p in payloads}
+        makat_filter = Q(makat__in=makats - {None})
+        if None in makats:
+            makat_filter |= Q(makat__isnull=True)
+        qs = model.objects.filter(
+            makat_filter,
+            year__in={p["year"] for p in payloads},
+            month__in={p["month"] for p in payloads},
+            train_station_name__in={p["train_station_name"] for p in payloads},
+        )
+        # Values read back from the DB are already in each field's Python type.
+        key_size = len(lookup_fields)
+        return {
+            values[:key_size]: values[key_size:]
+            for values in qs.values_list(*lookup_fields, "pk", *compare_fields)
+        }
+
+    def _write_batch(self, model, keyed, existing, lookup_fields):
+        update_fields = self._update_fields(keyed, lookup_fields) + ["station"]
+        upserts, inserts, updates = [], [], []
+        for key, payload in keyed.items():
+            payload = {**payload, **model.station_keys(payload, self.stations)}
+            if None not in key:
+                upserts.append(model(**payload))
+            elif key in existing:
+                # NULLs never trip the unique constraint, so match these rows by pk instead.
+                updates.append(model(pk=existing[key][0], **payload))
+            else:
+                inserts.append(model(**payload))
+
+        with transaction.atomic():
+            if upserts:
+                self._bulk_upsert(model, upserts, lookup_fields, update_fields)
+            if updates:
+                self._bulk_upsert(model, updates, (model._meta.pk.name,), update_fields)
+            if inserts:
+                model.objects.bulk_create(inserts)
+
+    def _bulk_upsert(self, model, objs, conflict_fields, update_fields):
+        options = {"update_conflicts": True, "update_fields": update_fields}
+        # MySQL's ON DUPLICATE KEY UPDATE matches any unique key and rejects an explicit target.
+        if connection.features.supports_update_conflicts_with_target:
+            options["unique_fields"] = list(conflict_fields)
+        model.objects.bulk_create(objs, **options)
 
     def _require_text(self, value, field_name, file_name, sheet_name, row_number):
-        text = self._clean_text(value)
+        text = clean_text(value)
         if not text:
             raise CommandError(f"{file_name}/{sheet_name} row {row_number}: {field_name} cannot be blank.")
         return text
 
     def _to_int(self, value, field_name, file_name, sheet_name, row_number):
-        out = self._to_int_or_none(value)
+        out = to_int(value)
         if out is None:
             raise CommandError(f"{file_name}/{sheet_name} row {row_number}: {field_name} must be a valid integer.")
         return out
-
-    def _to_int_or_none(self, value):
-        if value is None:
-            return None
-        text = self._clean_text(value)
-        if not text:
-            return None
-        try:
-            return int(float(text))
-        except (TypeError, ValueError):
-            return None
-
-    def _to_float_or_none(self, value):
-        if value is None:
-            return None
-        text = self._clean_text(value)
-        if not text:
-            return None
-        text = text.replace(",", "")
-        try:
-            return float(text)
-        except (TypeError, ValueError):
-            return None
-
-    def _to_decimal_or_none(self, value):
-        if value is None:
-            return None
-        text = self._clean_text(value)
-        if not text:
-            return None
-        text = text.replace("%", "").replace(",", "")
-        try:
-            return Decimal(text)
-        except (InvalidOperation, ValueError):
-            return None
-
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from convergence import partitions
+from convergence.models import RawBusData
+from imports.ingest import to_year_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Give every stored (and every --month) month of convergence_rawbusdata a partition of its own "
+        "on MySQL. Migration 0035 partitions the table itself."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            action="append",
+            default=[],
+            help="Also create the partition of this month (YYYY-MM), ahead of its import. Can be passed multiple times.",
+        )
+
+    def handle(self, *args, **options):
+        requested = []
+        for value in options["month"]:
+            year, _, month = value.partition("-")
+            year_month = to_year_month(year, month)
+            if year_month is None:
+                raise CommandError(f"--month must look like YYYY-MM, got {value!r}.")
+            requested.append(year_month)
+
+        if not partitions.supported():
+            # SQLite and friends keep one table; re-imports there delete the month's rows instead.
+            self.stdout.write(self.style.WARNING(
+                f"{connection.vendor} does not support partitioning; {partitions.TABLE} stays one table."
+            ))
+            return
+
+        if not partitions.is_partitioned():
+            raise CommandError(f"{partitions.TABLE} is not partitioned; run `python manage.py migrate convergence` first.")
+        stored = list(RawBusData.objects.values_list("year_month", flat=True).distinct())
+        for name in partitions.ensure_month_partitions(stored + requested):
+            self.stdout.write(f"Partition created: {name}")
+
+        for name, bound in partitions.partition_bounds():
+            self.stdout.write(f"{name:<10} year_month < {'MAXVALUE' if bound is None else bound}")
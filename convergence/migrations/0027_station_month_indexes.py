@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0026_remove_overrideconv_uniq_override_conv_default_key_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='convergencebustorail',
+            index=models.Index(fields=['train_station_name', 'year', 'month'], name='b2r_station_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='convergencerailtobus',
+            index=models.Index(fields=['train_station_name', 'year', 'month'], name='r2b_station_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='overrideconv',
+            index=models.Index(fields=['station_name', 'effective_month', 'changed_at'], name='override_station_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawbusdata',
+            index=models.Index(fields=['train_station_name', 'year', 'month'], name='raw_bus_station_month_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0027_station_month_indexes'),
+        ('stations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='convergencebustorail',
+            name='b2r_station_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='convergencerailtobus',
+            name='r2b_station_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rawbusdata',
+            name='raw_bus_station_month_idx',
+        ),
+        migrations.AddField(
+            model_name='convergencebustorail',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddField(
+            model_name='convergencerailtobus',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddField(
+            model_name='rawbusdata',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddIndex(
+            model_name='convergencebustorail',
+            index=models.Index(fields=['station', 'year', 'month'], name='b2r_station_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='convergencerailtobus',
+            index=models.Index(fields=['station', 'year', 'month'], name='r2b_station_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawbusdata',
+            index=models.Index(fields=['station', 'year', 'month'], name='raw_bus_station_month_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+from imports.ingest import to_seconds_of_day
+
+
+# (model, seconds field, text field), as in each model's CLOCK_TIMES.
+CLOCK_TIMES = (
+    ("ConvergenceBusToRail", "rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+    ("ConvergenceBusToRail", "departure_seconds", "departure_time"),
+    ("ConvergenceBusToRail", "arrival_to_station_seconds", "arrival_time_to_station"),
+    ("ConvergenceRailToBus", "rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+    ("ConvergenceRailToBus", "departure_seconds", "departure_time"),
+    ("RawBusData", "departure_seconds", "departure_time"),
+    ("RawBusData", "bus_arrival_seconds", "bus_arrival_time_to_station"),
+)
+
+
+def backfill_clock_seconds(apps, schema_editor):
+    # One UPDATE per distinct time text; a table holds at most a few thousand of them.
+    for model_name, seconds_field, text_field in CLOCK_TIMES:
+        model = apps.get_model("convergence", model_name)
+        for text in model.objects.values_list(text_field, flat=True).distinct():
+            seconds = to_seconds_of_day(text)
+            if seconds is not None:
+                model.objects.filter(**{text_field: text}).update(**{seconds_field: seconds})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0028_station_keys'),
+        ('stations', '0002_backfill_station_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='convergencebustorail',
+            name='arrival_to_station_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='convergencebustorail',
+            name='departure_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='convergencebustorail',
+            name='rishui_train_arrival_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='convergencerailtobus',
+            name='departure_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='convergencerailtobus',
+            name='rishui_train_arrival_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawbusdata',
+            name='bus_arrival_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawbusdata',
+            name='departure_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='convergencebustorail',
+            index=models.Index(fields=['station', 'makat', 'departure_seconds'], name='b2r_station_line_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='convergencerailtobus',
+            index=models.Index(fields=['station', 'makat', 'departure_seconds'], name='r2b_station_line_idx'),
+        ),
+        migrations.RunPython(backfill_clock_seconds, migrations.RunPython.noop),
+    ]
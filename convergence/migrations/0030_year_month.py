@@ -0,0 +1,82 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+from imports.ingest import to_year_month
+
+
+def backfill_year_month(apps, schema_editor):
+    for model_name in ("ConvergenceBusToRail", "ConvergenceRailToBus", "RawBusData"):
+        model = apps.get_model("convergence", model_name)
+        for year, month in model.objects.values_list("year", "month").distinct():
+            model.objects.filter(year=year, month=month).update(year_month=to_year_month(year, month))
+
+    OverrideConv = apps.get_model("convergence", "OverrideConv")
+    for effective_month in OverrideConv.objects.values_list("effective_month", flat=True).distinct():
+        year, _, month = effective_month.partition("-")
+        OverrideConv.objects.filter(effective_month=effective_month).update(year_month=to_year_month(year, month))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0029_clock_seconds'),
+        ('stations', '0002_backfill_station_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='convergencebustorail',
+            name='year_month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='convergencerailtobus',
+            name='year_month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='overrideconv',
+            name='year_month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawbusdata',
+            name='year_month',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_year_month, migrations.RunPython.noop),
+        # Added before the old indexes go: MySQL keeps an index on the station foreign key at all times.
+        migrations.AddIndex(
+            model_name='convergencebustorail',
+            index=models.Index(fields=['station', 'year_month'], name='b2r_station_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='convergencerailtobus',
+            index=models.Index(fields=['station', 'year_month'], name='r2b_station_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='overrideconv',
+            index=models.Index(fields=['station_name', 'year_month', 'changed_at'], name='override_station_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawbusdata',
+            index=models.Index(fields=['station', 'year_month'], name='raw_bus_station_ym_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='convergencebustorail',
+            name='b2r_station_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='convergencerailtobus',
+            name='r2b_station_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='overrideconv',
+            name='override_station_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rawbusdata',
+            name='raw_bus_station_month_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0030_year_month'),
+        ('stations', '0002_backfill_station_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationMonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('train_station_name', models.CharField(max_length=255)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('year_month', models.IntegerField()),
+                ('week_period', models.CharField(max_length=50)),
+                ('on_time_percentage_by_train_station', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('row_count', models.IntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stations.station')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year_month', 'station', 'week_period'), name='uniq_station_month_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0031_stationmonthsummary'),
+        ('stations', '0002_backfill_station_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConvergenceTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('train', 'train'), ('makat', 'makat'), ('station', 'station')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=255)),
+                ('week_period', models.CharField(blank=True, max_length=50)),
+                ('year_month', models.IntegerField(db_index=True)),
+                ('on_time_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stations.station')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('station', 'level', 'key', 'week_period', 'year_month'), name='uniq_convergence_trend_point')],
+            },
+        ),
+    ]
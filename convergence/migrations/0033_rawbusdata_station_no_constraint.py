@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0032_convergencetrend'),
+        ('stations', '0002_backfill_station_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rawbusdata',
+            name='station',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+    ]
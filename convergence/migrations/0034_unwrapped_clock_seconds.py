@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+from django.db import migrations
+
+from imports.ingest import to_seconds_of_day
+
+
+# (model, seconds field, text field), as in each model's CLOCK_TIMES.
+CLOCK_TIMES = (
+    ("ConvergenceBusToRail", "rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+    ("ConvergenceBusToRail", "departure_seconds", "departure_time"),
+    ("ConvergenceBusToRail", "arrival_to_station_seconds", "arrival_time_to_station"),
+    ("ConvergenceRailToBus", "rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+    ("ConvergenceRailToBus", "departure_seconds", "departure_time"),
+    ("RawBusData", "departure_seconds", "departure_time"),
+    ("RawBusData", "bus_arrival_seconds", "bus_arrival_time_to_station"),
+)
+
+
+def unwrap_clock_seconds(apps, schema_editor):
+    # Only texts with an hour past 23 were stored wrapped; every other row is already right.
+    for model_name, seconds_field, text_field in CLOCK_TIMES:
+        model = apps.get_model("convergence", model_name)
+        for text in model.objects.values_list(text_field, flat=True).distinct():
+            seconds = to_seconds_of_day(text)
+            if seconds is not None and seconds >= 24 * 3600:
+                model.objects.filter(**{text_field: text}).update(**{seconds_field: seconds})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0033_rawbusdata_station_no_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(unwrap_clock_seconds, migrations.RunPython.noop),
+    ]
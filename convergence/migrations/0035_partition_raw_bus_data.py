@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+from convergence import partitions
+from imports.ingest import to_year_month
+
+
+def fill_year_month(apps, schema_editor):
+    # Partitioning files every row under its year_month, so none may be left without one.
+    RawBusData = apps.get_model("convergence", "RawBusData")
+    for year, month in RawBusData.objects.filter(year_month=None).values_list("year", "month").distinct():
+        RawBusData.objects.filter(year=year, month=month).update(year_month=to_year_month(year, month))
+    unfiled = RawBusData.objects.filter(year_month=None).count()
+    if unfiled:
+        raise RuntimeError(
+            f"{unfiled} {partitions.TABLE} rows have no valid year/month; fix or delete them, then migrate again."
+        )
+
+
+def partition(apps, schema_editor):
+    # MySQL only. The primary key becomes (id, year_month), which migration state cannot
+    # express next to an AutoField id; state keeps id as the key and nothing else changes.
+    if not partitions.supported() or partitions.is_partitioned():
+        return
+    RawBusData = apps.get_model("convergence", "RawBusData")
+    partitions.partition_table(RawBusData.objects.values_list("year_month", flat=True).distinct())
+
+
+def unpartition(apps, schema_editor):
+    if partitions.is_partitioned():
+        partitions.unpartition_table()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convergence', '0034_unwrapped_clock_seconds'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_year_month, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='rawbusdata',
+            name='year_month',
+            field=models.IntegerField(),
+        ),
+        migrations.RunPython(partition, unpartition),
+    ]
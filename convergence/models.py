@@ -1,13 +1,70 @@
 from django.db import models
 from django.utils import timezone
 
+from imports.ingest import to_seconds_of_day, to_year_month
+from stations.lookup import StationKeyMixin
+
+
+def _with_derived(update_fields, sources, derived):
+    # update_or_create() saves only the fields it was given; carry derived columns along with their sources.
+    if update_fields is None or not set(sources) & set(update_fields):
+        return update_fields
+    return {*update_fields, *derived}
+
+
+class ClockTimeMixin:
+    """
+    For models that keep clock times as source text. CLOCK_TIMES lists (seconds field,
+    text field) pairs; save() keeps each seconds-of-day copy in step with its text, and
+    bulk writers add clock_seconds() to their rows.
+    """
+
+    CLOCK_TIMES = ()
+
+    def save(self, *args, **kwargs):
+        for seconds_field, text_field in self.CLOCK_TIMES:
+            setattr(self, seconds_field, to_seconds_of_day(getattr(self, text_field)))
+            kwargs["update_fields"] = _with_derived(kwargs.get("update_fields"), [text_field], [seconds_field])
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def clock_seconds(cls, values):
+        """Seconds-of-day values for the clock times in `values` (a row as a dict), as keyword arguments."""
+        return {seconds_field: to_seconds_of_day(values.get(text_field)) for seconds_field, text_field in cls.CLOCK_TIMES}
+
+
+class YearMonthMixin:
+    """
+    For models with separate year and month columns. save() keeps the packed YYYYMM
+    year_month key in step with them, and bulk writers add year_month_key() to their rows.
+    """
+
+    def save(self, *args, **kwargs):
+        self.year_month = to_year_month(self.year, self.month)
+        kwargs["update_fields"] = _with_derived(kwargs.get("update_fields"), ["year", "month"], ["year_month"])
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def year_month_key(cls, values):
+        """The year_month value for `values` (a row as a dict), as keyword arguments."""
+        return {"year_month": to_year_month(values.get("year"), values.get("month"))}
+
+
+class ConvergenceBusToRail(YearMonthMixin, ClockTimeMixin, StationKeyMixin, models.Model):
+    STATION_KEYS = (("station", "train_station_name", "train_station_code"),)
+    CLOCK_TIMES = (
+        ("rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+        ("departure_seconds", "departure_time"),
+        ("arrival_to_station_seconds", "arrival_time_to_station"),
+    )
 
-class ConvergenceBusToRail(models.Model):
     year = models.CharField(max_length=50, blank=True)
     month = models.IntegerField()
+    year_month = models.IntegerField(null=True, blank=True)
     week_period = models.CharField(max_length=50)
     train_station_name = models.CharField(max_length=255, blank=True)
     train_station_code = models.IntegerField(null=True, blank=True)
+    station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     rail_direction = models.CharField(max_length=255, blank=True)
     train_number = models.IntegerField(null=True, blank=True)
     signage = models.IntegerField(null=True, blank=True)
@@ -16,6 +73,7 @@ class ConvergenceBusToRail(models.Model):
     duration_from_current_station_to_hashalom = models.IntegerField(null=True, blank=True)
     is_bus_on_time = models.IntegerField(null=True, blank=True)
     rishui_train_arrival_time = models.CharField(max_length=32, blank=True)
+    rishui_train_arrival_seconds = models.IntegerField(null=True, blank=True)
     train_ascending_amount = models.IntegerField(null=True, blank=True)
 
     operator = models.CharField(max_length=255, blank=True)
@@ -23,9 +81,11 @@ class ConvergenceBusToRail(models.Model):
     direction = models.IntegerField(null=True, blank=True)
     alternative = models.CharField(max_length=255, blank=True)
     departure_time = models.CharField(max_length=32, blank=True)
+    departure_seconds = models.IntegerField(null=True, blank=True)
     avg_passengers_per_trip = models.FloatField(null=True, blank=True)
 
     arrival_time_to_station = models.CharField(max_length=32, blank=True)
+    arrival_to_station_seconds = models.IntegerField(null=True, blank=True)
     arrival_time_window = models.CharField(max_length=255, blank=True)
     minutes_gap_bus_to_rail = models.FloatField(null=True, blank=True)
     recommended_minutes = models.IntegerField(null=True, blank=True)
@@ -53,6 +113,10 @@ class ConvergenceBusToRail(models.Model):
                 name="uniq_cov_b2r_row",
             ),
         ]
+        indexes = [
+            models.Index(fields=("station", "year_month"), name="b2r_station_ym_idx"),
+            models.Index(fields=("station", "makat", "departure_seconds"), name="b2r_station_line_idx"),
+        ]
 
     def __str__(self):
         return (
@@ -61,12 +125,20 @@ class ConvergenceBusToRail(models.Model):
         )
 
 
-class ConvergenceRailToBus(models.Model):
+class ConvergenceRailToBus(YearMonthMixin, ClockTimeMixin, StationKeyMixin, models.Model):
+    STATION_KEYS = (("station", "train_station_name", "train_station_code"),)
+    CLOCK_TIMES = (
+        ("rishui_train_arrival_seconds", "rishui_train_arrival_time"),
+        ("departure_seconds", "departure_time"),
+    )
+
     year = models.CharField(max_length=50, blank=True)
     month = models.IntegerField()
+    year_month = models.IntegerField(null=True, blank=True)
     week_period = models.CharField(max_length=50)
     train_station_name = models.CharField(max_length=255, blank=True)
     train_station_code = models.IntegerField(null=True, blank=True)
+    station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     rail_direction = models.CharField(max_length=255, blank=True)
     train_number = models.IntegerField(null=True, blank=True)
     signage = models.IntegerField(null=True, blank=True)
@@ -75,6 +147,7 @@ class ConvergenceRailToBus(models.Model):
     duration_from_hashalom_to_current_station = models.IntegerField(null=True, blank=True)
     is_bus_on_time = models.IntegerField(null=True, blank=True)
     rishui_train_arrival_time = models.CharField(max_length=32, blank=True)
+    rishui_train_arrival_seconds = models.IntegerField(null=True, blank=True)
     train_descending_amount = models.IntegerField(null=True, blank=True)
 
     operator = models.CharField(max_length=255, blank=True)
@@ -82,6 +155,7 @@ class ConvergenceRailToBus(models.Model):
     direction = models.IntegerField(null=True, blank=True)
     alternative = models.CharField(max_length=255, blank=True)
     departure_time = models.CharField(max_length=32, blank=True)
+    departure_seconds = models.IntegerField(null=True, blank=True)
     avg_passengers_per_trip = models.FloatField(null=True, blank=True)
 
     minutes_gap_rail_to_bus = models.FloatField(null=True, blank=True)
@@ -103,6 +177,10 @@ class ConvergenceRailToBus(models.Model):
                 name="uniq_cov_r2b_row",
             ),
         ]
+        indexes = [
+            models.Index(fields=("station", "year_month"), name="r2b_station_ym_idx"),
+            models.Index(fields=("station", "makat", "departure_seconds"), name="r2b_station_line_idx"),
+        ]
 
     def __str__(self):
         return (
@@ -112,19 +190,38 @@ class ConvergenceRailToBus(models.Model):
 
 
 
-class RawBusData(models.Model):
+class RawBusData(YearMonthMixin, ClockTimeMixin, StationKeyMixin, models.Model):
+    STATION_KEYS = (("station", "train_station_name", None),)
+    CLOCK_TIMES = (
+        ("departure_seconds", "departure_time"),
+        ("bus_arrival_seconds", "bus_arrival_time_to_station"),
+    )
+
     year = models.CharField(max_length=50, blank=True)
     month = models.IntegerField()
+    # Not null: the table is partitioned by it on MySQL (migration 0035).
+    year_month = models.IntegerField()
     week_period = models.CharField(max_length=50)
     train_station_name = models.CharField(max_length=255)
+    # MySQL does not allow foreign key constraints on partitioned tables (see convergence.partitions).
+    station = models.ForeignKey(
+        "stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False, db_constraint=False
+    )
     makat = models.IntegerField(null=True, blank=True)
     direction = models.IntegerField(null=True, blank=True)
     alternative = models.CharField(max_length=255, blank=True)
     departure_time = models.CharField(max_length=32, blank=True)
+    departure_seconds = models.IntegerField(null=True, blank=True)
     bus_arrival_time_to_station = models.CharField(max_length=32, blank=True)
+    bus_arrival_seconds = models.IntegerField(null=True, blank=True)
     ride_counts = models.IntegerField(null=True, blank=True)
     rail_direction = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=("station", "year_month"), name="raw_bus_station_ym_idx"),
+        ]
+
 
 class OverrideConv(models.Model):
     week_period = models.CharField(max_length=50)
@@ -140,6 +237,8 @@ class OverrideConv(models.Model):
     to_train_number = models.IntegerField(null=True, blank=True)
     to_train_rishui_train_arrival_time = models.CharField(max_length=32, blank=True)
     effective_month = models.CharField(max_length=7, blank=True)
+    # effective_month ("YYYY-MM") packed as YYYYMM, kept in step by save().
+    year_month = models.IntegerField(null=True, blank=True)
     change_reason = models.TextField(blank=True)
     changed_by = models.CharField(max_length=255, blank=True)
     changed_at = models.DateTimeField(default=timezone.now)
@@ -165,3 +264,61 @@ class OverrideConv(models.Model):
                 name="uniq_override_conv_default_key",
             ),
         ]
+        indexes = [
+            models.Index(fields=("station_name", "year_month", "changed_at"), name="override_station_ym_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        year, _, month = self.effective_month.partition("-")
+        self.year_month = to_year_month(year, month)
+        kwargs["update_fields"] = _with_derived(kwargs.get("update_fields"), ["effective_month"], ["year_month"])
+        super().save(*args, **kwargs)
+
+
+class StationMonthSummary(models.Model):
+    # One row per station, month and week period of ConvergenceBusToRail, for main_page's
+    # station sync chart. Built by convergence.summary; never edited by hand.
+    station = models.ForeignKey("stations.Station", on_delete=models.CASCADE, related_name="+")
+    train_station_name = models.CharField(max_length=255)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    year_month = models.IntegerField()
+    week_period = models.CharField(max_length=50)
+    on_time_percentage_by_train_station = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    row_count = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("year_month", "station", "week_period"), name="uniq_station_month_summary"),
+        ]
+
+    def __str__(self):
+        return f"{self.train_station_name} {self.month}/{self.year} ({self.week_period})"
+
+
+class ConvergenceTrend(models.Model):
+    # One point of a month-by-month on-time series from ConvergenceBusToRail, read by the
+    # trend charts of the convergence page. Built by convergence.summary; never edited by hand.
+    class Level(models.TextChoices):
+        TRAIN = "train", "train"
+        MAKAT = "makat", "makat"
+        STATION = "station", "station"
+
+    station = models.ForeignKey("stations.Station", on_delete=models.CASCADE, related_name="+")
+    level = models.CharField(max_length=10, choices=Level.choices)
+    # train: "<train number>||<HH:MM licensed arrival>||<rail direction>"; makat: the signage; station: "".
+    key = models.CharField(max_length=255, blank=True)
+    # "" for series that span every week period (makat and station).
+    week_period = models.CharField(max_length=50, blank=True)
+    year_month = models.IntegerField(db_index=True)
+    on_time_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("station", "level", "key", "week_period", "year_month"), name="uniq_convergence_trend_point"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.key} {self.year_month}: {self.on_time_percentage}"
@@ -0,0 +1,236 @@
+"""
+RANGE partitioning of convergence_rawbusdata by year_month, on MySQL only.
+
+Each month has a partition p<YYYYMM> holding that month's year_month only. Months without
+one sit in the lt<YYYYMM> gap partition below the next month that has one, and pmax catches
+anything newer. A month swap exchanges a whole partition, so p<YYYYMM> must never hold
+another month. Other backends keep one plain table: is_partitioned() is False there, the
+helpers do nothing and callers fall back to row deletes.
+"""
+
+from collections import defaultdict
+
+from django.db import connection
+
+from convergence.models import RawBusData
+
+TABLE = RawBusData._meta.db_table
+CATCH_ALL = "pmax"
+
+
+def supported():
+    return connection.vendor == "mysql"
+
+
+def partition_name(year_month):
+    return f"p{year_month}"
+
+
+def gap_name(year_month):
+    return f"lt{year_month}"
+
+
+def previous_month(year_month):
+    year, month = divmod(year_month, 100)
+    return year_month - 1 if month > 1 else (year - 1) * 100 + 12
+
+
+def _holds_earlier_months(lower, year_month):
+    # A partition starting at `lower` also holds earlier months unless it starts past the
+    # previous month (year_month values between months, like 202513, never occur).
+    return lower is None or lower <= previous_month(year_month)
+
+
+def partition_by_clause(year_months):
+    """PARTITION BY clause with one partition per YYYYMM month, the gaps between them and the catch-all."""
+    partitions = []
+    lower = None
+    for year_month in sorted(set(year_months)):
+        if _holds_earlier_months(lower, year_month):
+            partitions.append(f"PARTITION {gap_name(year_month)} VALUES LESS THAN ({year_month})")
+        partitions.append(f"PARTITION {partition_name(year_month)} VALUES LESS THAN ({year_month + 1})")
+        lower = year_month + 1
+    partitions.append(f"PARTITION {CATCH_ALL} VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (year_month) (" + ", ".join(partitions) + ")"
+
+
+def split_clause(bounds, year_month):
+    """
+    REORGANIZE clause giving year_month a partition of its own, or None if it has one.
+    The partition holding it is split at both ends, so earlier and later months stay out.
+    `bounds` are (name, upper bound) pairs in order, the catch-all's bound being None.
+    """
+    lower = None
+    for name, bound in bounds:
+        if bound is None or bound > year_month:
+            earlier = _holds_earlier_months(lower, year_month)
+            if bound == year_month + 1 and not earlier:
+                return None
+            parts = []
+            if earlier:
+                parts.append(f"PARTITION {gap_name(year_month)} VALUES LESS THAN ({year_month})")
+            parts.append(f"PARTITION {partition_name(year_month)} VALUES LESS THAN ({year_month + 1})")
+            if bound != year_month + 1:
+                upper = "MAXVALUE" if bound is None else f"({bound})"
+                parts.append(f"PARTITION {name} VALUES LESS THAN {upper}")
+            return f"REORGANIZE PARTITION {name} INTO (" + ", ".join(parts) + ")"
+        lower = bound
+    return None
+
+
+def partition_bounds():
+    """(name, upper bound) of each partition in order; empty if the table is not partitioned."""
+    if not supported():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [TABLE],
+        )
+        return [(name, None if bound == "MAXVALUE" else int(bound)) for name, bound in cursor.fetchall()]
+
+
+def is_partitioned():
+    return bool(partition_bounds())
+
+
+def partition_table(year_months):
+    """
+    Partition the table with one partition per given month; run by migration 0035.
+    MySQL requires the partitioning column in the primary key, so the key becomes
+    (id, year_month); the migration makes year_month NOT NULL first.
+    """
+    table = connection.ops.quote_name(TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, year_month)")
+        cursor.execute(f"ALTER TABLE {table} {partition_by_clause(year_months)}")
+
+
+def unpartition_table():
+    """Undo partition_table(): one plain table keyed by id again."""
+    table = connection.ops.quote_name(TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+
+
+def ensure_month_partitions(year_months):
+    """Split a partition of its own off for each month missing one; returns the names created."""
+    if not is_partitioned():
+        return []
+    table = connection.ops.quote_name(TABLE)
+    created = []
+    with connection.cursor() as cursor:
+        for year_month in sorted(set(year_months) - {None}):
+            clause = split_clause(partition_bounds(), year_month)
+            if clause is not None:
+                cursor.execute(f"ALTER TABLE {table} {clause}")
+                created.append(partition_name(year_month))
+    return created
+
+
+def reserve_ids(count):
+    """
+    Take `count` consecutive ids from the table's AUTO_INCREMENT, for rows written to a side
+    table. The table is locked while the counter moves past them, so no other writer gets them.
+    """
+    table = connection.ops.quote_name(TABLE)
+    with connection.cursor() as cursor:
+        if not connection.mysql_is_mariadb:
+            # MySQL 8 caches information_schema table stats; the counter must be read live.
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        cursor.execute(f"LOCK TABLES {table} WRITE")
+        try:
+            # The counter also covers ids reserved for side tables not swapped in yet.
+            cursor.execute(
+                "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [TABLE],
+            )
+            counter = cursor.fetchone()[0] or 1
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+            first = max(counter, cursor.fetchone()[0])
+            cursor.execute(f"ALTER TABLE {table} AUTO_INCREMENT = {first + count}")
+        finally:
+            cursor.execute("UNLOCK TABLES")
+    return range(first, first + count)
+
+
+class MonthSwap:
+    """
+    Replaces whole months of a partitioned table. Rows are loaded into one side table per
+    month; exchange() then swaps each side table with its month's partition, so readers see
+    either the old month or the new one. DDL commits implicitly on MySQL, so this must run
+    outside transaction.atomic().
+
+    Side tables number their rows from 1; exchange() moves them onto ids reserved once for
+    the whole swap, rather than taking the table lock for every batch added.
+    """
+
+    def __init__(self):
+        self.staged = {}
+        self.fields = [field for field in RawBusData._meta.concrete_fields if not field.primary_key]
+
+    def add(self, objs):
+        by_month = defaultdict(list)
+        for obj in objs:
+            by_month[obj.year_month].append(obj)
+        for year_month, month_objs in by_month.items():
+            self._insert(self._side_table(year_month), month_objs)
+
+    def exchange(self):
+        """Swap every staged month into place; returns the number of rows replaced."""
+        table = connection.ops.quote_name(TABLE)
+        replaced = 0
+        self._renumber()
+        ensure_month_partitions(self.staged)
+        with connection.cursor() as cursor:
+            for year_month, side in sorted(self.staged.items()):
+                cursor.execute(
+                    f"ALTER TABLE {table} EXCHANGE PARTITION {partition_name(year_month)} "
+                    f"WITH TABLE {connection.ops.quote_name(side)}"
+                )
+                cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(side)}")
+                replaced += cursor.fetchone()[0]
+        return replaced
+
+    def discard(self):
+        with connection.cursor() as cursor:
+            for side in self.staged.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(side)}")
+        self.staged = {}
+
+    def _side_table(self, year_month):
+        if year_month not in self.staged:
+            side = connection.ops.quote_name(f"{TABLE}_swap_{year_month}")
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {side}")
+                cursor.execute(f"CREATE TABLE {side} LIKE {connection.ops.quote_name(TABLE)}")
+                cursor.execute(f"ALTER TABLE {side} REMOVE PARTITIONING")
+            self.staged[year_month] = f"{TABLE}_swap_{year_month}"
+        return self.staged[year_month]
+
+    def _renumber(self):
+        spans = {}
+        with connection.cursor() as cursor:
+            for year_month, side in sorted(self.staged.items()):
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(side)}")
+                spans[side] = cursor.fetchone()[0]
+        offset = reserve_ids(sum(spans.values())).start - 1
+        with connection.cursor() as cursor:
+            for side, span in spans.items():
+                # Highest ids first, so no row is moved onto one not moved yet.
+                cursor.execute(f"UPDATE {connection.ops.quote_name(side)} SET id = id + {offset} ORDER BY id DESC")
+                offset += span
+
+    def _insert(self, table, objs):
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in self.fields)
+        placeholders = ", ".join(["%s"] * len(self.fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {connection.ops.quote_name(table)} ({columns}) VALUES ({placeholders})",
+                [[field.get_db_prep_save(getattr(obj, field.attname), connection) for field in self.fields]
+                 for obj in objs],
+            )
@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models import Count, Max
+
+from convergence.models import ConvergenceBusToRail, ConvergenceTrend, StationMonthSummary
+from stations.models import Station
+
+
+def build_month_summaries(year_months):
+    """Rebuild every table derived from ConvergenceBusToRail for the given YYYYMM months."""
+    return build_station_months(year_months), build_trends(year_months)
+
+
+def build_station_months(year_months):
+    """Rebuild the StationMonthSummary rows of the given YYYYMM months; returns the number of rows written."""
+    year_months = sorted(set(year_months) - {None})
+    if not year_months:
+        return 0
+    groups = list(
+        ConvergenceBusToRail.objects.filter(year_month__in=year_months)
+        .exclude(station=None)
+        .values("year_month", "station", "week_period")
+        # The station percentage repeats on every row of a station, month and week period.
+        .annotate(on_time=Max("on_time_percentage_by_train_station"), rows=Count("id"))
+        .order_by()
+    )
+    names = dict(Station.objects.filter(pk__in={group["station"] for group in groups}).values_list("pk", "name"))
+    summaries = [
+        StationMonthSummary(
+            station_id=group["station"],
+            train_station_name=names[group["station"]],
+            year=group["year_month"] // 100,
+            month=group["year_month"] % 100,
+            year_month=group["year_month"],
+            week_period=group["week_period"],
+            on_time_percentage_by_train_station=group["on_time"],
+            row_count=group["rows"],
+        )
+        for group in groups
+    ]
+    with transaction.atomic():
+        StationMonthSummary.objects.filter(year_month__in=year_months).delete()
+        StationMonthSummary.objects.bulk_create(summaries)
+    return len(summaries)
+
+
+def train_trend_key(train_number, arrival_seconds, rail_direction):
+    """Key of a train's series: its number, licensed arrival as HH:MM and rail direction; None if one is missing."""
+    rail_direction = " ".join(str(rail_direction or "").split())
+    if train_number is None or arrival_seconds is None or not rail_direction:
+        return None
+    hours, minutes = divmod(arrival_seconds // 60, 60)
+    return f"{train_number}||{hours:02d}:{minutes:02d}||{rail_direction}"
+
+
+def build_trends(year_months):
+    """
+    Rebuild the ConvergenceTrend points of the given YYYYMM months; returns the number written.
+
+    Each series takes the first percentage found in its month, in row order, as the
+    trend charts did when they read every row.
+    """
+    year_months = sorted(set(year_months) - {None})
+    if not year_months:
+        return 0
+    rows = (
+        ConvergenceBusToRail.objects.filter(year_month__in=year_months)
+        .exclude(station=None)
+        .order_by("id")
+        .values_list(
+            "station_id", "year_month", "week_period", "train_number", "rishui_train_arrival_seconds",
+            "rail_direction", "signage", "on_time_percentage_by_train", "on_time_percentage_by_makat",
+            "on_time_percentage_by_train_station",
+        )
+    )
+    points = {}
+    for (station_id, year_month, week_period, train_number, arrival_seconds, rail_direction, signage,
+         by_train, by_makat, by_station) in rows.iterator():
+        series = [(ConvergenceTrend.Level.STATION, "", "", by_station)]
+        if signage is not None:
+            series.append((ConvergenceTrend.Level.MAKAT, str(signage), "", by_makat))
+        train_key = train_trend_key(train_number, arrival_seconds, rail_direction)
+        if train_key is not None:
+            series.append((ConvergenceTrend.Level.TRAIN, train_key, week_period, by_train))
+        for level, key, week, value in series:
+            if value is not None:
+                points.setdefault((station_id, level, key, week, year_month), value)
+
+    trends = [
+        ConvergenceTrend(
+            station_id=station_id, level=level, key=key, week_period=week, year_month=year_month,
+            on_time_percentage=value,
+        )
+        for (station_id, level, key, week, year_month), value in points.items()
+    ]
+    with transaction.atomic():
+        ConvergenceTrend.objects.filter(year_month__in=year_months).delete()
+        ConvergenceTrend.objects.bulk_create(trends, batch_size=5000)
+    return len(trends)
@@ -1,13 +1,35 @@
+import importlib
 import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-from django.test import Client, TestCase
+import pandas as pd
+from django.apps import apps
+from django.contrib.auth.models import Permission, User
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
 
+from convergence import partitions
 from convergence.management.commands.import_convergence import (
+    BUS_TO_RAIL_FIELD_TYPES,
     BUS_TO_RAIL_OPTIONAL,
     RAIL_TO_BUS_OPTIONAL,
     Command,
 )
-from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus
+from convergence.models import (
+    ConvergenceBusToRail,
+    ConvergenceRailToBus,
+    ConvergenceTrend,
+    OverrideConv,
+    RawBusData,
+    StationMonthSummary,
+)
+from imports.models import ImportManifest
 
 
 class ConvergenceViewTests(TestCase):
@@ -117,3 +139,890 @@ class ConvergenceImportNormalizeTests(TestCase):
         self.assertEqual(rail_payload["is_gold_train"], "לא")
         self.assertEqual(rail_payload["is_bus_on_time"], 0)
         self.assertEqual(rail_payload["rishui_train_arrival_time"], "09:20")
+
+
+class ConvergenceImportNormalizeFrameTests(TestCase):
+    def test_frame_matches_row_normalization_and_errors(self):
+        cmd = Command()
+        df = pd.DataFrame(
+            [
+                {
+                    "שנה": 2026,
+                    "חודש": 2,
+                    "תקופת שבוע": " יום חול ",
+                    "שם תחנת הרכבת": "קרית מלאכי",
+                    "כיוון נסיעת הרכבת": "לכיוון תל אביב",
+                    "מספר הרכבת": "20.0",
+                    "קוד תחנת הרכבת": None,
+                    "קוד תחנת רכבת": "6150",
+                    "ממוצע נוסעים לנסיעה": "1,234.5",
+                    "אחוז הנסיעות שעמדו בזמנים": "75.5%",
+                },
+                {"שנה": None, "חודש": None, "תקופת שבוע": None},
+                {
+                    "שנה": 2026,
+                    "חודש": 2,
+                    "תקופת שבוע": "יום חול",
+                    "שם תחנת הרכבת": "  ",
+                    "כיוון נסיעת הרכבת": "לכיוון תל אביב",
+                },
+            ]
+        )
+
+        frame_out = cmd._normalize_frame(df, BUS_TO_RAIL_OPTIONAL, BUS_TO_RAIL_FIELD_TYPES, "f.xlsx", "bus_to_rail")
+        row_out = cmd._normalize_rows(df, BUS_TO_RAIL_OPTIONAL, "f.xlsx", "bus_to_rail")
+
+        self.assertEqual(len(frame_out), 2)
+        self.assertEqual(frame_out[0][0], row_out[0][0])
+        payload = frame_out[0][0]
+        self.assertEqual(payload["week_period"], "יום חול")
+        self.assertEqual(payload["train_number"], 20)
+        self.assertEqual(payload["train_station_code"], 6150)
+        self.assertEqual(payload["avg_passengers_per_trip"], 1234.5)
+        self.assertEqual(payload["on_time_percentage"], Decimal("75.5"))
+        self.assertIsNone(frame_out[1][0])
+        self.assertEqual(str(frame_out[1][1]), "f.xlsx/bus_to_rail row 4: train_station_name cannot be blank.")
+        self.assertEqual(str(frame_out[1][1]), str(row_out[1][1]))
+
+
+class ConvergenceXlsxMixin:
+    def _write_xlsx(self, bus_rows, rail_rows) -> Path:
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        try:
+            path = Path(tmp.name)
+            with pd.ExcelWriter(path) as writer:
+                pd.DataFrame(bus_rows).to_excel(writer, sheet_name="bus_to_rail", index=False)
+                pd.DataFrame(rail_rows).to_excel(writer, sheet_name="rail_to_bus", index=False)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def _row(self, train_number, departure_time, **extra):
+        row = {
+            "שנה": 2026,
+            "חודש": 2,
+            "תקופת שבוע": "יום חול",
+            "שם תחנת הרכבת": "קרית מלאכי",
+            "כיוון נסיעת הרכבת": "לכיוון תל אביב",
+            "מספר הרכבת": train_number,
+            'מק"ט': 36044,
+            "שעת יציאה מתחנת המוצא": departure_time,
+        }
+        row.update(extra)
+        return row
+
+    def _import(self, path, *args):
+        out = StringIO()
+        call_command("import_convergence", "--file", str(path), *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+
+class ConvergenceImportBulkUpsertTests(ConvergenceXlsxMixin, TestCase):
+    def test_batched_upsert_reports_inserted_and_updated(self):
+        ConvergenceBusToRail.objects.create(
+            year="2026",
+            month=2,
+            week_period="יום חול",
+            train_station_name="קרית מלאכי",
+            rail_direction="לכיוון תל אביב",
+            train_number=20,
+            makat=36044,
+            departure_time="05:00",
+            observations_count=1,
+        )
+        path = self._write_xlsx(
+            [
+                self._row(20, "05:00", **{"מספר תצפיות": 20, "שעת הגעה לתחנה (בממוצע)": "05:22:16"}),
+                self._row(22, "05:55", **{"מספר תצפיות": 18, "שעת הגעה לתחנה (בממוצע)": "06:17:50"}),
+                self._row(24, "06:30", **{"מספר תצפיות": 5, "שעת הגעה לתחנה (בממוצע)": "06:52:00"}),
+            ],
+            [
+                self._row(64, "08:25", **{"הפרש בדקות (מרכבת לאוטובוס)": 25.0}),
+                self._row(None, "06:25", **{"הפרש בדקות (מרכבת לאוטובוס)": 3.0}),
+            ],
+        )
+
+        output = self._import(path, "--batch-size", "2")
+
+        self.assertIn("Inserted: 4", output)
+        self.assertIn("Updated: 1", output)
+        self.assertEqual(ConvergenceBusToRail.objects.count(), 3)
+        self.assertEqual(ConvergenceRailToBus.objects.count(), 2)
+        self.assertEqual(ConvergenceBusToRail.objects.get(train_number=20).observations_count, 20)
+
+        ConvergenceRailToBus.objects.filter(train_number__isnull=True).update(minutes_gap_rail_to_bus=9.0)
+        output = self._import(path, "--batch-size", "2", "--force")
+
+        self.assertIn("Inserted: 0", output)
+        self.assertIn("Updated: 1", output)
+        self.assertIn("Unchanged: 4", output)
+        self.assertEqual(ConvergenceBusToRail.objects.count(), 3)
+        self.assertEqual(ConvergenceRailToBus.objects.count(), 2)
+        self.assertEqual(ConvergenceRailToBus.objects.get(train_number__isnull=True).minutes_gap_rail_to_bus, 3.0)
+
+    def test_unchanged_rows_are_not_written(self):
+        path = self._write_xlsx([self._row(20, "05:00"), self._row(22, "05:55")], [])
+        self._import(path)
+
+        with mock.patch.object(Command, "_write_batch") as write_batch:
+            output = self._import(path, "--force")
+
+        write_batch.assert_not_called()
+        self.assertIn("Unchanged: 2", output)
+
+    def test_duplicate_keys_within_batch_count_as_update(self):
+        path = self._write_xlsx(
+            [
+                self._row(20, "05:00", **{"מספר תצפיות": 1, "שעת הגעה לתחנה (בממוצע)": "05:22:16"}),
+                self._row(20, "05:00", **{"מספר תצפיות": 2, "שעת הגעה לתחנה (בממוצע)": "05:22:16"}),
+            ],
+            [],
+        )
+
+        output = self._import(path)
+
+        self.assertIn("Inserted: 1", output)
+        self.assertIn("Updated: 1", output)
+        self.assertEqual(ConvergenceBusToRail.objects.get(train_number=20).observations_count, 2)
+
+
+    def test_dry_run_separates_unchanged_rows(self):
+        path = self._write_xlsx(
+            [
+                self._row(20, "05:00", **{"אחוז הנסיעות שעמדו בזמנים": 55.00000000000001}),
+                self._row(21, "06:00", **{"אחוז הנסיעות שעמדו בזמנים": 40}),
+            ],
+            [],
+        )
+        self._import(path)
+        ConvergenceBusToRail.objects.filter(train_number=21).update(on_time_percentage=Decimal("41"))
+
+        output = self._import(path, "--dry-run", "--force")
+
+        self.assertIn("Inserted: 0", output)
+        self.assertIn("Updated: 1", output)
+        self.assertIn("Unchanged: 1", output)
+
+    def test_dry_run_counts_keys_repeated_in_later_batches_like_a_real_run(self):
+        path = self._write_xlsx(
+            [
+                self._row(20, "05:00", **{"מספר תצפיות": 1}),
+                self._row(22, "05:55", **{"מספר תצפיות": 1}),
+                self._row(20, "05:00", **{"מספר תצפיות": 1}),
+                self._row(22, "05:55", **{"מספר תצפיות": 2}),
+            ],
+            [],
+        )
+
+        dry_run = self._import(path, "--batch-size", "2", "--dry-run")
+        real_run = self._import(path, "--batch-size", "2")
+
+        for output in (dry_run, real_run):
+            self.assertIn("Inserted: 2", output)
+            self.assertIn("Updated: 1", output)
+            self.assertIn("Unchanged: 1", output)
+
+    def test_workers_write_files_in_order(self):
+        first = self._write_xlsx(
+            [self._row(20, "05:00", **{"מספר תצפיות": 1, "שעת הגעה לתחנה (בממוצע)": "05:22:16"})],
+            [],
+        )
+        second = self._write_xlsx(
+            [self._row(20, "05:00", **{"מספר תצפיות": 2, "שעת הגעה לתחנה (בממוצע)": "05:22:16"})],
+            [self._row(64, "08:25", **{"הפרש בדקות (מרכבת לאוטובוס)": 25.0})],
+        )
+        out = StringIO()
+
+        call_command(
+            "import_convergence",
+            "--file", str(first),
+            "--file", str(second),
+            "--workers", "2",
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        self.assertIn("Convergence XLSX files processed: 2", out.getvalue())
+        self.assertEqual(ConvergenceBusToRail.objects.count(), 1)
+        self.assertEqual(ConvergenceRailToBus.objects.count(), 1)
+        # Files are written in sorted path order regardless of worker completion order.
+        last = max(first, second)
+        expected = 2 if last == second else 1
+        self.assertEqual(ConvergenceBusToRail.objects.get(train_number=20).observations_count, expected)
+
+
+
+class ConvergenceImportSheetCacheTests(ConvergenceXlsxMixin, TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        settings_override = override_settings(SHEET_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_second_run_loads_sheets_from_cache(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [self._row(64, "08:25")])
+
+        first = self._import(path, "--dry-run")
+        self.assertEqual(len(list(self.cache_dir.rglob("*.pkl"))), 2)
+
+        with mock.patch("shiluvim.sheet_cache.pd.ExcelFile", side_effect=AssertionError("cache miss")):
+            second = self._import(path, "--dry-run")
+
+        self.assertEqual(first, second)
+        self.assertIn("Inserted: 2", second)
+
+    def test_changed_file_is_reparsed(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [])
+        self._import(path, "--dry-run")
+
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame([self._row(20, "05:00"), self._row(21, "06:00")]).to_excel(
+                writer, sheet_name="bus_to_rail", index=False
+            )
+            pd.DataFrame([]).to_excel(writer, sheet_name="rail_to_bus", index=False)
+
+        self.assertIn("Convergence rows processed: 2", self._import(path, "--dry-run"))
+
+    def test_entries_others_can_write_are_not_loaded(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [])
+        self._import(path, "--dry-run")
+        entries = list(self.cache_dir.rglob("*.pkl"))
+        self.assertEqual(entries[0].parent.stat().st_mode & 0o777, 0o700)
+        for entry in entries:
+            entry.chmod(0o666)
+
+        with mock.patch("shiluvim.sheet_cache.pickle.load") as load:
+            self.assertIn("Convergence rows processed: 1", self._import(path, "--dry-run"))
+
+        load.assert_not_called()
+
+    def test_corrupt_entry_is_a_cache_miss(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [])
+        self._import(path, "--dry-run")
+        for entry in self.cache_dir.rglob("*.pkl"):
+            entry.write_bytes(b"\x80\x05truncated")
+
+        self.assertIn("Convergence rows processed: 1", self._import(path, "--dry-run"))
+
+    def test_no_cache_skips_cache_directory(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [])
+
+        self._import(path, "--dry-run", "--no-cache")
+
+        self.assertEqual(list(self.cache_dir.rglob("*.pkl")), [])
+
+
+class RawBusCsvMixin:
+    def _write_csv(self, content: str) -> Path:
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, encoding="utf-8", newline="")
+        try:
+            tmp.write(content)
+            path = Path(tmp.name)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def _import(self, path, *args):
+        out = StringIO()
+        call_command("import_convergence", "--raw-bus-file", str(path), *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def _csv(self, *rows):
+        header = "Year,Month,WeekPeriod,Train_Station_Name,OfficeLineID,Direction,Alternative,TripStartTime,ArrivalTime,ride_counts\n"
+        return self._write_csv(header + "".join(rows))
+
+
+class RawBusDataImportTests(RawBusCsvMixin, TestCase):
+    def test_reimport_replaces_month_slice(self):
+        RawBusData.objects.create(year="2026", month=1, week_period="יום חול", train_station_name="אשקלון")
+        RawBusData.objects.create(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון")
+        path = self._csv(
+            "2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n",
+            "2026,2,יום חול,אשקלון,45012,1,#,08:25,08:52:03,18\n",
+        )
+
+        self._import(path, "--batch-size", "1")
+        output = self._import(path, "--batch-size", "1", "--force")
+
+        self.assertIn("RawBusData inserted: 2", output)
+        self.assertIn("RawBusData replaced (deleted): 2", output)
+        self.assertEqual(RawBusData.objects.filter(year="2026", month=2).count(), 2)
+        self.assertEqual(RawBusData.objects.filter(year="2026", month=1).count(), 1)
+
+    def test_append_mode_keeps_existing_rows(self):
+        path = self._csv("2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+
+        self._import(path)
+        self._import(path, "--raw-bus-mode", "append", "--force")
+
+        self.assertEqual(RawBusData.objects.count(), 2)
+
+    def test_cp1255_file_is_read(self):
+        path = self._csv()
+        header = path.read_text(encoding="utf-8")
+        path.write_bytes((header + "2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n").encode("cp1255"))
+
+        self._import(path)
+
+        self.assertTrue(RawBusData.objects.filter(train_station_name="אשקלון", week_period="יום חול").exists())
+
+    def test_file_failing_to_decode_part_way_is_rolled_back(self):
+        RawBusData.objects.create(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון")
+        path = self._csv("2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+        with path.open("ab") as fp:
+            fp.write(b"2026,2,\xff\xfe,x,1,1,#,14:50,15:15:17,15\n")
+
+        output = self._import(path, "--batch-size", "1")
+
+        self.assertIn("RawBusData CSV files processed: 1", output)
+        self.assertIn("RawBusData inserted: 0", output)
+        self.assertEqual(RawBusData.objects.count(), 1)
+        self.assertFalse(ImportManifest.objects.exists())
+
+    def test_dry_run_reports_replacement_without_writing(self):
+        RawBusData.objects.create(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון")
+        path = self._csv("2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+
+        output = self._import(path, "--dry-run")
+
+        self.assertIn("RawBusData replaced (deleted): 1", output)
+        self.assertEqual(RawBusData.objects.count(), 1)
+
+    def test_row_without_a_valid_month_is_invalid(self):
+        path = self._csv(
+            "2026,13,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n",
+            "2026,2,יום חול,אשקלון,45012,1,#,08:25,08:52:03,18\n",
+        )
+
+        output = self._import(path)
+
+        self.assertIn("Invalid: 1", output)
+        self.assertEqual(list(RawBusData.objects.values_list("year_month", flat=True)), [202602])
+
+
+class RecordingCursor:
+    """Stands in for a MySQL cursor: records the SQL and answers fetches from `results` in order."""
+
+    def __init__(self, results):
+        self.results, self.sql = list(results), []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+
+    def executemany(self, sql, rows):
+        self.sql.append(sql)
+        self.rows = list(rows)
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+class RawBusDataPartitionTests(RawBusCsvMixin, TestCase):
+    def test_partition_clauses(self):
+        self.assertEqual(
+            partitions.partition_by_clause([202603, 202512, 202601, 202603]),
+            "PARTITION BY RANGE (year_month) (PARTITION lt202512 VALUES LESS THAN (202512), "
+            "PARTITION p202512 VALUES LESS THAN (202513), PARTITION p202601 VALUES LESS THAN (202602), "
+            "PARTITION lt202603 VALUES LESS THAN (202603), PARTITION p202603 VALUES LESS THAN (202604), "
+            "PARTITION pmax VALUES LESS THAN MAXVALUE)",
+        )
+        bounds = [("lt202602", 202602), ("p202602", 202603), ("p202605", 202606), ("pmax", None)]
+        self.assertIsNone(partitions.split_clause(bounds, 202602))
+        self.assertEqual(
+            partitions.split_clause(bounds, 202603),
+            "REORGANIZE PARTITION p202605 INTO (PARTITION p202603 VALUES LESS THAN (202604), "
+            "PARTITION p202605 VALUES LESS THAN (202606))",
+        )
+        self.assertEqual(
+            partitions.split_clause(bounds, 202701),
+            "REORGANIZE PARTITION pmax INTO (PARTITION lt202701 VALUES LESS THAN (202701), "
+            "PARTITION p202701 VALUES LESS THAN (202702), PARTITION pmax VALUES LESS THAN MAXVALUE)",
+        )
+
+    def test_partition_shared_with_earlier_months_is_split_at_both_ends(self):
+        # p202605 reaches down to 202603, so 202604 shares it; only 202603 has its own.
+        bounds = [("lt202603", 202603), ("p202603", 202604), ("p202605", 202606), ("pmax", None)]
+
+        self.assertEqual(
+            partitions.split_clause(bounds, 202605),
+            "REORGANIZE PARTITION p202605 INTO (PARTITION lt202605 VALUES LESS THAN (202605), "
+            "PARTITION p202605 VALUES LESS THAN (202606))",
+        )
+        self.assertEqual(
+            partitions.split_clause(bounds, 202604),
+            "REORGANIZE PARTITION p202605 INTO (PARTITION p202604 VALUES LESS THAN (202605), "
+            "PARTITION p202605 VALUES LESS THAN (202606))",
+        )
+        self.assertIsNone(partitions.split_clause([("p202512", 202513), ("p202601", 202602)], 202601))
+
+    def test_other_backends_keep_one_table(self):
+        out = StringIO()
+        call_command("partition_raw_bus_data", "--month", "2026-03", stdout=out)
+
+        self.assertIn("does not support partitioning", out.getvalue())
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.ensure_month_partitions([202603]), [])
+
+    def test_invalid_month_option_fails(self):
+        with self.assertRaises(CommandError):
+            call_command("partition_raw_bus_data", "--month", "2026-13", stdout=StringIO())
+
+    def test_station_key_has_no_database_constraint(self):
+        # MySQL refuses to partition a table with foreign key constraints.
+        self.assertFalse(RawBusData._meta.get_field("station").db_constraint)
+
+    def test_import_inside_a_transaction_splits_partitions_after_commit(self):
+        path = self._csv("2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+
+        with mock.patch.object(partitions, "ensure_month_partitions", return_value=[]) as ensure:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._import(path)
+                    ensure.assert_not_called()
+
+        ensure.assert_called_once_with([202602])
+
+    def test_month_swap_sql(self):
+        cursor = RecordingCursor([
+            (2,),                           # MAX(id) of the side table
+            (41,), (12,),                   # AUTO_INCREMENT, MAX(id) + 1
+            [("pmax", "MAXVALUE")],         # is_partitioned()
+            [("pmax", "MAXVALUE")],         # bounds for the split
+            (7,),                           # old rows swapped out
+        ])
+        fake = SimpleNamespace(vendor="mysql", mysql_is_mariadb=False, ops=connection.ops, cursor=lambda: cursor)
+        rows = [
+            RawBusData(year="2026", month=2, year_month=202602, week_period="יום חול", train_station_name="אשקלון")
+            for _ in range(2)
+        ]
+
+        with mock.patch.object(partitions, "connection", fake):
+            swap = partitions.MonthSwap()
+            # Two batches of one file, one id reservation.
+            swap.add(rows[:1])
+            swap.add(rows[1:])
+            replaced = swap.exchange()
+            swap.discard()
+
+        table = connection.ops.quote_name("convergence_rawbusdata")
+        side = connection.ops.quote_name("convergence_rawbusdata_swap_202602")
+        self.assertEqual(replaced, 7)
+        self.assertEqual([sql.split(" (")[0] if sql.startswith("INSERT") else sql for sql in cursor.sql if "information_schema." not in sql], [
+            f"DROP TABLE IF EXISTS {side}",
+            f"CREATE TABLE {side} LIKE {table}",
+            f"ALTER TABLE {side} REMOVE PARTITIONING",
+            f"INSERT INTO {side}",
+            f"INSERT INTO {side}",
+            f"SELECT COALESCE(MAX(id), 0) FROM {side}",
+            "SET SESSION information_schema_stats_expiry = 0",
+            f"LOCK TABLES {table} WRITE",
+            f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}",
+            f"ALTER TABLE {table} AUTO_INCREMENT = 43",
+            "UNLOCK TABLES",
+            f"UPDATE {side} SET id = id + 40 ORDER BY id DESC",
+            f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO (PARTITION lt202602 VALUES LESS THAN (202602), "
+            "PARTITION p202602 VALUES LESS THAN (202603), PARTITION pmax VALUES LESS THAN MAXVALUE)",
+            f"ALTER TABLE {table} EXCHANGE PARTITION p202602 WITH TABLE {side}",
+            f"SELECT COUNT(*) FROM {side}",
+            f"DROP TABLE IF EXISTS {side}",
+        ])
+
+    def test_month_swap_splits_a_shared_partition_before_exchanging(self):
+        # p202603 was created with nothing below it, so it still holds 202601 and 202602 rows.
+        bounds = [("p202603", "202604"), ("pmax", "MAXVALUE")]
+        cursor = RecordingCursor([
+            (1,),                           # MAX(id) of the side table
+            (1,), (1,),                     # AUTO_INCREMENT, MAX(id) + 1
+            bounds,                         # is_partitioned()
+            bounds,                         # bounds for the split
+            (0,),                           # old rows swapped out
+        ])
+        fake = SimpleNamespace(vendor="mysql", mysql_is_mariadb=False, ops=connection.ops, cursor=lambda: cursor)
+
+        with mock.patch.object(partitions, "connection", fake):
+            swap = partitions.MonthSwap()
+            swap.add([RawBusData(year="2026", month=3, year_month=202603, week_period="יום חול")])
+            swap.exchange()
+
+        table = connection.ops.quote_name("convergence_rawbusdata")
+        ddl = [sql for sql in cursor.sql if sql.startswith(f"ALTER TABLE {table} ") and "PARTITION" in sql]
+        self.assertEqual(ddl[0], (
+            f"ALTER TABLE {table} REORGANIZE PARTITION p202603 INTO (PARTITION lt202603 VALUES LESS THAN (202603), "
+            "PARTITION p202603 VALUES LESS THAN (202604))"
+        ))
+        self.assertTrue(ddl[1].startswith(f"ALTER TABLE {table} EXCHANGE PARTITION p202603 "))
+
+
+@skipUnless(connection.vendor == "mysql", "RawBusData is only partitioned on MySQL.")
+class MySQLRawBusDataPartitionTests(RawBusCsvMixin, TransactionTestCase):
+    # Partitioning is DDL, which MySQL commits implicitly, so this cannot run inside TestCase's transaction.
+    def setUp(self):
+        # Migration 0035 leaves the test table with pmax only; put it back after each test's splits.
+        self.addCleanup(
+            connection.cursor().execute, f"ALTER TABLE {partitions.TABLE} {partitions.partition_by_clause([])}"
+        )
+
+    def test_migration_partitions_the_table(self):
+        self.assertEqual(partitions.partition_bounds(), [("pmax", None)])
+
+    def test_reimport_swaps_the_month_partition(self):
+        RawBusData.objects.create(year="2026", month=1, week_period="יום חול", train_station_name="אשקלון")
+        RawBusData.objects.create(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון")
+        call_command("partition_raw_bus_data", stdout=StringIO())
+
+        path = self._csv(
+            "2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n",
+            "2026,3,יום חול,אשקלון,45012,1,#,08:25,08:52:03,18\n",
+        )
+        output = self._import(path)
+
+        self.assertIn("RawBusData replaced (deleted): 1", output)
+        self.assertEqual(
+            [name for name, _ in partitions.partition_bounds()], ["lt202601", "p202601", "p202602", "p202603", "pmax"]
+        )
+        self.assertEqual(
+            sorted(RawBusData.objects.values_list("year_month", flat=True)), [202601, 202602, 202603]
+        )
+        ids = list(RawBusData.objects.values_list("id", flat=True))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_reimport_leaves_months_sharing_a_partition_alone(self):
+        RawBusData.objects.create(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון")
+        call_command("partition_raw_bus_data", stdout=StringIO())
+        # Written after partitioning without a split: January sits in lt202602, April in pmax.
+        RawBusData.objects.create(year="2026", month=1, week_period="יום חול", train_station_name="אשקלון")
+        RawBusData.objects.create(year="2026", month=4, week_period="יום חול", train_station_name="אשקלון")
+
+        self._import(self._csv(
+            "2026,1,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n",
+            "2026,3,יום חול,אשקלון,45012,1,#,08:25,08:52:03,18\n",
+        ))
+
+        self.assertEqual(
+            sorted(RawBusData.objects.values_list("year_month", flat=True)), [202601, 202602, 202603, 202604]
+        )
+
+
+class ConvergenceIndexTests(TestCase):
+    def test_station_month_queries_use_station_indexes(self):
+        queries = [
+            (
+                "b2r_station_ym_idx",
+                ConvergenceBusToRail.objects.filter(station_id__in=[1]).values_list("year_month", flat=True),
+            ),
+            ("r2b_station_ym_idx", ConvergenceRailToBus.objects.filter(station_id__in=[1], year_month=202603)),
+            ("raw_bus_station_ym_idx", RawBusData.objects.filter(station_id__in=[1], year_month=202603)),
+            (
+                "override_station_ym_idx",
+                OverrideConv.objects.filter(station_name__in=["Haifa"], year_month__lte=202603).order_by("changed_at"),
+            ),
+        ]
+
+        for index, queryset in queries:
+            with self.subTest(index=index):
+                self.assertIn(index, queryset.explain())
+
+    def test_view_falls_back_to_trimmed_station_names(self):
+        RawBusData.objects.create(
+            year="2026", month=3, week_period="יום חול", train_station_name=" חיפה מרכז ", rail_direction="צפון"
+        )
+
+        response = Client().get("/convergence/", {"station": "חיפה מרכז", "year": "2026", "month": "3"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["raw_bus_data_df"]), 1)
+
+
+class ClockSecondsTests(ConvergenceXlsxMixin, TestCase):
+    def _b2r(self, train_number, departure_time, **extra):
+        return ConvergenceBusToRail.objects.create(
+            year="2026", month=2, week_period="יום חול", train_station_name="קרית מלאכי",
+            rail_direction="לכיוון תל אביב", train_number=train_number, makat=36044, direction=1,
+            departure_time=departure_time, **extra,
+        )
+
+    def test_import_stores_seconds_of_day(self):
+        path = self._write_xlsx(
+            [self._row(20, "1899-12-30 05:00:30", **{"שעת הגעה לתחנה (בממוצע)": "05:22:16"})],
+            [self._row(64, "08:25")],
+        )
+
+        self._import(path)
+
+        b2r = ConvergenceBusToRail.objects.get()
+        self.assertEqual((b2r.departure_seconds, b2r.arrival_to_station_seconds), (5 * 3600 + 30, 5 * 3600 + 22 * 60 + 16))
+        self.assertEqual(ConvergenceRailToBus.objects.get().departure_seconds, 8 * 3600 + 25 * 60)
+        # Stored seconds compare equal to the file, so a forced re-import changes nothing.
+        self.assertIn("Unchanged: 2", self._import(path, "--force"))
+
+    def test_raw_bus_import_stores_seconds_of_day(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "raw.csv"
+            path.write_text(
+                "Year,Month,WeekPeriod,Train_Station_Name,OfficeLineID,Direction,Alternative,TripStartTime,ArrivalTime,ride_counts\n"
+                "2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n",
+                encoding="utf-8",
+            )
+            call_command("import_convergence", "--raw-bus-file", str(path), stdout=StringIO(), stderr=StringIO())
+
+        row = RawBusData.objects.get()
+        self.assertEqual((row.departure_seconds, row.bus_arrival_seconds), (14 * 3600 + 50 * 60, 15 * 3600 + 15 * 60 + 17))
+
+    def test_save_keeps_seconds_in_step_with_text(self):
+        row = self._b2r(20, "05:00")
+        row.departure_time = "05:10:05"
+        row.save()
+
+        row.refresh_from_db()
+        self.assertEqual(row.departure_seconds, 5 * 3600 + 10 * 60 + 5)
+
+    def test_line_history_matches_the_departure_minute_in_sql(self):
+        self._b2r(20, "05:00:30", rishui_train_arrival_time="05:40")
+        self._b2r(22, "1899-12-30 05:00:00", rishui_train_arrival_time="05:30")
+        self._b2r(24, "05:01", rishui_train_arrival_time="05:45")
+        params = {
+            "station": "קרית מלאכי", "link_direction": "bus_to_rail", "week_period": "יום חול",
+            "makat": "36044", "direction": "1", "departure_time": "05:00",
+        }
+
+        response = Client().get("/convergence/line-history/", params)
+
+        self.assertEqual([row["train_id"] for row in response.json()["rows"]], [20, 22])
+        response = Client().get("/convergence/line-history/", {**params, "departure_time": "בוקר"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_line_history_tells_after_midnight_trips_from_early_morning_ones(self):
+        self._b2r(20, "25:10", rishui_train_arrival_time="25:40")
+        self._b2r(22, "01:10:20", rishui_train_arrival_time="01:40")
+        params = {
+            "station": "קרית מלאכי", "link_direction": "bus_to_rail", "week_period": "יום חול",
+            "makat": "36044", "direction": "1",
+        }
+
+        late = Client().get("/convergence/line-history/", {**params, "departure_time": "25:10"})
+        early = Client().get("/convergence/line-history/", {**params, "departure_time": "01:10"})
+
+        self.assertEqual([row["train_id"] for row in late.json()["rows"]], [20])
+        self.assertEqual([row["train_id"] for row in early.json()["rows"]], [22])
+
+    def test_line_lookup_uses_line_index(self):
+        queryset = ConvergenceBusToRail.objects.filter(station_id__in=[1], makat=36044, departure_seconds__range=(0, 59))
+
+        self.assertIn("b2r_station_line_idx", queryset.explain())
+
+    def test_backfill_migration_sets_seconds(self):
+        migration = importlib.import_module("convergence.migrations.0029_clock_seconds")
+        # bulk_create skips save(), like rows imported before the migration.
+        RawBusData.objects.bulk_create([
+            RawBusData(year="2026", month=2, year_month=202602, week_period="יום חול", train_station_name="אשקלון",
+                       departure_time="14:50", bus_arrival_time_to_station="15:15:17")
+        ])
+
+        migration.backfill_clock_seconds(apps, None)
+
+        row = RawBusData.objects.get()
+        self.assertEqual((row.departure_seconds, row.bus_arrival_seconds), (14 * 3600 + 50 * 60, 15 * 3600 + 15 * 60 + 17))
+
+
+    def test_unwrap_migration_recomputes_after_midnight_seconds(self):
+        migration = importlib.import_module("convergence.migrations.0034_unwrapped_clock_seconds")
+        late = self._b2r(20, "25:10")
+        early = self._b2r(22, "01:10")
+        # As stored while hours still wrapped.
+        ConvergenceBusToRail.objects.update(departure_seconds=3600 + 10 * 60)
+
+        migration.unwrap_clock_seconds(apps, None)
+
+        late.refresh_from_db()
+        early.refresh_from_db()
+        self.assertEqual((late.departure_seconds, early.departure_seconds), (25 * 3600 + 10 * 60, 3600 + 10 * 60))
+
+
+class YearMonthTests(ConvergenceXlsxMixin, TestCase):
+    def _override(self, effective_month, to_train_number):
+        return OverrideConv.objects.create(
+            week_period="יום חול", link_direction="bus_to_rail", makat=36044, direction=1,
+            departure_time="05:00", station_name="קרית מלאכי", from_train_number=20,
+            from_train_rishui_train_arrival_time="05:40", to_train_number=to_train_number,
+            to_train_rishui_train_arrival_time="05:50", effective_month=effective_month,
+        )
+
+    def test_import_and_save_set_year_month(self):
+        path = self._write_xlsx([self._row(20, "05:00")], [self._row(64, "08:25")])
+        self._import(path)
+
+        self.assertEqual(ConvergenceBusToRail.objects.get().year_month, 202602)
+        self.assertEqual(ConvergenceRailToBus.objects.get().year_month, 202602)
+        self.assertEqual(self._override("2026-03", 22).year_month, 202603)
+
+    def test_saving_an_override_updates_its_year_month(self):
+        user = User.objects.create_user("planner")
+        user.user_permissions.add(Permission.objects.get(codename="can_manage_convergence_overrides"))
+        self.client.force_login(user)
+        payload = {
+            "week_period": "יום חול", "link_direction": "bus_to_rail", "makat": 36044, "direction": 1,
+            "departure_time": "05:00", "station_name": "קרית מלאכי", "from_train_number": 20,
+            "from_train_rishui_train_arrival_time": "05:40", "to_train_number": 22,
+            "to_train_rishui_train_arrival_time": "05:50", "effective_month": "2026-03",
+        }
+
+        for effective_month in ("2026-03", "2026-05"):
+            response = self.client.post(
+                "/convergence/override/save/", json.dumps({**payload, "effective_month": effective_month}),
+                content_type="application/json",
+            )
+            self.assertTrue(response.json()["ok"])
+        response = self.client.post(
+            "/convergence/override/save/", json.dumps({**payload, "effective_month": "2026-xx"}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.json()["error"], "invalid_effective_month")
+        self.assertEqual(OverrideConv.objects.get().year_month, 202605)
+
+    def test_view_lists_months_and_applies_overrides_as_of_the_month(self):
+        for month in (2, 4):
+            ConvergenceBusToRail.objects.create(
+                year="2026", month=month, week_period="יום חול", train_station_name="קרית מלאכי",
+                rail_direction="לכיוון תל אביב", train_number=20, makat=36044, direction=1,
+                departure_time="05:00", rishui_train_arrival_time="05:40",
+            )
+        self._override("2026-03", 22)
+
+        response = Client().get("/convergence/", {"station": "קרית מלאכי"})
+
+        self.assertEqual(response.context["year_month_pairs"], [{"year": 2026, "month": 2}, {"year": 2026, "month": 4}])
+        self.assertEqual([row["מספר הרכבת"] for row in response.context["bus_to_rail_df"]], [20])
+        response = Client().get("/convergence/", {"station": "קרית מלאכי", "year": "2026", "month": "4"})
+        self.assertEqual([row["מספר הרכבת"] for row in response.context["bus_to_rail_df"]], [22])
+
+    def test_backfill_migration_sets_year_month(self):
+        migration = importlib.import_module("convergence.migrations.0030_year_month")
+        # bulk_create skips save(), like rows stored before the migration. RawBusData's year_month
+        # is NOT NULL since 0035, so the bus to rail table stands in for it.
+        ConvergenceBusToRail.objects.bulk_create([
+            ConvergenceBusToRail(year="2026", month=2, week_period="יום חול", train_station_name="אשקלון"),
+            ConvergenceBusToRail(year="", month=2, week_period="יום חול", train_station_name="אשקלון"),
+        ])
+        OverrideConv.objects.bulk_create([
+            OverrideConv(week_period="יום חול", link_direction="bus_to_rail", makat=1, direction=1,
+                         from_train_number=20, effective_month="2026-03")
+        ])
+
+        migration.backfill_year_month(apps, None)
+
+        self.assertEqual(
+            sorted(ConvergenceBusToRail.objects.values_list("year_month", flat=True), key=str), [202602, None]
+        )
+        self.assertEqual(OverrideConv.objects.get().year_month, 202603)
+
+
+class StationMonthSummaryTests(ConvergenceXlsxMixin, TestCase):
+    def test_import_rebuilds_summary_of_imported_months(self):
+        path = self._write_xlsx(
+            [
+                self._row(20, "05:00", **{"אחוז הנסיעות שעמדו בזמנים ברמת תחנת רכבת": "87.5%"}),
+                self._row(22, "05:55", **{"אחוז הנסיעות שעמדו בזמנים ברמת תחנת רכבת": "87.5%"}),
+                self._row(24, "06:30", **{"תקופת שבוע": "שבת", "אחוז הנסיעות שעמדו בזמנים ברמת תחנת רכבת": "60%"}),
+            ],
+            [],
+        )
+
+        output = self._import(path)
+
+        self.assertIn("Month summaries rebuilt: 1", output)
+        summaries = StationMonthSummary.objects.order_by("week_period").values_list(
+            "train_station_name", "year", "month", "week_period", "on_time_percentage_by_train_station", "row_count"
+        )
+        self.assertEqual(list(summaries), [
+            ("קרית מלאכי", 2026, 2, "יום חול", Decimal("87.50"), 2),
+            ("קרית מלאכי", 2026, 2, "שבת", Decimal("60.00"), 1),
+        ])
+
+    def test_dry_run_builds_nothing(self):
+        self._import(self._write_xlsx([self._row(20, "05:00")], []), "--dry-run")
+
+        self.assertFalse(StationMonthSummary.objects.exists())
+
+    def test_command_rebuilds_existing_months(self):
+        for month in (2, 3):
+            ConvergenceBusToRail.objects.create(
+                year="2026", month=month, week_period="יום חול", train_station_name="קרית מלאכי",
+                rail_direction="לכיוון תל אביב", train_number=20, on_time_percentage_by_train_station=Decimal("70"),
+            )
+
+        call_command("build_convergence_summaries", "--month", "3", stdout=StringIO())
+
+        self.assertEqual(list(StationMonthSummary.objects.values_list("year_month", flat=True)), [202603])
+        call_command("build_convergence_summaries", stdout=StringIO())
+        self.assertEqual(StationMonthSummary.objects.count(), 2)
+
+
+class ConvergenceTrendTests(TestCase):
+    def _create(self, month, train_number, **extra):
+        row = {
+            "year": "2026", "month": month, "week_period": "יום חול", "train_station_name": "קרית מלאכי",
+            "rail_direction": "לכיוון תל אביב", "train_number": train_number, "makat": 36044, "signage": 301,
+            "departure_time": "05:00", "rishui_train_arrival_time": "05:40",
+        }
+        row.update(extra)
+        return ConvergenceBusToRail.objects.create(**row)
+
+    def test_build_keeps_first_percentage_of_each_series(self):
+        self._create(2, 20, on_time_percentage_by_train=Decimal("80"), on_time_percentage_by_makat=Decimal("75"),
+                     on_time_percentage_by_train_station=Decimal("70"))
+        self._create(2, 20, departure_time="05:10", on_time_percentage_by_train=Decimal("10"),
+                     on_time_percentage_by_makat=Decimal("10"), on_time_percentage_by_train_station=Decimal("10"))
+        self._create(2, 20, week_period="שבת", on_time_percentage_by_train=Decimal("50"))
+        self._create(3, 22, rishui_train_arrival_time="06:05", on_time_percentage_by_train_station=Decimal("90"))
+
+        call_command("build_convergence_summaries", stdout=StringIO())
+
+        points = ConvergenceTrend.objects.order_by("year_month", "level", "key", "week_period").values_list(
+            "level", "key", "week_period", "year_month", "on_time_percentage"
+        )
+        self.assertEqual(list(points), [
+            ("makat", "301", "", 202602, Decimal("75.00")),
+            ("station", "", "", 202602, Decimal("70.00")),
+            ("train", "20||05:40||לכיוון תל אביב", "יום חול", 202602, Decimal("80.00")),
+            ("train", "20||05:40||לכיוון תל אביב", "שבת", 202602, Decimal("50.00")),
+            ("station", "", "", 202603, Decimal("90.00")),
+        ])
+
+    def test_endpoint_returns_points_by_month(self):
+        self._create(2, 20, on_time_percentage_by_train=Decimal("80"), on_time_percentage_by_train_station=Decimal("70"))
+        self._create(3, 20, on_time_percentage_by_train=Decimal("85"), on_time_percentage_by_train_station=Decimal("72.5"))
+        call_command("build_convergence_summaries", stdout=StringIO())
+
+        response = Client().get("/convergence/trend/", {"station": "קרית מלאכי", "level": "station"})
+        self.assertEqual(response.json(), {"ok": True, "points": [
+            {"year": 2026, "month": 2, "perc": 70.0}, {"year": 2026, "month": 3, "perc": 72.5},
+        ]})
+        response = Client().get("/convergence/trend/", {
+            "station": "מלאכי", "level": "train", "key": "20||05:40||לכיוון תל אביב", "week_period": "יום חול",
+        })
+        self.assertEqual([point["perc"] for point in response.json()["points"]], [80.0, 85.0])
+        response = Client().get("/convergence/trend/", {"station": "קרית מלאכי", "level": "makat"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["fields"], ["key"])
+
+    def test_page_no_longer_embeds_trend_rows(self):
+        self._create(2, 20)
+
+        response = Client().get("/convergence/", {"station": "קרית מלאכי"})
+
+        self.assertNotIn("bus_to_rail_trend_df", response.context)
+        self.assertNotContains(response, "bus-to-rail-trend-data")
@@ -5,4 +5,5 @@ urlpatterns = [
     path("", views.convergence, name="convergence"),
     path("line-history/", views.line_history, name="convergence_line_history"),
     path("override/save/", views.save_override, name="convergence_save_override"),
+    path("trend/", views.trend, name="convergence_trend"),
 ]
@@ -2,13 +2,15 @@
 from decimal import Decimal
 
 from django.contrib.auth.decorators import login_required, permission_required
-from django.db.models.functions import Trim
+from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
 from django.views.decorators.http import require_GET, require_POST
 
-from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus, OverrideConv, RawBusData
+from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus, ConvergenceTrend, OverrideConv, RawBusData
+from imports.ingest import to_seconds_of_day, to_year_month
+from stations.lookup import station_ids, station_ids_containing
 
 # region helpers
 def _format_percentage(value):
@@ -75,10 +77,8 @@ COL_WEEK = "תקופת שבוע"
 COL_RAIL_DIR = "כיוון נסיעת הרכבת"
 COL_TRAIN_ID = "מספר הרכבת"
 COL_PERC = "אחוז הנסיעות שעמדו בזמנים"
-COL_PERC_BY_MAKAT_FOR_TREND = "אחוז הנסיעות שעמדו בזמנים ברמת מקט (עבור הטרנד דאטה)"
 COL_PERC_BY_MAKAT = "אחוז הנסיעות שעמדו בזמנים ברמת מקט"
 COL_PERC_BY_TRAIN = "אחוז הנסיעות שעמדו בזמנים ברמת נסיעת הרכבת"
-COL_PERC_BY_TRAIN_STATION = "אחוז הנסיעות שעמדו בזמנים ברמת תחנת רכבת"
 COL_N = "מספר תצפיות"
 COL_N_POSITIVE_FLAGGED = "מספר הנסיעות שעמדו בזמנים"
 COL_SIGNAGE = "שילוט"
@@ -91,6 +91,7 @@ COL_TRAIN_STATION_CODE = "__train_station_code"
 COL_FROM_TRAIN_NUMBER = "__from_train_number"
 COL_FROM_TRAIN_ARRIVAL = "__from_train_rishui_train_arrival_time"
 COL_LINK_DIRECTION = "__link_direction"
+COL_DEPARTURE_SECONDS = "__departure_seconds"
 
 def _serialize_bus_to_rail(row):
     return {
@@ -116,6 +117,7 @@ def _serialize_bus_to_rail(row):
         "כיוון": row.direction,
         "חלופה": row.alternative,
         "שעת יציאה מתחנת המוצא": row.departure_time,
+        COL_DEPARTURE_SECONDS: row.departure_seconds,
         "ממוצע נוסעים לנסיעה": row.avg_passengers_per_trip,
         "שעת הגעה לתחנה (בממוצע)": row.arrival_time_to_station,
         "סטיית תקן משעת ההגעה לתחנה": row.arrival_time_window,
@@ -153,26 +155,13 @@ def _serialize_rail_to_bus(row):
         "כיוון": row.direction,
         "חלופה": row.alternative,
         "שעת יציאה מתחנת המוצא": row.departure_time,
+        COL_DEPARTURE_SECONDS: row.departure_seconds,
         "ממוצע נוסעים לנסיעה": row.avg_passengers_per_trip,
         "הפרש בדקות (מרכבת לאוטובוס)": row.minutes_gap_rail_to_bus,
         "המלצה (דקות)": row.recommended_minutes,
     }
 
 
-def _serialize_bus_to_rail_trend(row): #NOTE - for trend by station level i will use a column from "_serialize_bus_to_rail"
-    return {
-        COL_RAIL_DIR: row.rail_direction,
-        COL_YEAR: row.year,
-        COL_MONTH: row.month,
-        COL_WEEK: row.week_period,
-        COL_TRAIN_ID: row.train_number,
-        COL_LICENSED_TRAIN_ARRIVAL: row.rishui_train_arrival_time,
-        COL_SIGNAGE: row.signage,
-        COL_PERC_BY_MAKAT_FOR_TREND: _format_percentage(row.on_time_percentage_by_makat),
-        COL_PERC_BY_TRAIN: _format_percentage(row.on_time_percentage_by_train),
-        COL_PERC_BY_TRAIN_STATION: _format_percentage(row.on_time_percentage_by_train_station),
-    }
-
 # endregion organizing the data from DB
 
 # region override
@@ -190,12 +179,22 @@ def _row_override_key(row):
     )
 
 
-def _build_override_lookup(effective_month):
+def _overrides_as_of(year_month):
+    # Overrides take effect from their month on; one without a month always applies.
+    as_of = Q(year_month__isnull=True)
+    if year_month is not None:
+        as_of |= Q(year_month__lte=year_month)
+    return OverrideConv.objects.filter(as_of)
+
+
+def _build_override_lookup(year_month, stations=None):
     out = {}
-    if not effective_month:
+    if year_month is None:
         return out
 
-    qs = OverrideConv.objects.filter(effective_month__lte=effective_month).order_by("changed_at")
+    qs = _overrides_as_of(year_month).order_by("changed_at")
+    if stations is not None:
+        qs = qs.filter(station_name__in=stations)
 
     for ov in qs:
         key = (
@@ -267,7 +266,8 @@ def save_override(request):
 
     if defaults["to_train_number"] is None:
         return JsonResponse({"ok": False, "error": "invalid_to_train_number"}, status=400)
-    if len(defaults["effective_month"]) != 7:
+    year, _, month = defaults["effective_month"].partition("-")
+    if len(defaults["effective_month"]) != 7 or to_year_month(year, month) is None:
         return JsonResponse({"ok": False, "error": "invalid_effective_month"}, status=400)
 
     lookup = {
@@ -299,6 +299,10 @@ def line_history(request):
     direction = _to_int_or_none(request.GET.get("direction"))
     alternative = (request.GET.get("alternative") or "").strip()
     departure_time = _extract_hhmm(request.GET.get("departure_time"))
+    # From the request text, not the wrapped HH:MM: "25:10" is a different trip than "01:10".
+    departure_seconds = to_seconds_of_day(request.GET.get("departure_time"))
+    if departure_seconds is not None:
+        departure_seconds -= departure_seconds % 60
 
     required_missing = []
     if not station:
@@ -311,7 +315,7 @@ def line_history(request):
         required_missing.append("makat")
     if direction is None:
         required_missing.append("direction")
-    if not departure_time:
+    if departure_seconds is None:
         required_missing.append("departure_time")
     if required_missing:
         return JsonResponse({"ok": False, "error": "missing_or_invalid_fields", "fields": required_missing}, status=400)
@@ -319,31 +323,27 @@ def line_history(request):
     model = ConvergenceBusToRail if link_direction == "bus_to_rail" else ConvergenceRailToBus
     qs = (
         model.objects
-        .annotate(_station_trim=Trim("train_station_name"))
         .filter(
-            _station_trim=station,
+            station_id__in=station_ids(station),
             week_period=week_period,
             makat=makat,
             direction=direction,
             alternative=alternative,
+            # Every departure within the requested HH:MM, whatever seconds or date the source text carried.
+            departure_seconds__range=(departure_seconds, departure_seconds + 59),
         )
-        .order_by("year", "month", "train_number", "rishui_train_arrival_time")
+        .order_by("year", "month", "train_number", "rishui_train_arrival_seconds")
     )
 
-    base_rows = [
-        row for row in qs
-        if _extract_hhmm(row.departure_time) == departure_time
-    ]
-
     rows = []
-    for row in base_rows:
+    for row in qs:
         year_month = _row_year_month(row)
         original_train_number = row.train_number
         original_arrival = _extract_hhmm(row.rishui_train_arrival_time)
         original_departure = str(row.departure_time or "").strip()
 
         override = (
-            OverrideConv.objects
+            _overrides_as_of(row.year_month)
             .filter(
                 station_name=station,
                 week_period=week_period,
@@ -357,7 +357,6 @@ def line_history(request):
                     str(row.rishui_train_arrival_time or "").strip(),
                     original_arrival,
                 ],
-                effective_month__lte=year_month,
             )
             .order_by("changed_at")
             .last()
@@ -391,6 +390,50 @@ def line_history(request):
 
 # endregion override
 
+# region trends
+@require_GET
+def trend(request):
+    station = (request.GET.get("station") or "").strip()
+    level = (request.GET.get("level") or "").strip()
+    key = (request.GET.get("key") or "").strip()
+    week_period = (request.GET.get("week_period") or "").strip() if level == ConvergenceTrend.Level.TRAIN else ""
+
+    required_missing = []
+    if not station:
+        required_missing.append("station")
+    if level not in ConvergenceTrend.Level.values:
+        required_missing.append("level")
+    if level != ConvergenceTrend.Level.STATION and not key:
+        required_missing.append("key")
+    if required_missing:
+        return JsonResponse({"ok": False, "error": "missing_or_invalid_fields", "fields": required_missing}, status=400)
+
+    qs = (
+        ConvergenceTrend.objects
+        .filter(
+            station_id__in=station_ids(station) or station_ids_containing(station),
+            level=level,
+            key=key if level != ConvergenceTrend.Level.STATION else "",
+            week_period=week_period,
+        )
+        .order_by("year_month", "station_id")
+    )
+
+    # A typed-in fragment can match several stations; each month keeps the first one's point.
+    points = {}
+    for year_month, value in qs.values_list("year_month", "on_time_percentage"):
+        points.setdefault(year_month, value)
+
+    return JsonResponse({
+        "ok": True,
+        "points": [
+            {"year": year_month // 100, "month": year_month % 100, "perc": float(value)}
+            for year_month, value in points.items()
+        ],
+    })
+
+# endregion trends
+
 # region RawBusData
 def _serialize_raw_bus_data(row):
     return {
@@ -402,7 +445,9 @@ def _serialize_raw_bus_data(row):
         "direction": row.direction,
         "alternative": row.alternative,
         "departure_time": row.departure_time,
+        "departure_seconds": row.departure_seconds,
         "bus_arrival_time_to_station": row.bus_arrival_time_to_station,
+        "bus_arrival_seconds": row.bus_arrival_seconds,
         "ride_counts": row.ride_counts,
         "rail_direction": row.rail_direction,
     }
@@ -428,41 +473,26 @@ def convergence(request):
                 "year": "",
                 "month": "",
                 "bus_to_rail_df": [],
-                "bus_to_rail_trend_df": [],
                 "rail_to_bus_df": [],
                 "raw_bus_data_df": [],
                 "year_month_pairs": [],
             },
         )
 
-    bus_qs = ConvergenceBusToRail.objects.annotate(_station_trim=Trim("train_station_name")).filter(_station_trim=station)
-    rail_qs = ConvergenceRailToBus.objects.annotate(_station_trim=Trim("train_station_name")).filter(_station_trim=station)
-    raw_qs = RawBusData.objects.annotate(_station_trim=Trim("train_station_name")).filter(_station_trim=station)
-
-    if not bus_qs.exists() and not rail_qs.exists() and not raw_qs.exists():
-        bus_qs = ConvergenceBusToRail.objects.filter(train_station_name__icontains=station)
-        rail_qs = ConvergenceRailToBus.objects.filter(train_station_name__icontains=station)
-        raw_qs = RawBusData.objects.filter(train_station_name__icontains=station)
-
-    bus_qs_for_trend = bus_qs
-
-    year_month_pairs_set = set()
-    for yv, mv in bus_qs.values_list("year", "month"):
-        if yv is not None and mv is not None:
-            year_month_pairs_set.add((int(yv), int(mv)))
-    for yv, mv in rail_qs.values_list("year", "month"):
-        if yv is not None and mv is not None:
-            year_month_pairs_set.add((int(yv), int(mv)))
-    for yv, mv in raw_qs.values_list("year", "month"):
-        if yv is not None and mv is not None:
-            try:
-                year_month_pairs_set.add((int(yv), int(mv)))
-            except (TypeError, ValueError):
-                pass
+    # Any spelling of the station finds all of its rows; a typed-in fragment matches every
+    # station with a spelling that contains it.
+    ids = station_ids(station) or station_ids_containing(station)
+    bus_qs = ConvergenceBusToRail.objects.filter(station_id__in=ids)
+    rail_qs = ConvergenceRailToBus.objects.filter(station_id__in=ids)
+    raw_qs = RawBusData.objects.filter(station_id__in=ids)
+
+    year_month_keys = set()
+    for qs in (bus_qs, rail_qs, raw_qs):
+        year_month_keys.update(qs.exclude(year_month=None).values_list("year_month", flat=True).distinct())
 
     year_month_pairs = [
-        {"year": yv, "month": mv}
-        for (yv, mv) in sorted(year_month_pairs_set)
+        {"year": key // 100, "month": key % 100}
+        for key in sorted(year_month_keys)
     ]
 
     if (year is None or month is None) and year_month_pairs:
@@ -471,25 +501,24 @@ def convergence(request):
         if month is None:
             month = year_month_pairs[0]["month"]
 
-    if year is not None:
-        bus_qs = bus_qs.filter(year=year)
-        rail_qs = rail_qs.filter(year=year)
-        raw_qs = raw_qs.filter(year=str(year))
-    if month is not None:
-        bus_qs = bus_qs.filter(month=month)
-        rail_qs = rail_qs.filter(month=month)
-        raw_qs = raw_qs.filter(month=month)
+    if year is not None and month is not None:
+        month_filter = Q(year_month=year * 100 + month)
+    elif year is not None:
+        month_filter = Q(year_month__range=(year * 100 + 1, year * 100 + 12))
+    else:
+        month_filter = Q(month=month) if month is not None else Q()
+    bus_qs = bus_qs.filter(month_filter)
+    rail_qs = rail_qs.filter(month_filter)
+    raw_qs = raw_qs.filter(month_filter)
 
-    bus_to_rail_trend_rows = [_serialize_bus_to_rail_trend(row) for row in bus_qs_for_trend]
     bus_to_rail_rows = [_serialize_bus_to_rail(row) for row in bus_qs]
     rail_to_bus_rows = [_serialize_rail_to_bus(row) for row in rail_qs]
-    raw_bus_data_rows = [_serialize_raw_bus_data(row) for row in raw_qs]
+    raw_bus_data_rows = [_serialize_raw_bus_data(row) for row in raw_qs.order_by("departure_seconds", "id")]
 
-    effective_month = ""
-    if year is not None and month is not None:
-        effective_month = f"{int(year):04d}-{int(month):02d}"
+    as_of = year * 100 + month if year is not None and month is not None else None
 
-    overrides = _build_override_lookup(effective_month)
+    stations = {str(row.get(COL_STATION) or "").strip() for row in bus_to_rail_rows + rail_to_bus_rows}
+    overrides = _build_override_lookup(as_of, stations)
     _apply_overrides_to_rows(bus_to_rail_rows, overrides)
     _apply_overrides_to_rows(rail_to_bus_rows, overrides)
 
@@ -504,7 +533,6 @@ def convergence(request):
         "year": year or "",
         "month": month or "",
         "bus_to_rail_df": bus_to_rail_rows,
-        "bus_to_rail_trend_df": bus_to_rail_trend_rows,
         "rail_to_bus_df": rail_to_bus_rows,
         "raw_bus_data_df": raw_bus_data_rows,
         "year_month_pairs": year_month_pairs,
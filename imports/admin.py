@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+from .models import ImportJob, ImportManifest
+
+
+admin.site.register(ImportManifest)
+admin.site.register(ImportJob)
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+
+# (dataset, command, ((option, file name pattern), ...)). Files that are not
+# month-specific are picked up every month; the manifest skips them when unchanged.
+DATASETS = (
+    (
+        "convergence",
+        "import_convergence",
+        (("--file", "rail_bus_convergence_{month}.xlsx"), ("--raw-bus-file", "raw_bus_data_{month}.csv")),
+    ),
+    ("train_times", "import_train_times", (("--file", "Arrivel_train_passengers_numbers_{month}.csv"),)),
+    ("train_stations_order", "import_train_stations_order", (("--file", "Train_Stations_Order_{month}.xlsx"),)),
+    ("rating_table", "import_rating_table", (("--file", "df_ranking_{month}.csv"),)),
+    ("matrix_pass_table", "import_matrix_pass_table", (("--file", "passanger_matrix_{month}.csv"),)),
+    ("bus_info", "import_bus_info_per_train_station", (("--file", "for_convergence_data.xlsx"),)),
+)
+
+DATASET_CHOICES = [(name, name) for name, _, _ in DATASETS]
+
+
+def dataset_command(name, source_path):
+    """
+    Return (command, option) that loads `source_path` as dataset `name`, or None.
+
+    Datasets with several inputs pick the option whose file pattern has the same
+    suffix, e.g. a .csv given to convergence goes to --raw-bus-file.
+    """
+    for dataset, command, patterns in DATASETS:
+        if dataset != name:
+            continue
+        suffix = Path(source_path).suffix.lower()
+        option = next((option for option, pattern in patterns if Path(pattern).suffix == suffix), patterns[0][0])
+        return command, option
+    return None
@@ -0,0 +1,208 @@
+import codecs
+import csv
+import io
+import re
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+from django.core.management.base import CommandError
+
+
+CSV_ENCODINGS = ("utf-8-sig", "cp1255", "iso-8859-8")
+
+SAMPLE_SIZE = 64 * 1024
+
+CLOCK_TIME = re.compile(r"(\d{1,2}):(\d{2})(?::(\d{2}))?")
+
+
+class SourceError(CommandError):
+    """The file itself cannot be read or decoded, as opposed to one of its rows being invalid."""
+
+
+def sniff_encoding(sample, encodings=CSV_ENCODINGS, final=False):
+    """Return the first of `encodings` that decodes the byte sample, or None."""
+    for encoding in encodings:
+        try:
+            # Not final unless the sample is the whole file: it may end inside a multi-byte character.
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return None
+
+
+class TranscodedFile(io.RawIOBase):
+    """
+    Binary file re-encoded as UTF-8, with its encoding sniffed on the fly.
+
+    Bytes pass through untouched until the first non-ASCII block, which (plus one
+    more block) is the sample the encoding is picked from. All candidates agree on
+    ASCII, so the file is read exactly once whatever it turns out to be.
+    """
+
+    def __init__(self, raw, encodings=CSV_ENCODINGS, sample_size=SAMPLE_SIZE):
+        self._raw = raw
+        self._encodings = encodings
+        self._sample_size = sample_size
+        self._decoder = None
+        self._pending = b""
+        self._eof = False
+        self.encoding = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._eof:
+            self._pending = self._next_block()
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def _next_block(self):
+        block = self._raw.read(self._sample_size)
+        if not block:
+            self._eof = True
+            return self._decoder.decode(b"", final=True).encode("utf-8") if self._decoder else b""
+        if self._decoder is None:
+            if block.isascii():
+                return block
+            more = self._raw.read(self._sample_size)
+            block += more
+            self.encoding = sniff_encoding(block, self._encodings, final=not more)
+            if self.encoding is None:
+                raise UnicodeDecodeError(
+                    "|".join(self._encodings), block, 0, len(block), "no candidate encoding fits"
+                )
+            self._decoder = codecs.getincrementaldecoder(self.encoding)()
+        return self._decoder.decode(block).encode("utf-8")
+
+
+@contextmanager
+def open_binary(source_path, encodings=CSV_ENCODINGS):
+    """Yield a buffered UTF-8 binary stream over `source_path`, e.g. for pandas.read_csv."""
+    source_path = Path(source_path)
+    with source_path.open("rb") as raw:
+        transcoded = TranscodedFile(raw, encodings)
+        try:
+            yield io.BufferedReader(transcoded)
+        except UnicodeDecodeError as exc:
+            encoding = transcoded.encoding or f"any of {', '.join(encodings)}"
+            raise SourceError(f"{source_path}: cannot decode CSV as {encoding}: {exc.reason}.") from exc
+
+
+def canonical_columns(names, aliases=None, fold_case=False):
+    """Strip (and optionally lowercase) header names, then map them through `aliases`."""
+    aliases = aliases or {}
+    canonical = []
+    for name in names:
+        key = str(name).strip()
+        if fold_case:
+            key = key.lower()
+        canonical.append(aliases.get(key, key))
+    return canonical
+
+
+@contextmanager
+def open_csv(source_path, encodings=CSV_ENCODINGS, aliases=None, fold_case=False):
+    """
+    Yield a csv.DictReader over the file keyed by canonical column names.
+
+    Rows are read lazily while the context is open; reader.fieldnames is None for
+    a file without a header row.
+    """
+    with open_binary(source_path, encodings) as binary:
+        reader = csv.DictReader(io.TextIOWrapper(binary, encoding="utf-8", newline=""))
+        try:
+            if reader.fieldnames is not None:
+                reader.fieldnames = canonical_columns(reader.fieldnames, aliases, fold_case)
+            yield reader
+        except csv.Error as exc:
+            raise SourceError(f"{source_path}: malformed CSV at line {reader.line_num}: {exc}") from exc
+
+
+def read_csv_frame(source_path, encodings=CSV_ENCODINGS, aliases=None, **kwargs):
+    """pandas.read_csv with encoding detection and canonical column names; chunksize is not supported."""
+    with open_binary(source_path, encodings) as binary:
+        df = pd.read_csv(binary, encoding="utf-8", **kwargs)
+    df.columns = canonical_columns(df.columns, aliases)
+    return df
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items, holding only one list at a time."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def clean_text(value):
+    """Stripped text of a cell; None and pandas' NaN become ""."""
+    if value is None:
+        return ""
+    text = str(value).strip()
+    if text.lower() == "nan":
+        return ""
+    return text
+
+
+def to_int(value):
+    """Integer value of a cell ("12", "12.0", 12.7 -> 12), or None if blank or not a number."""
+    text = clean_text(value)
+    if not text:
+        return None
+    try:
+        return int(float(text))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def to_float(value):
+    """Float value of a cell, ignoring thousands separators, or None."""
+    text = clean_text(value).replace(",", "")
+    if not text:
+        return None
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_decimal(value):
+    """Decimal value of a cell, ignoring "%" and thousands separators, or None."""
+    text = clean_text(value).replace("%", "").replace(",", "")
+    if not text:
+        return None
+    try:
+        return Decimal(text)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def to_year_month(year, month):
+    """Packed YYYYMM key of a year and a month cell (2026, 3 -> 202603), or None if either is not valid."""
+    year, month = to_int(year), to_int(month)
+    if year is None or month is None or not 1 <= month <= 12:
+        return None
+    return year * 100 + month
+
+
+def to_seconds_of_day(value):
+    """
+    Seconds since midnight of a clock-time cell, or None. Accepts "08:37", "08:37:33"
+    and datetime-like text ("1899-12-30 08:37:33.000"). Hours past 23 are kept, so a trip
+    after midnight of the service day ("25:10") sorts and matches after its 23:xx trips.
+    """
+    text = clean_text(value)
+    for separator in ("T", " "):
+        text = text.split(separator)[-1]
+    text = text.split("+")[0].split(".")[0]
+    match = CLOCK_TIME.match(text)
+    if match is None:
+        return None
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
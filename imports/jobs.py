@@ -0,0 +1,153 @@
+import re
+from contextlib import nullcontext
+from io import StringIO
+from pathlib import Path
+from time import monotonic
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from imports.datasets import dataset_command
+from imports.models import ImportJob, ImportManifest
+
+
+# Every importer reports each batch as "Processed N rows (inserted=.., invalid=..)" and
+# ends with "Rows processed: N", "Inserted: N", ... summary lines.
+PROGRESS_LINE = re.compile(r"^Processed (\d+) (?:\w+ )?rows \(([^)]*)\)")
+SUMMARY_LINE = re.compile(r"^(Rows processed|Inserted|Updated|Invalid): (\d+)$")
+PROGRESS_FIELDS = {
+    "rows processed": "rows_processed",
+    "inserted": "rows_inserted",
+    "updated": "rows_updated",
+    "invalid": "rows_invalid",
+}
+RESULT_FIELDS = {"rows processed": "rows", "inserted": "inserted", "updated": "updated", "invalid": "invalid"}
+
+
+def line_counters(line):
+    """(counter, value) pairs reported by one progress or summary line of importer output."""
+    line = line.strip()
+    if match := PROGRESS_LINE.match(line):
+        return [("rows processed", match.group(1)), *re.findall(r"(\w+)=(\d+)", match.group(2))]
+    if match := SUMMARY_LINE.match(line):
+        return [(match.group(1).lower(), match.group(2))]
+    return []
+
+
+def output_totals(text):
+    """Row counts of a run as its output last reported them, keyed like run_dataset's result."""
+    totals = {}
+    for line in text.splitlines():
+        totals.update({RESULT_FIELDS[key]: int(value) for key, value in line_counters(line) if key in RESULT_FIELDS})
+    return totals
+
+
+def run_dataset(name, command, sources, flags, output=None, atomic=True):
+    """Run one importer (in a single transaction if `atomic`) and summarize it from the import manifest."""
+    args = [arg for option, path in sources for arg in (option, str(path))] + list(flags)
+    output = StringIO() if output is None else output
+    started = monotonic()
+    started_at = timezone.now()
+    result = {"dataset": name, "command": command, "status": "imported", "error": ""}
+    try:
+        with transaction.atomic() if atomic else nullcontext():
+            call_command(command, *args, stdout=output, stderr=output)
+            recorded = ImportManifest.objects.filter(
+                command=command,
+                source_path__in=[str(Path(path).resolve()) for _, path in sources],
+                imported_at__gte=started_at,
+            ).aggregate(
+                files=Count("id"),
+                rows=Sum("rows_processed"),
+                inserted=Sum("rows_inserted"),
+                updated=Sum("rows_updated"),
+                invalid=Sum("rows_invalid"),
+            )
+    except Exception as exc:
+        result.update(status="failed", error=str(exc) or exc.__class__.__name__)
+        recorded = {}
+
+    if result["status"] == "imported" and not recorded.get("files"):
+        result["status"] = "dry run" if "--dry-run" in flags else "unchanged"
+        if result["status"] == "dry run":
+            # Dry runs record no manifest, so their counts come from the command's own report.
+            recorded = output_totals(output.getvalue())
+    result.update({key: recorded.get(key) or 0 for key in ("rows", "inserted", "updated", "invalid")})
+    result["seconds"] = monotonic() - started
+    result["output"] = output.getvalue()
+    return result
+
+
+class JobProgress(StringIO):
+    """Command output stream that copies each batch's counters onto its ImportJob row."""
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def write(self, text):
+        for line in text.splitlines():
+            if counters := line_counters(line):
+                self._record(counters)
+        return super().write(text)
+
+    def _record(self, counters):
+        progress = {PROGRESS_FIELDS[key]: int(value) for key, value in counters if key in PROGRESS_FIELDS}
+        ImportJob.objects.filter(pk=self.job.pk).update(progress_at=timezone.now(), **progress)
+
+
+def enqueue(dataset, source_path, requested_by="", **flags):
+    return ImportJob.objects.create(
+        dataset=dataset, source_path=str(source_path), requested_by=requested_by, **flags
+    )
+
+
+def claim_next_job(worker):
+    """Mark the oldest queued job as running for `worker` and return it, or None if the queue is empty."""
+    queued = ImportJob.objects.filter(status=ImportJob.Status.QUEUED).order_by("created_at", "id")
+    for pk in queued.values_list("pk", flat=True)[:20]:
+        # Only one worker's UPDATE can still see the job queued, so no two workers run it.
+        claimed = ImportJob.objects.filter(pk=pk, status=ImportJob.Status.QUEUED).update(
+            status=ImportJob.Status.RUNNING, worker=worker, started_at=timezone.now()
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job with its dataset's import command and store the outcome.
+
+    The command is not wrapped in an extra transaction, so progress written after
+    each batch is visible to pollers (a --strict job commits, and shows, only at the end).
+    """
+    resolved = dataset_command(job.dataset, job.source_path)
+    if resolved is None:
+        return finish_job(job, ImportJob.Status.FAILED, f"Unknown dataset: {job.dataset}")
+    command, option = resolved
+    flags = [f"--{name.replace('_', '-')}" for name in ("dry_run", "strict", "force") if getattr(job, name)]
+
+    result = run_dataset(
+        job.dataset, command, [(option, Path(job.source_path))], flags, output=JobProgress(job), atomic=False
+    )
+    job.refresh_from_db()
+    if result["status"] == "imported":
+        job.rows_processed = result["rows"]
+        job.rows_inserted = result["inserted"]
+        job.rows_updated = result["updated"]
+        job.rows_invalid = result["invalid"]
+    job.output = result["output"]
+    if result["status"] == "failed":
+        return finish_job(job, ImportJob.Status.FAILED, result["error"])
+    return finish_job(job, ImportJob.Status.SUCCEEDED, result["status"])
+
+
+def finish_job(job, status, message):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save()
+    return job
@@ -0,0 +1,96 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+
+from imports.management.commands.import_month import MONTH_PATTERN
+from imports.synthetic import MONTHLY_SPECS, Generator, existing_months, month_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create realistic synthetic months for every dataset, resampled from the months "
+        "already imported from tables/, to benchmark views and queries at scale. Train routes "
+        "(train_stations_order) are copied for the extra trains of --scale only; extra stations are left off them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=60, help="Number of months to generate (default: 5 years).")
+        parser.add_argument(
+            "--end",
+            help="Last generated month as YYYY-MM. Defaults to the month before the oldest imported month.",
+        )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Rows per station and month relative to the sample files, e.g. 0.1 or 3.",
+        )
+        parser.add_argument(
+            "--stations",
+            type=int,
+            help="Number of stations. Extra stations beyond the sample copy a random sample station.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same rows.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert.")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete all rows of the generated months (and earlier synthetic overrides and stations) first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["months"] <= 0:
+            raise CommandError("--months must be a positive integer.")
+        if options["scale"] <= 0:
+            raise CommandError("--scale must be positive.")
+        if options["stations"] is not None and options["stations"] <= 0:
+            raise CommandError("--stations must be a positive integer.")
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be a positive integer.")
+
+        present = {spec.model.__name__: existing_months(spec) for spec in MONTHLY_SPECS}
+        if options["end"]:
+            if not MONTH_PATTERN.match(options["end"]):
+                raise CommandError("--end must look like YYYY-MM, e.g. 2025-12.")
+            end = tuple(int(part) for part in options["end"].split("-"))
+        else:
+            oldest = min((min(months) for months in present.values() if months), default=None)
+            if oldest is None:
+                raise CommandError("No imported data to sample from. Run import_month for a sample month first.")
+            end = month_range(oldest, 2)[0]
+        months = month_range(end, options["months"])
+
+        taken = sorted({f"{year:04d}-{month:02d}" for found in present.values() for year, month in found & set(months)})
+        if taken and not options["replace"]:
+            raise CommandError(
+                f"Data already exists for {', '.join(taken[:6])}{'...' if len(taken) > 6 else ''}. "
+                "Pass --replace to overwrite those months."
+            )
+
+        generator = Generator(
+            months,
+            scale=options["scale"],
+            stations=options["stations"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        missing = generator.load_templates()
+        if missing:
+            raise CommandError(
+                f"No imported months to sample from for: {', '.join(missing)}. "
+                "Run import_month for a sample month first."
+            )
+        if options["replace"]:
+            generator.clear()
+
+        started = monotonic()
+        counts = generator.run()
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS("Synthetic data generated."))
+        self.stdout.write(f"Months: {months[0][0]:04d}-{months[0][1]:02d} .. {end[0]:04d}-{end[1]:02d}")
+        self.stdout.write(f"Stations: {generator.station_total} ({len(generator.extra_stations)} synthetic)")
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(f"Total rows: {sum(counts.values())} in {monotonic() - started:.1f}s")
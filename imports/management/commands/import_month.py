@@ -0,0 +1,119 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import monotonic
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from imports.datasets import DATASETS
+from imports.jobs import enqueue, run_dataset
+from imports.profiling import add_profile_arguments
+
+
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import every dataset for one month from the tables directory, running the "
+        "independent importers concurrently. Each dataset commits in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", required=True, help="Month to import, as YYYY-MM.")
+        parser.add_argument("--dir", default="tables", help="Directory holding the monthly source files.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=len(DATASETS),
+            help="Number of importer processes. SQLite databases always import one dataset at a time.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Pass --dry-run to every importer.")
+        parser.add_argument("--strict", action="store_true", help="Pass --strict to every importer.")
+        parser.add_argument("--force", action="store_true", help="Pass --force to every importer.")
+        parser.add_argument("--verbose", action="store_true", help="Print each importer's own output.")
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Queue one import job per source file for run_import_worker instead of importing now.",
+        )
+        add_profile_arguments(parser)
+
+    def handle(self, *args, **options):
+        month = options["month"].strip()
+        root = Path(options["dir"]).expanduser()
+        workers = options["workers"]
+
+        if not MONTH_PATTERN.match(month):
+            raise CommandError("--month must look like YYYY-MM, e.g. 2026-05.")
+        if workers <= 0:
+            raise CommandError("--workers must be a positive integer.")
+        if not root.exists():
+            raise CommandError(f"Directory not found: {root}")
+
+        flags = [f"--{name.replace('_', '-')}" for name in ("dry_run", "strict", "force", "profile") if options[name]]
+        jobs = []
+        for name, command, patterns in DATASETS:
+            sources = [(option, root / pattern.format(month=month)) for option, pattern in patterns]
+            sources = [(option, path) for option, path in sources if path.exists()]
+            if sources:
+                dataset_flags = flags
+                if options["profile_output"]:
+                    # One cProfile dump per importer: <path>.<dataset>
+                    dataset_flags = flags + ["--profile-output", f"{options['profile_output']}.{name}"]
+                jobs.append((name, command, sources, dataset_flags))
+            else:
+                self.stdout.write(self.style.WARNING(f"{name}: no source files for {month}, skipped."))
+        if not jobs:
+            raise CommandError(f"No source files for {month} found in {root}.")
+
+        if options["enqueue"]:
+            flags = {name: options[name] for name in ("dry_run", "strict", "force")}
+            for name, _, sources, _ in jobs:
+                for _, path in sources:
+                    job = enqueue(name, path.resolve(), **flags)
+                    self.stdout.write(f"Queued job {job.pk}: {name} {job.source_path}")
+            return
+
+        # SQLite allows one writer at a time, so concurrent importers would only wait on its lock.
+        if connection.vendor == "sqlite":
+            workers = 1
+        workers = min(workers, len(jobs))
+
+        started = monotonic()
+        if workers == 1:
+            results = [run_dataset(*job) for job in jobs]
+        else:
+            # Forked workers must open their own connections instead of sharing this one.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+                futures = [executor.submit(run_dataset, *job) for job in jobs]
+                results = [future.result() for future in futures]
+
+        self.stdout.write("")
+        for result in results:
+            if options["verbose"] and result["output"]:
+                self.stdout.write(f"--- {result['dataset']} ({result['command']}) ---")
+                self.stdout.write(result["output"].rstrip())
+            elif "\nProfile:" in result["output"]:
+                self.stdout.write(f"--- {result['dataset']} ({result['command']}) ---")
+                self.stdout.write(result["output"][result["output"].index("\nProfile:") + 1:].rstrip())
+            line = f"{result['dataset']:<22}{result['status']:<11}{result['seconds']:7.1f}s"
+            if result["status"] in ("imported", "dry run"):
+                line += (
+                    f"  rows={result['rows']} inserted={result['inserted']} "
+                    f"updated={result['updated']} invalid={result['invalid']}"
+                )
+            if result["status"] == "failed":
+                self.stdout.write(self.style.ERROR(f"{line}  {result['error']}"))
+            else:
+                self.stdout.write(line)
+
+        failed = [result["dataset"] for result in results if result["status"] == "failed"]
+        self.stdout.write(f"Workers: {workers}")
+        self.stdout.write(f"Total time: {monotonic() - started:.1f}s")
+        if failed:
+            raise CommandError(f"Import failed for: {', '.join(failed)}. Their changes were rolled back.")
+        self.stdout.write(self.style.SUCCESS(f"Month {month} imported."))
@@ -0,0 +1,70 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from imports.jobs import claim_next_job, finish_job, run_job
+from imports.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued import jobs one at a time with the matching import command, "
+        "recording progress on each job as it goes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of waiting for new jobs.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before checking an empty queue again.",
+        )
+        parser.add_argument(
+            "--max-jobs",
+            type=int,
+            default=0,
+            help="Exit after running this many jobs (0 = no limit).",
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options["poll_interval"]
+        max_jobs = options["max_jobs"]
+
+        if poll_interval <= 0:
+            raise CommandError("--poll-interval must be positive.")
+        if max_jobs < 0:
+            raise CommandError("--max-jobs cannot be negative.")
+
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        done = 0
+        while not max_jobs or done < max_jobs:
+            job = claim_next_job(worker)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f"Job {job.pk}: {job.dataset} {job.source_path}")
+            try:
+                job = run_job(job)
+            except BaseException:
+                # Ctrl+C or a lost connection: do not leave the job marked as running forever.
+                finish_job(job, ImportJob.Status.FAILED, "Worker stopped while the job was running.")
+                raise
+            done += 1
+
+            line = f"Job {job.pk} {job.status}: {job.message} (rows={job.rows_processed}, invalid={job.rows_invalid})"
+            if job.status == ImportJob.Status.FAILED:
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        self.stdout.write(f"Jobs run: {done}")
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from django.utils import timezone
+
+from imports.models import ImportManifest
+from shiluvim.sheet_cache import file_sha256
+
+
+def source_fingerprint(source_path):
+    path = Path(source_path).expanduser().resolve()
+    return {
+        "source_path": str(path),
+        "checksum": file_sha256(path),
+        "size_bytes": path.stat().st_size,
+    }
+
+
+def previous_import(command, fingerprint):
+    """Return the manifest row if `command` already loaded this exact file content, else None."""
+    return ImportManifest.objects.filter(command=command, **fingerprint).first()
+
+
+def skip_message(source_path, manifest):
+    return (
+        f"Skipping unchanged file {source_path} "
+        f"(imported {timezone.localtime(manifest.imported_at):%Y-%m-%d %H:%M}). Use --force to re-import."
+    )
+
+
+def record_import(command, fingerprint, totals, duration_seconds):
+    ImportManifest.objects.update_or_create(
+        command=command,
+        source_path=fingerprint["source_path"],
+        defaults={
+            "checksum": fingerprint["checksum"],
+            "size_bytes": fingerprint["size_bytes"],
+            "rows_processed": totals.get("total_rows", 0),
+            "rows_inserted": totals.get("inserted", 0),
+            "rows_updated": totals.get("updated", 0),
+            "rows_invalid": totals.get("invalid", 0),
+            "duration_seconds": duration_seconds,
+        },
+    )
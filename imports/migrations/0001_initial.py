@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=100)),
+                ('source_path', models.CharField(max_length=500)),
+                ('checksum', models.CharField(max_length=64)),
+                ('size_bytes', models.BigIntegerField()),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('rows_inserted', models.IntegerField(default=0)),
+                ('rows_updated', models.IntegerField(default=0)),
+                ('rows_invalid', models.IntegerField(default=0)),
+                ('duration_seconds', models.FloatField(default=0)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('command', 'source_path'), name='uniq_import_manifest_source')],
+            },
+        ),
+    ]
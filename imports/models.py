@@ -0,0 +1,62 @@
+from django.db import models
+
+from imports.datasets import DATASET_CHOICES
+
+
+class ImportManifest(models.Model):
+    # One row per (command, source file): what was last loaded and how long it took.
+    command = models.CharField(max_length=100)
+    source_path = models.CharField(max_length=500)
+    checksum = models.CharField(max_length=64)
+    size_bytes = models.BigIntegerField()
+    rows_processed = models.IntegerField(default=0)
+    rows_inserted = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_invalid = models.IntegerField(default=0)
+    duration_seconds = models.FloatField(default=0)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("command", "source_path"), name="uniq_import_manifest_source"),
+        ]
+
+    def __str__(self):
+        return f"{self.command} {self.source_path} ({self.checksum[:12]})"
+
+
+class ImportJob(models.Model):
+    # A queued import of one source file, run by `manage.py run_import_worker`.
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    dataset = models.CharField(max_length=50, choices=DATASET_CHOICES)
+    source_path = models.CharField(max_length=500)
+    dry_run = models.BooleanField(default=False)
+    strict = models.BooleanField(default=False)
+    force = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    # Progress counters, updated after every batch while the job runs.
+    rows_processed = models.IntegerField(default=0)
+    rows_inserted = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_invalid = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    output = models.TextField(blank=True)
+    requested_by = models.CharField(max_length=150, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    progress_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("status", "created_at"), name="import_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.dataset} {self.source_path} ({self.status})"
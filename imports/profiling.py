@@ -0,0 +1,167 @@
+import cProfile
+import sys
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+from django.db import connection
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def add_profile_arguments(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report wall time, rows/sec, SQL query count/time per phase and peak RSS.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="Also write a cProfile dump to this path (implies --profile); inspect it with pstats or snakeviz.",
+    )
+
+
+class Phase:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class ImportProfiler:
+    """
+    Collects per-phase timings for one import command run.
+
+    Phases (read, normalize, db write, ...) do not nest and may be entered many
+    times; their totals accumulate. SQL is attributed to the phase that issued it,
+    so a phase's Python time is its wall time minus its SQL time. A disabled
+    profiler hands out a throwaway phase and measures nothing, so phases can wrap
+    per-row work.
+    """
+
+    def __init__(self, enabled=False, output_path=None):
+        self.enabled = enabled or bool(output_path)
+        self.output_path = output_path
+        self.phases = {}
+        self.other = Phase("other")
+        self._current = None
+        self._started = None
+        self._seconds = 0.0
+
+    @classmethod
+    def from_options(cls, options):
+        return cls(enabled=options.get("profile", False), output_path=options.get("profile_output"))
+
+    @contextmanager
+    def run(self):
+        if not self.enabled:
+            yield self
+            return
+        profile = cProfile.Profile() if self.output_path else None
+        self._started = perf_counter()
+        try:
+            with connection.execute_wrapper(self._time_query):
+                if profile is not None:
+                    profile.enable()
+                try:
+                    yield self
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        finally:
+            self._seconds = perf_counter() - self._started
+            if profile is not None:
+                profile.dump_stats(self.output_path)
+
+    def phase(self, name):
+        if not self.enabled:
+            return nullcontext(Phase(name))
+        return self._timed_phase(self.phases.setdefault(name, Phase(name)))
+
+    @contextmanager
+    def _timed_phase(self, phase):
+        outer, self._current = self._current, phase
+        started = perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds += perf_counter() - started
+            self._current = outer
+
+    def iterate(self, name, iterable, count=None):
+        # Times each next() separately, for work that happens lazily inside an iterator.
+        # count(item) gives the rows an item stands for, e.g. len for chunks of rows.
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name) as phase:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                if count is not None:
+                    phase.rows += count(item)
+            yield item
+
+    def _time_query(self, execute, sql, params, many, context):
+        phase = self._current or self.other
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            phase.queries += 1
+            phase.query_seconds += perf_counter() - started
+
+    def report(self, stdout):
+        if not self.enabled:
+            return
+        phases = list(self.phases.values())
+        self.other.seconds = max(self._seconds - sum(phase.seconds for phase in phases), 0.0)
+        phases.append(self.other)
+
+        stdout.write("")
+        stdout.write("Profile:")
+        stdout.write(
+            f"  {'phase':<24}{'wall':>9}{'python':>9}{'sql':>9}{'queries':>9}{'rows':>9}{'rows/s':>10}"
+        )
+        for phase in phases:
+            rate = f"{phase.rows / phase.seconds:,.0f}" if phase.rows and phase.seconds else "-"
+            stdout.write(
+                f"  {phase.name:<24}{phase.seconds:>8.2f}s{phase.seconds - phase.query_seconds:>8.2f}s"
+                f"{phase.query_seconds:>8.2f}s{phase.queries:>9}{phase.rows or '-':>9}{rate:>10}"
+            )
+        queries = sum(phase.queries for phase in phases)
+        query_seconds = sum(phase.query_seconds for phase in phases)
+        stdout.write(f"  Total: {self._seconds:.2f}s, {queries} SQL queries in {query_seconds:.2f}s")
+        peak = peak_rss_mb()
+        if peak is not None:
+            stdout.write(f"  Peak RSS: {peak:.1f} MB")
+        if self.output_path:
+            stdout.write(f"  cProfile dump: {self.output_path}")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ProfiledCommandMixin:
+    """Gives an import command a `self.profiler` and the --profile report; list it before BaseCommand."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profiler = ImportProfiler()
+
+    def execute(self, *args, **options):
+        self.profiler = ImportProfiler.from_options(options)
+        try:
+            with self.profiler.run():
+                return super().execute(*args, **options)
+        finally:
+            self.profiler.report(self.stdout)
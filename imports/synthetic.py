@@ -0,0 +1,391 @@
+"""
+Synthetic history for load and query benchmarks.
+
+Every generated month is bootstrapped from a month that was really imported (the
+"template" months, normally the files in tables/): its rows are copied, renamed
+for extra stations, resampled to the requested scale and get their volume
+columns jittered, so value distributions match the sample files.
+
+Train routes (train_stations_order) have no month. They are copied once for the
+extra trains --scale adds, so every generated train number has a route; extra
+stations are not added to routes, whose stop order follows the real line.
+"""
+import math
+import random
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Q
+
+from bus_info_per_train_station_table.models import BusInfo
+from convergence import partitions
+from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus, OverrideConv, RawBusData
+from convergence.summary import build_month_summaries
+from matrix_pass_table.dense import build_month
+from matrix_pass_table.models import PassengerMatrix
+from rating_table.models import Ranking
+from stations.lookup import StationResolver
+from train_stations_order.models import Ranking as TrainRoute
+from train_times.models import TrainTime
+
+
+OVERRIDE_AUTHOR = "generate_synthetic_data"
+
+# Share of generated convergence rows that get a manual override.
+OVERRIDE_RATE = 0.002
+
+# Volumes shrink by this factor per year back from the newest generated month.
+YEARLY_TREND = 0.97
+
+
+@dataclass(frozen=True)
+class MonthlySpec:
+    model: type
+    year_field: str
+    month_field: str
+    station_fields: tuple
+    code_field: str = ""
+    # Added to (copy number * 10000) when --scale asks for more rows than the template has,
+    # so copies stay distinct under the model's unique constraint.
+    replica_field: str = ""
+    # Volume columns and the sigma of their log-normal jitter.
+    jitter: tuple = ()
+    year_is_text: bool = False
+
+
+MONTHLY_SPECS = (
+    MonthlySpec(
+        ConvergenceBusToRail,
+        "year",
+        "month",
+        ("train_station_name",),
+        code_field="train_station_code",
+        replica_field="train_number",
+        jitter=(("avg_passengers_per_trip", 0.15), ("train_ascending_amount", 0.15), ("observations_count", 0.1)),
+        year_is_text=True,
+    ),
+    MonthlySpec(
+        ConvergenceRailToBus,
+        "year",
+        "month",
+        ("train_station_name",),
+        code_field="train_station_code",
+        replica_field="train_number",
+        jitter=(("avg_passengers_per_trip", 0.15), ("train_descending_amount", 0.15)),
+        year_is_text=True,
+    ),
+    MonthlySpec(
+        RawBusData,
+        "year",
+        "month",
+        ("train_station_name",),
+        replica_field="makat",
+        jitter=(("ride_counts", 0.1),),
+        year_is_text=True,
+    ),
+    MonthlySpec(
+        TrainTime,
+        "Year",
+        "Month",
+        ("StationName",),
+        code_field="train_station_code",
+        replica_field="Train_number",
+        jitter=(("PassengersAscending", 0.15), ("PassengersDescending", 0.15)),
+    ),
+    MonthlySpec(
+        PassengerMatrix,
+        "year",
+        "month",
+        ("from_station_name", "to_station_name"),
+        jitter=(("sum_values_pass", 0.1),),
+    ),
+    MonthlySpec(
+        Ranking,
+        "year",
+        "month",
+        ("train_station_name",),
+        jitter=(("ascending_pass", 0.1), ("descending_pass", 0.1)),
+    ),
+)
+
+
+def month_range(end, count):
+    """The `count` months up to and including `end`, oldest first, as (year, month) pairs."""
+    year, month = end
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def _month_filter(spec, months):
+    query = Q()
+    for year, month in months:
+        query |= Q(**{spec.year_field: str(year) if spec.year_is_text else year, spec.month_field: month})
+    return query
+
+
+def existing_months(spec):
+    """(year, month) pairs present in the spec's table."""
+    pairs = spec.model.objects.values_list(spec.year_field, spec.month_field).distinct()
+    return {(int(year), int(month)) for year, month in pairs if str(year).strip().isdigit()}
+
+
+class Generator:
+    def __init__(self, months, scale=1.0, stations=None, seed=0, batch_size=5000, stdout=None):
+        self.months = months
+        self.scale = scale
+        self.station_count = stations
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.templates = {}
+        self.counts = {}
+        self.stations = StationResolver()
+
+    def load_templates(self, template_limit=12):
+        """Read up to `template_limit` of the newest real months per model; returns the models that have none."""
+        missing = []
+        target = set(self.months)
+        for spec in MONTHLY_SPECS:
+            available = sorted(existing_months(spec) - target)[-template_limit:]
+            if not available:
+                missing.append(spec.model.__name__)
+                continue
+            exclude = {"id", "row_hash"} if spec.model is TrainTime else {"id"}
+            fields = [f.attname for f in spec.model._meta.concrete_fields if f.name not in exclude]
+            rows = {}
+            for row in spec.model.objects.filter(_month_filter(spec, available)).values(*fields).iterator():
+                rows.setdefault((int(row[spec.year_field]), row[spec.month_field]), []).append(row)
+            self.templates[spec.model] = rows
+        self.bus_info = list(BusInfo.objects.values(*[f.attname for f in BusInfo._meta.concrete_fields if f.name != "id"]))
+        trains = {row["Train_number"] for rows in self.templates.get(TrainTime, {}).values() for row in rows}
+        self.routes = list(TrainRoute.objects.filter(train_num__in=trains).values(
+            *[f.attname for f in TrainRoute._meta.concrete_fields if f.name != "id"]
+        ))
+        self._plan_stations()
+        return missing
+
+    def _plan_stations(self):
+        # Real stations map to themselves; extra stations each copy a random real one.
+        # The station list comes from train times; other tables spell a few stations
+        # differently, and those variants are kept only while every real station is.
+        names = {
+            spec.model: {
+                row[field]
+                for rows in self.templates.get(spec.model, {}).values()
+                for row in rows
+                for field in spec.station_fields
+            }
+            for spec in MONTHLY_SPECS
+        }
+        real = sorted(names[TrainTime] or set().union(*names.values()))
+        variants = sorted(set().union(*names.values()) - set(real))
+        count = self.station_count or len(real)
+        self.station_total = count
+        self.extra_codes = {}
+        if count < len(real):
+            self.source = {name: name for name in sorted(self.rng.sample(real, count))}
+            return
+        self.source = {name: name for name in real + variants}
+        for number in range(len(real) + 1, count + 1):
+            name = f"תחנה {number}"
+            self.source[name] = self.rng.choice(real)
+            self.extra_codes[name] = 90000 + number
+
+    @property
+    def extra_stations(self):
+        return sorted(self.extra_codes)
+
+    def clear(self):
+        """Delete what an earlier run generated for these months and stations."""
+        for spec in MONTHLY_SPECS:
+            spec.model.objects.filter(_month_filter(spec, self.months)).delete()
+        OverrideConv.objects.filter(
+            changed_by=OVERRIDE_AUTHOR,
+            effective_month__in=[f"{year:04d}-{month:02d}" for year, month in self.months],
+        ).delete()
+        BusInfo.objects.filter(train_station_name__in=self.extra_stations).delete()
+        TrainRoute.objects.filter(train_num__in=self._replica_trains()).delete()
+
+    def run(self):
+        newest = self.months[-1]
+        for year, month in self.months:
+            trend = YEARLY_TREND ** (((newest[0] - year) * 12 + newest[1] - month) / 12)
+            # Give the month's raw bus rows a partition of their own first (MySQL only); a month left
+            # in a shared partition would be swapped out with the next re-import of its neighbour.
+            partitions.ensure_month_partitions([year * 100 + month])
+            with transaction.atomic():
+                for spec in MONTHLY_SPECS:
+                    rows = self._month_rows(spec, year, month, trend)
+                    self._write(spec.model, rows)
+                    if spec.model in (ConvergenceBusToRail, ConvergenceRailToBus):
+                        self._write(OverrideConv, self._overrides(spec.model, rows, year, month), ignore_conflicts=True)
+            build_month(year, month)
+            build_month_summaries([year * 100 + month])
+            if self.stdout is not None:
+                self.stdout.write(f"{year:04d}-{month:02d}: {sum(self.counts.values())} rows so far")
+        self._write(BusInfo, self._bus_info_rows())
+        self._write(TrainRoute, self._route_rows())
+        return self.counts
+
+    def _month_rows(self, spec, year, month, trend):
+        templates = self.templates[spec.model]
+        # Prefer a template from the same calendar month so seasonality carries over.
+        same_month = sorted(key for key in templates if key[1] == month)
+        template = templates[self.rng.choice(same_month or sorted(templates))]
+
+        rows = self._station_rows(spec, template)
+        if spec.replica_field:
+            rows = self._resample(spec, rows)
+
+        out = []
+        for row in rows:
+            row = dict(row)
+            row[spec.year_field] = str(year) if spec.year_is_text else year
+            row[spec.month_field] = month
+            if "year_month" in row:
+                row["year_month"] = year * 100 + month
+            for field, sigma in spec.jitter:
+                row[field] = self._jitter(row[field], sigma, trend)
+            out.append(row)
+
+        if spec.model is Ranking:
+            self._rerank(out)
+        if spec.model is TrainTime:
+            # Rows that differ only in passenger counts can meet after jitter; the table keeps one.
+            by_hash = {TrainTime.fingerprint(row): row for row in out}
+            return [TrainTime(row_hash=row_hash, **row) for row_hash, row in by_hash.items()]
+        return [spec.model(**row) for row in out]
+
+    def _station_rows(self, spec, template):
+        if len(spec.station_fields) == 2:
+            from_field, to_field = spec.station_fields
+            by_pair = {(row[from_field], row[to_field]): row for row in template}
+            outbound = {}
+            for row in template:
+                outbound.setdefault(row[from_field], row)
+            rows = []
+            for from_name, from_source in self.source.items():
+                for to_name, to_source in self.source.items():
+                    row = by_pair.get((from_source, to_source))
+                    if row is None and from_source == to_source:
+                        # An extra station and the station it copies: borrow that station's first flow.
+                        row = outbound.get(from_source)
+                    if row is not None and from_name != to_name:
+                        row = {**row, from_field: from_name, to_field: to_name}
+                        if (from_name, to_name) != (from_source, to_source):
+                            row.update(spec.model.station_keys(row, self.stations))
+                        rows.append(row)
+            return rows
+
+        (field,) = spec.station_fields
+        by_station = {}
+        for row in template:
+            by_station.setdefault(row[field], []).append(row)
+        rows = []
+        for name, source in self.source.items():
+            for row in by_station.get(source, ()):
+                row = {**row, field: name}
+                if name != source:
+                    if spec.code_field:
+                        row[spec.code_field] = self.extra_codes[name]
+                    row.update(spec.model.station_keys(row, self.stations))
+                rows.append(row)
+        return rows
+
+    def _resample(self, spec, rows):
+        if self.scale == 1 or not rows:
+            return rows
+        copies, fraction = divmod(self.scale, 1)
+        out = []
+        for copy in range(int(copies)):
+            out.extend(self._replica(spec, row, copy) for row in rows)
+        extra = round(len(rows) * fraction)
+        out.extend(self._replica(spec, row, int(copies)) for row in self.rng.sample(rows, extra))
+        return out
+
+    def _replica(self, spec, row, copy):
+        value = row[spec.replica_field]
+        if copy == 0 or value is None:
+            return row
+        return {**row, spec.replica_field: value + 10000 * copy}
+
+    def _jitter(self, value, sigma, trend):
+        if value is None:
+            return None
+        scaled = value * trend * self.rng.lognormvariate(0, sigma)
+        return round(scaled, 2) if isinstance(value, float) else max(0, round(scaled))
+
+    def _rerank(self, rows):
+        ordered = sorted(rows, key=lambda row: row["ascending_pass"] + row["descending_pass"], reverse=True)
+        for position, row in enumerate(ordered, start=1):
+            row["rank"] = f"{position} מתוך {len(ordered)}"
+
+    def _overrides(self, model, rows, year, month):
+        link_direction = "bus_to_rail" if model is ConvergenceBusToRail else "rail_to_bus"
+        candidates = [
+            row for row in rows
+            if row.makat is not None and row.direction is not None and row.train_number is not None
+        ]
+        picked = self.rng.sample(candidates, min(len(candidates), round(len(rows) * OVERRIDE_RATE)))
+        return [
+            OverrideConv(
+                week_period=row.week_period,
+                link_direction=link_direction,
+                makat=row.makat,
+                direction=row.direction,
+                alternative=row.alternative,
+                departure_time=row.departure_time,
+                station_name=row.train_station_name,
+                from_train_number=row.train_number,
+                from_train_rishui_train_arrival_time=row.rishui_train_arrival_time,
+                to_departure_time=row.departure_time,
+                to_train_number=row.train_number + 2,
+                to_train_rishui_train_arrival_time=row.rishui_train_arrival_time,
+                effective_month=f"{year:04d}-{month:02d}",
+                year_month=year * 100 + month,
+                change_reason="synthetic",
+                changed_by=OVERRIDE_AUTHOR,
+            )
+            for row in picked
+        ]
+
+    def _bus_info_rows(self):
+        # BusInfo has no month; only the extra stations need rows.
+        by_station = {}
+        for row in self.bus_info:
+            by_station.setdefault(row["train_station_name"], []).append(row)
+        rows = [
+            {**row, "train_station_name": name}
+            for name in self.extra_stations
+            for row in by_station.get(self.source[name], ())
+        ]
+        return [BusInfo(**{**row, **BusInfo.station_keys(row, self.stations)}) for row in rows]
+
+    def _replica_trains(self):
+        # Train numbers _replica gives the copies of template trains at this --scale.
+        return {row["train_num"] + 10000 * copy for copy in range(1, math.ceil(self.scale)) for row in self.routes}
+
+    def _route_rows(self):
+        # A replica train runs the route of the train it copies; routes already stored are kept.
+        replicas = self._replica_trains()
+        stored = set(TrainRoute.objects.filter(train_num__in=replicas).values_list(
+            "train_num", "train_station_order", "train_station_id", "train_station_name"
+        ))
+        rows = [
+            {**row, "train_num": row["train_num"] + 10000 * copy}
+            for copy in range(1, math.ceil(self.scale))
+            for row in self.routes
+        ]
+        return [
+            TrainRoute(**row) for row in rows
+            if (row["train_num"], row["train_station_order"], row["train_station_id"], row["train_station_name"])
+            not in stored
+        ]
+
+    def _write(self, model, objs, ignore_conflicts=False):
+        if objs:
+            model.objects.bulk_create(objs, batch_size=self.batch_size, ignore_conflicts=ignore_conflicts)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objs)
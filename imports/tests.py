@@ -0,0 +1,524 @@
+import pstats
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from bus_info_per_train_station_table.models import BusInfo
+from convergence.models import ConvergenceBusToRail, ConvergenceRailToBus, RawBusData
+from imports.ingest import (
+    SAMPLE_SIZE,
+    SourceError,
+    open_csv,
+    read_csv_frame,
+    to_decimal,
+    to_float,
+    to_int,
+    to_seconds_of_day,
+    to_year_month,
+)
+from imports.jobs import JobProgress, claim_next_job, enqueue
+from imports.models import ImportJob, ImportManifest
+from matrix_pass_table.models import PassengerMatrix
+from rating_table.models import Ranking
+from train_stations_order.models import Ranking as TrainRoute
+from train_times.models import TrainTime
+
+
+class ImportManifestTests(TestCase):
+    def _write_csv(self, content: str) -> Path:
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, encoding="utf-8", newline="")
+        try:
+            tmp.write(content)
+            path = Path(tmp.name)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def _rating_csv(self, rank="A"):
+        return (
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            f"2026,3,Tel Aviv,100,120,{rank}\n"
+        )
+
+    def _import_rating(self, path, *args):
+        out = StringIO()
+        call_command("import_rating_table", "--file", str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_records_manifest_row(self):
+        csv_path = self._write_csv(self._rating_csv())
+
+        self._import_rating(csv_path)
+
+        manifest = ImportManifest.objects.get(command="import_rating_table")
+        self.assertEqual(manifest.source_path, str(csv_path.resolve()))
+        self.assertEqual(manifest.size_bytes, csv_path.stat().st_size)
+        self.assertEqual(len(manifest.checksum), 64)
+        self.assertEqual(manifest.rows_processed, 1)
+        self.assertEqual(manifest.rows_inserted, 1)
+
+    def test_unchanged_file_is_skipped(self):
+        csv_path = self._write_csv(self._rating_csv())
+        self._import_rating(csv_path)
+        Ranking.objects.all().delete()
+
+        output = self._import_rating(csv_path)
+
+        self.assertIn("Skipping unchanged file", output)
+        self.assertFalse(Ranking.objects.exists())
+
+    def test_force_reimports_unchanged_file(self):
+        csv_path = self._write_csv(self._rating_csv())
+        self._import_rating(csv_path)
+        Ranking.objects.all().delete()
+
+        self._import_rating(csv_path, "--force")
+
+        self.assertTrue(Ranking.objects.exists())
+
+    def test_changed_file_is_reimported(self):
+        csv_path = self._write_csv(self._rating_csv())
+        self._import_rating(csv_path)
+        csv_path.write_text(self._rating_csv(rank="B"), encoding="utf-8")
+
+        self._import_rating(csv_path)
+
+        self.assertEqual(Ranking.objects.get(train_station_name="Tel Aviv").rank, "B")
+        self.assertEqual(ImportManifest.objects.count(), 1)
+
+    def test_dry_run_is_not_recorded(self):
+        csv_path = self._write_csv(self._rating_csv())
+
+        self._import_rating(csv_path, "--dry-run")
+
+        self.assertFalse(ImportManifest.objects.exists())
+
+    def test_convergence_skips_only_unchanged_files(self):
+        header = "Year,Month,WeekPeriod,Train_Station_Name,OfficeLineID,Direction,Alternative,TripStartTime,ArrivalTime,ride_counts\n"
+        february = self._write_csv(header + "2026,2,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+        march = self._write_csv(header + "2026,3,יום חול,אשקלון,45012,1,#,14:50,15:15:17,15\n")
+        call_command("import_convergence", "--raw-bus-file", str(february), stdout=StringIO())
+
+        out = StringIO()
+        call_command(
+            "import_convergence",
+            "--raw-bus-file", str(february),
+            "--raw-bus-file", str(march),
+            stdout=out,
+        )
+
+        self.assertIn("RawBusData CSV files processed: 1", out.getvalue())
+        self.assertIn("Unchanged files skipped: 1", out.getvalue())
+        self.assertEqual(RawBusData.objects.count(), 2)
+        self.assertEqual(ImportManifest.objects.filter(command="import_convergence").count(), 2)
+
+
+class ImportMonthTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def _write(self, name, content):
+        (self.root / name).write_text(content, encoding="utf-8")
+
+    def _write_rating(self, name, rank="A"):
+        self._write(
+            name,
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            f"2026,3,Tel Aviv,100,120,{rank}\n",
+        )
+
+    def _import_month(self, *args):
+        out = StringIO()
+        call_command("import_month", "--month", "2026-03", "--dir", str(self.root), *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_every_dataset_found_for_the_month(self):
+        self._write_rating("df_ranking_2026-03.csv")
+        self._write(
+            "passanger_matrix_2026-03.csv",
+            "from_station_name,to_station_name,month,year,sum_values_pass\nTel Aviv,Haifa,3,2026,100\n",
+        )
+        self._write_rating("df_ranking_2026-04.csv", rank="B")
+
+        output = self._import_month()
+
+        self.assertEqual(Ranking.objects.get(train_station_name="Tel Aviv").rank, "A")
+        self.assertEqual(PassengerMatrix.objects.count(), 1)
+        self.assertRegex(output, r"rating_table\s+imported.*rows=1 inserted=1")
+        self.assertRegex(output, r"matrix_pass_table\s+imported.*rows=1 inserted=1")
+        self.assertIn("train_times: no source files for 2026-03, skipped.", output)
+        self.assertIn("Month 2026-03 imported.", output)
+
+        self.assertRegex(self._import_month(), r"rating_table\s+unchanged")
+
+    def test_dry_run_reports_counts_from_command_output(self):
+        self._write_rating("df_ranking_2026-03.csv")
+
+        output = self._import_month("--dry-run")
+
+        self.assertRegex(output, r"rating_table\s+dry run.*rows=1 inserted=1 updated=0 invalid=0")
+        self.assertFalse(Ranking.objects.exists())
+
+    def test_failed_dataset_rolls_back_without_stopping_the_others(self):
+        self._write_rating("df_ranking_2026-03.csv")
+        self._write(
+            "passanger_matrix_2026-03.csv",
+            "from_station_name,to_station_name,month,year,sum_values_pass\nA,B,3,2026,5\nX,Y,13,2026,1\n",
+        )
+
+        with self.assertRaisesMessage(CommandError, "Import failed for: matrix_pass_table"):
+            self._import_month("--strict")
+
+        self.assertTrue(Ranking.objects.exists())
+        self.assertFalse(PassengerMatrix.objects.exists())
+        self.assertFalse(ImportManifest.objects.filter(command="import_matrix_pass_table").exists())
+
+    def test_month_must_be_year_dash_month(self):
+        with self.assertRaisesMessage(CommandError, "--month must look like YYYY-MM"):
+            call_command("import_month", "--month", "2026-5", "--dir", str(self.root))
+
+
+class ImportProfileTests(TestCase):
+    def _write_csv(self, content: str) -> Path:
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, encoding="utf-8", newline="")
+        try:
+            tmp.write(content)
+            path = Path(tmp.name)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def _import_rating(self, *args):
+        csv_path = self._write_csv(
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            "2026,3,Tel Aviv,100,120,A\n"
+            "2026,3,Haifa,80,90,B\n"
+        )
+        out = StringIO()
+        call_command("import_rating_table", "--file", str(csv_path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_profile_reports_phases_queries_and_memory(self):
+        output = self._import_rating("--profile")
+
+        self.assertIn("Profile:", output)
+        self.assertRegex(output, r"read\s+[\d.]+s.*\s2\s")
+        self.assertRegex(output, r"normalize\s+[\d.]+s")
+        self.assertRegex(output, r"db write\s+[\d.]+s\s+[\d.]+s\s+[\d.]+s\s+[1-9]\d*\s+2\s")
+        self.assertRegex(output, r"Total: [\d.]+s, [1-9]\d* SQL queries")
+        self.assertIn("Peak RSS:", output)
+
+    def test_profile_output_writes_cprofile_dump(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        dump_path = Path(tmp.name) / "rating.prof"
+
+        output = self._import_rating("--profile-output", str(dump_path))
+
+        self.assertIn(f"cProfile dump: {dump_path}", output)
+        stats = pstats.Stats(str(dump_path))
+        self.assertTrue(any(name == "_normalize_row" for _, _, name in stats.stats))
+
+    def test_no_report_without_profile(self):
+        self.assertNotIn("Profile:", self._import_rating())
+
+
+class IngestTests(TestCase):
+    def _write_bytes(self, data: bytes) -> Path:
+        tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        try:
+            tmp.write(data)
+            path = Path(tmp.name)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def _rows(self, path, **kwargs):
+        with open_csv(path, **kwargs) as reader:
+            return reader.fieldnames, list(reader)
+
+    def test_utf8_bom_is_stripped(self):
+        path = self._write_bytes("name,city\nתל אביב,חיפה\n".encode("utf-8-sig"))
+
+        fieldnames, rows = self._rows(path)
+
+        self.assertEqual(fieldnames, ["name", "city"])
+        self.assertEqual(rows, [{"name": "תל אביב", "city": "חיפה"}])
+
+    def test_cp1255_after_long_ascii_prefix_is_decoded(self):
+        # The first Hebrew text sits past the first sample block.
+        ascii_rows = "".join(f"row{i},plain\n" for i in range(SAMPLE_SIZE // 10))
+        path = self._write_bytes(("name,city\n" + ascii_rows + "last,לוד\n").encode("cp1255"))
+
+        _, rows = self._rows(path)
+
+        self.assertEqual(len(rows), SAMPLE_SIZE // 10 + 1)
+        self.assertEqual(rows[-1], {"name": "last", "city": "לוד"})
+
+    def test_aliases_and_case_folding_apply_to_header(self):
+        path = self._write_bytes(b" StationName ,Year\nLod,2026\n")
+
+        fieldnames, rows = self._rows(path, aliases={"stationname": "train_station_name"}, fold_case=True)
+
+        self.assertEqual(fieldnames, ["train_station_name", "year"])
+        self.assertEqual(rows[0]["train_station_name"], "Lod")
+
+    def test_undecodable_file_raises_source_error(self):
+        # 0xFF is undefined in cp1255 and ISO-8859-8 and never valid UTF-8.
+        path = self._write_bytes(b"name\n\xff\xff\n")
+
+        with self.assertRaises(SourceError):
+            self._rows(path)
+
+    def test_read_csv_frame_detects_encoding(self):
+        path = self._write_bytes("Name,count\nנתניה,3\n".encode("cp1255"))
+
+        df = read_csv_frame(path, aliases={"Name": "name"}, dtype=str, keep_default_na=False)
+
+        self.assertEqual(list(df.columns), ["name", "count"])
+        self.assertEqual(df.iloc[0].tolist(), ["נתניה", "3"])
+
+    def test_typed_coercion(self):
+        self.assertEqual(to_int(" 12.0 "), 12)
+        self.assertIsNone(to_int("nan"))
+        self.assertIsNone(to_int("abc"))
+        self.assertEqual(to_float("1,234.5"), 1234.5)
+        self.assertEqual(str(to_decimal("87.5%")), "87.5")
+        self.assertIsNone(to_decimal(""))
+
+    def test_clock_times(self):
+        self.assertEqual(to_seconds_of_day("08:37"), 8 * 3600 + 37 * 60)
+        self.assertEqual(to_seconds_of_day(" 08:37:33 "), 8 * 3600 + 37 * 60 + 33)
+        self.assertEqual(to_seconds_of_day("1899-12-30 08:37:33.000"), 8 * 3600 + 37 * 60 + 33)
+        self.assertEqual(to_seconds_of_day("2026-02-01T25:10:00+02:00"), 25 * 3600 + 10 * 60)
+        self.assertIsNone(to_seconds_of_day(""))
+        self.assertIsNone(to_seconds_of_day("nan"))
+        self.assertIsNone(to_seconds_of_day("בוקר"))
+
+    def test_year_month(self):
+        self.assertEqual(to_year_month("2026", 3), 202603)
+        self.assertEqual(to_year_month(2025.0, "12"), 202512)
+        self.assertIsNone(to_year_month("2026", 13))
+        self.assertIsNone(to_year_month("", 3))
+
+
+class ImportJobTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def _write_rating(self, name="df_ranking_2026-03.csv", rows=1):
+        path = self.root / name
+        path.write_text(
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            + "".join(f"2026,3,Station {i},100,120,A\n" for i in range(rows)),
+            encoding="utf-8",
+        )
+        return path
+
+    def _run_worker(self, *args):
+        out = StringIO()
+        call_command("run_import_worker", "--once", *args, stdout=out)
+        return out.getvalue()
+
+    def test_worker_runs_queued_job_and_records_counts(self):
+        job = enqueue("rating_table", self._write_rating(rows=3), requested_by="staff")
+
+        output = self._run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.SUCCEEDED)
+        self.assertEqual(job.message, "imported")
+        self.assertEqual((job.rows_processed, job.rows_inserted, job.rows_invalid), (3, 3, 0))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Ranking.objects.count(), 3)
+        self.assertIn("Jobs run: 1", output)
+
+    def test_dry_run_job_counts_come_from_command_output(self):
+        job = enqueue("rating_table", self._write_rating(rows=2), dry_run=True)
+
+        self._run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.message, "dry run")
+        self.assertEqual((job.rows_processed, job.rows_inserted), (2, 2))
+        self.assertFalse(Ranking.objects.exists())
+
+    def test_missing_file_fails_job_and_worker_moves_on(self):
+        missing = enqueue("rating_table", self.root / "nope.csv")
+        ok = enqueue("rating_table", self._write_rating())
+
+        self._run_worker()
+
+        missing.refresh_from_db()
+        ok.refresh_from_db()
+        self.assertEqual(missing.status, ImportJob.Status.FAILED)
+        self.assertIn("CSV file not found", missing.message)
+        self.assertEqual(ok.status, ImportJob.Status.SUCCEEDED)
+
+    def test_progress_lines_update_job_while_running(self):
+        job = enqueue("train_times", self.root / "times.csv")
+
+        JobProgress(job).write("Processed 1000 rows (inserted=990, existing=7, invalid=3)\n")
+
+        job.refresh_from_db()
+        self.assertEqual((job.rows_processed, job.rows_inserted, job.rows_invalid), (1000, 990, 3))
+        self.assertIsNotNone(job.progress_at)
+
+    def test_job_is_claimed_once(self):
+        enqueue("rating_table", self._write_rating())
+
+        self.assertIsNotNone(claim_next_job("worker-a"))
+        self.assertIsNone(claim_next_job("worker-b"))
+
+    def test_import_month_enqueue_creates_one_job_per_file(self):
+        self._write_rating()
+
+        out = StringIO()
+        call_command("import_month", "--month", "2026-03", "--dir", str(self.root), "--enqueue", "--force", stdout=out)
+
+        job = ImportJob.objects.get()
+        self.assertEqual((job.dataset, job.status, job.force), ("rating_table", ImportJob.Status.QUEUED, True))
+        self.assertFalse(Ranking.objects.exists())
+
+    def test_status_endpoint_requires_permission(self):
+        job = enqueue("rating_table", self._write_rating())
+        url = reverse("import_job_status", args=[job.pk])
+        user = User.objects.create_user("staff", password="x")
+        self.client.force_login(user)
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        user.user_permissions.add(Permission.objects.get(codename="view_importjob"))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["job"]["status"], "queued")
+        self.assertEqual(self.client.get(reverse("import_job_status", args=[job.pk + 1])).status_code, 404)
+        self.assertEqual(len(self.client.get(reverse("import_job_list"), {"status": "queued"}).json()["jobs"]), 1)
+
+
+class SyntheticDataTests(TestCase):
+    STATIONS = ("Alpha", "Beta")
+
+    def setUp(self):
+        # One real month (2026-03) of every dataset for the generator to sample from.
+        for number, station in enumerate(self.STATIONS, start=1):
+            convergence = dict(
+                year="2026", month=3, week_period="weekday", train_station_name=station,
+                train_station_code=number, rail_direction="north", is_gold_train="no", express_train="no",
+                rishui_train_arrival_time="08:00", operator="Op", makat=10 + number, direction=1,
+                alternative="A", departure_time="08:05", train_number=100 + number, avg_passengers_per_trip=12.5,
+            )
+            ConvergenceBusToRail.objects.create(
+                **convergence, arrival_time_to_station="07:55", arrival_time_window="07:50-08:00",
+                train_ascending_amount=40, observations_count=5,
+            )
+            ConvergenceRailToBus.objects.create(**convergence, train_descending_amount=30)
+            RawBusData.objects.create(
+                year="2026", month=3, week_period="weekday", train_station_name=station, makat=10 + number,
+                alternative="A", departure_time="08:05", bus_arrival_time_to_station="08:00",
+                rail_direction="north", ride_counts=7,
+            )
+            values = dict(
+                Year=2026, Month=3, WeekPeriod="weekday", train_station_code=number, StationName=station,
+                Train_number=100 + number, event_type="departure", planned_time="08:00",
+                PassengersAscending=50, PassengersDescending=40,
+            )
+            TrainTime.objects.create(row_hash=TrainTime.fingerprint(values), **values)
+            Ranking.objects.create(
+                year=2026, month=3, train_station_name=station, ascending_pass=100 * number,
+                descending_pass=90, rank=f"{number} מתוך 2",
+            )
+            BusInfo.objects.create(
+                train_station_name=station, operator="Op", bus_code_name=number, bus_station_name="Stop",
+                officelineid=number, line=number, direction=1, alternative="A", line_type="urban",
+                start_stopcode="1", end_stopcode="2", week_period="weekday", bus_direction="north",
+            )
+        PassengerMatrix.objects.create(
+            year=2026, month=3, from_station_name="Alpha", to_station_name="Beta", sum_values_pass=300
+        )
+        PassengerMatrix.objects.create(
+            year=2026, month=3, from_station_name="Beta", to_station_name="Alpha", sum_values_pass=280
+        )
+
+    def _generate(self, *args):
+        out = StringIO()
+        call_command("generate_synthetic_data", *args, stdout=out)
+        return out.getvalue()
+
+    def _synthetic_ranking(self):
+        return list(Ranking.objects.exclude(month=3).order_by("year", "month", "train_station_name").values_list(
+            "year", "month", "train_station_name", "ascending_pass", "descending_pass", "rank"
+        ))
+
+    def test_generates_months_before_the_imported_ones(self):
+        output = self._generate("--months", "3", "--seed", "1")
+
+        months = set(TrainTime.objects.values_list("Year", "Month"))
+        self.assertEqual(months, {(2025, 12), (2026, 1), (2026, 2), (2026, 3)})
+        self.assertEqual(set(ConvergenceBusToRail.objects.values_list("year", "month")) - {("2026", 3)},
+                         {("2025", 12), ("2026", 1), ("2026", 2)})
+        self.assertEqual(set(RawBusData.objects.values_list("year_month", flat=True)), {202512, 202601, 202602, 202603})
+        self.assertEqual(PassengerMatrix.objects.filter(year=2026, month=2).count(), 2)
+        self.assertEqual(Ranking.objects.filter(year=2025, month=12).count(), 2)
+        self.assertIn("Months: 2025-12 .. 2026-02", output)
+
+    def test_same_seed_gives_same_rows(self):
+        self._generate("--months", "2", "--seed", "7")
+        first = self._synthetic_ranking()
+
+        self._generate("--months", "2", "--end", "2026-02", "--seed", "7", "--replace")
+
+        self.assertEqual(self._synthetic_ranking(), first)
+
+    def test_extra_stations_copy_real_ones(self):
+        output = self._generate("--months", "1", "--stations", "4", "--seed", "1")
+
+        stations = set(TrainTime.objects.filter(Month=2).values_list("StationName", flat=True))
+        self.assertEqual(stations, {"Alpha", "Beta", "תחנה 3", "תחנה 4"})
+        self.assertEqual(TrainTime.objects.get(Month=2, StationName="תחנה 3").station.code, 90003)
+        self.assertEqual(Ranking.objects.get(month=2, train_station_name="תחנה 4").station.code, 90004)
+        self.assertEqual(BusInfo.objects.filter(train_station_name__startswith="תחנה").count(), 2)
+        self.assertEqual(PassengerMatrix.objects.filter(month=2).count(), 12)
+        self.assertIn("Stations: 4 (2 synthetic)", output)
+
+    def test_scale_resamples_rows_per_station(self):
+        self._generate("--months", "1", "--scale", "3", "--seed", "1")
+
+        numbers = sorted(TrainTime.objects.filter(Month=2).values_list("Train_number", flat=True))
+        self.assertEqual(numbers, [101, 102, 10101, 10102, 20101, 20102])
+
+    def test_scale_copies_train_routes(self):
+        TrainRoute.objects.create(train_num=101, train_station_id=1, train_station_order=1, train_station_name="Alpha")
+        TrainRoute.objects.create(train_num=101, train_station_id=2, train_station_order=2, train_station_name="Beta")
+
+        self._generate("--months", "1", "--scale", "2", "--seed", "1")
+        self._generate("--months", "1", "--end", "2026-02", "--scale", "2", "--seed", "1", "--replace")
+
+        routes = list(TrainRoute.objects.order_by("train_num", "train_station_order").values_list(
+            "train_num", "train_station_order", "train_station_name"
+        ))
+        self.assertEqual(routes, [(101, 1, "Alpha"), (101, 2, "Beta"), (10101, 1, "Alpha"), (10101, 2, "Beta")])
+
+    def test_existing_months_need_replace(self):
+        with self.assertRaisesMessage(CommandError, "Data already exists for 2026-03"):
+            self._generate("--months", "1", "--end", "2026-03")
+
+    def test_empty_database_is_an_error(self):
+        Ranking.objects.all().delete()
+
+        with self.assertRaisesMessage(CommandError, "No imported months to sample from for: Ranking"):
+            self._generate("--months", "1")
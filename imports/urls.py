@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("jobs/", views.job_list, name="import_job_list"),
+    path("jobs/<int:job_id>/", views.job_status, name="import_job_status"),
+]
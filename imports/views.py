@@ -0,0 +1,49 @@
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from imports.models import ImportJob
+
+
+def _job_payload(job):
+    return {
+        "id": job.pk,
+        "dataset": job.dataset,
+        "source_path": job.source_path,
+        "status": job.status,
+        "message": job.message,
+        "dry_run": job.dry_run,
+        "rows_processed": job.rows_processed,
+        "rows_inserted": job.rows_inserted,
+        "rows_updated": job.rows_updated,
+        "rows_invalid": job.rows_invalid,
+        "requested_by": job.requested_by,
+        "worker": job.worker,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "progress_at": job.progress_at.isoformat() if job.progress_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@require_GET
+@login_required
+@permission_required("imports.view_importjob", raise_exception=True)
+def job_status(request, job_id):
+    job = ImportJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({"ok": False, "error": "not_found"}, status=404)
+    return JsonResponse({"ok": True, "job": _job_payload(job)})
+
+
+@require_GET
+@login_required
+@permission_required("imports.view_importjob", raise_exception=True)
+def job_list(request):
+    jobs = ImportJob.objects.order_by("-created_at", "-id")
+    status = (request.GET.get("status") or "").strip()
+    if status:
+        if status not in ImportJob.Status.values:
+            return JsonResponse({"ok": False, "error": "invalid_status"}, status=400)
+        jobs = jobs.filter(status=status)
+    return JsonResponse({"ok": True, "jobs": [_job_payload(job) for job in jobs[:50]]})
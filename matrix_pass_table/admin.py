@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PassengerMatrix
+from .models import PassengerMatrix, PassengerMatrixMonth
 
 admin.site.register(PassengerMatrix)
-
+admin.site.register(PassengerMatrixMonth)
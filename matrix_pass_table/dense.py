@@ -0,0 +1,129 @@
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from matrix_pass_table.models import PassengerMatrix, PassengerMatrixMonth
+from stations.lookup import normalize_name
+
+
+# Cells with no PassengerMatrix row. Kept apart from 0 so pivots list the same
+# destinations as the table does.
+MISSING = -1
+
+# Months already opened by this process, keyed by checksum. A rebuild changes the
+# checksum, so stale entries are simply never looked up again.
+_opened = {}
+
+
+@dataclass
+class DenseMonth:
+    year: int
+    month: int
+    stations: list
+    matrix: np.ndarray
+    index: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.index = {name: i for i, name in enumerate(self.stations)}
+
+    def origins(self, spellings):
+        """Station names of this month that, normalized, are one of `spellings` (a station's aliases)."""
+        return [name for name in self.stations if normalize_name(name) in spellings]
+
+    def row(self, from_station_name):
+        """Return [(to_station_name, sum_values_pass)] for one origin, sorted by destination."""
+        i = self.index.get(from_station_name)
+        if i is None:
+            return []
+        values = self.matrix[i]
+        return [(self.stations[j], int(values[j])) for j in np.flatnonzero(values != MISSING)]
+
+
+def build_month(year, month):
+    """Rebuild the dense array for (year, month) from PassengerMatrix; drop it if the month is empty."""
+    rows = list(
+        PassengerMatrix.objects.filter(year=year, month=month).values_list(
+            "from_station_name", "to_station_name", "sum_values_pass"
+        )
+    )
+    if not rows:
+        PassengerMatrixMonth.objects.filter(year=year, month=month).delete()
+        return None
+
+    stations = sorted({name for from_name, to_name, _ in rows for name in (from_name, to_name)})
+    index = {name: i for i, name in enumerate(stations)}
+    matrix = np.full((len(stations), len(stations)), MISSING, dtype=np.int32)
+    from_idx, to_idx, values = zip(*((index[f], index[t], v) for f, t, v in rows))
+    matrix[list(from_idx), list(to_idx)] = values
+
+    buffer = io.BytesIO()
+    np.save(buffer, matrix, allow_pickle=False)
+    data = buffer.getvalue()
+    entry, _ = PassengerMatrixMonth.objects.update_or_create(
+        year=year,
+        month=month,
+        defaults={"stations": stations, "checksum": hashlib.sha256(data).hexdigest(), "data": data},
+    )
+    return entry
+
+
+def cache_root():
+    # OD_MATRIX_CACHE_DIR = None disables the on-disk copy; arrays are then read from the blob.
+    configured = getattr(settings, "OD_MATRIX_CACHE_DIR", None)
+    return Path(configured).expanduser() if configured else None
+
+
+def load_month(year, month):
+    """
+    Return a DenseMonth for (year, month), or None if it has not been built.
+
+    The blob is written once per checksum to OD_MATRIX_CACHE_DIR and memory-mapped
+    from there; later calls in the same process cost one checksum lookup.
+    """
+    queryset = PassengerMatrixMonth.objects.filter(year=year, month=month)
+    checksum = queryset.values_list("checksum", flat=True).first()
+    if checksum is None:
+        return None
+    if checksum in _opened:
+        return _opened[checksum]
+
+    stations = queryset.values_list("stations", flat=True).get()
+    root = cache_root()
+    matrix = _load_cached(root, checksum) if root is not None else None
+    if matrix is None:
+        data = bytes(queryset.values_list("data", flat=True).get())
+        if root is not None:
+            matrix = _store(root, checksum, data)
+        if matrix is None:
+            matrix = np.load(io.BytesIO(data), allow_pickle=False)
+
+    if len(_opened) >= 24:
+        _opened.clear()
+    _opened[checksum] = DenseMonth(year=year, month=month, stations=stations, matrix=matrix)
+    return _opened[checksum]
+
+
+def _load_cached(root, checksum):
+    try:
+        return np.load(root / f"{checksum}.npy", mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(root, checksum, data):
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent requests never map a half-written file.
+        fd, tmp_name = tempfile.mkstemp(dir=root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_name, root / f"{checksum}.npy")
+    except OSError:
+        return None
+    return _load_cached(root, checksum)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from matrix_pass_table.dense import build_month
+from matrix_pass_table.models import PassengerMatrix
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dense per-month arrays in matrix_pass_table_passengermatrixmonth from PassengerMatrix."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild months of this year.")
+        parser.add_argument("--month", type=int, help="Only rebuild this month (1-12).")
+
+    def handle(self, *args, **options):
+        queryset = PassengerMatrix.objects.all()
+        if options["year"] is not None:
+            queryset = queryset.filter(year=options["year"])
+        if options["month"] is not None:
+            queryset = queryset.filter(month=options["month"])
+
+        months = queryset.values_list("year", "month").distinct().order_by("year", "month")
+        built = 0
+        for year, month in months:
+            entry = build_month(year, month)
+            built += 1
+            self.stdout.write(f"{month}/{year}: {len(entry.stations)} stations")
+
+        self.stdout.write(self.style.SUCCESS(f"Dense matrices rebuilt: {built}"))
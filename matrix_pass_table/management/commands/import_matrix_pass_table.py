@@ -1,10 +1,15 @@
-import csv
 from pathlib import Path
+from time import monotonic
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from imports.ingest import chunked, open_csv
+from imports.manifest import previous_import, record_import, skip_message, source_fingerprint
+from imports.profiling import ProfiledCommandMixin, add_profile_arguments
+from matrix_pass_table.dense import build_month
 from matrix_pass_table.models import PassengerMatrix
+from stations.lookup import StationResolver
 
 
 REQUIRED_COLUMNS = (
@@ -16,7 +21,10 @@ REQUIRED_COLUMNS = (
 )
 
 
-class Command(BaseCommand):
+MANIFEST_COMMAND = "import_matrix_pass_table"
+
+
+class Command(ProfiledCommandMixin, BaseCommand):
     help = "Import rows into matrix_pass_table_passengermatrix from a CSV file using upsert semantics."
     HEADER_ALIASES = {
         "fromstationname": "from_station_name",
@@ -46,8 +54,14 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Reserved for future bulk operations; currently used for progress reporting only.",
+            help="Number of rows read and written per bulk operation (also the progress reporting interval).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-import the file even if the import manifest shows it unchanged.",
         )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
         csv_path = Path(options["file"]).expanduser()
@@ -61,71 +75,94 @@ class Command(BaseCommand):
         if not csv_path.exists():
             raise CommandError(f"CSV file not found: {csv_path}")
 
-        rows = self._read_rows(csv_path)
-        if not rows:
-            self.stdout.write(self.style.WARNING("No rows found. Nothing to import."))
-            return
+        fingerprint = source_fingerprint(csv_path)
+        if not options["force"]:
+            manifest = previous_import(MANIFEST_COMMAND, fingerprint)
+            if manifest is not None:
+                self.stdout.write(self.style.WARNING(skip_message(csv_path, manifest)))
+                return
+        started = monotonic()
+        self.stations = StationResolver()
 
-        self._validate_header(rows[0].keys())
+        with open_csv(csv_path, aliases=self.HEADER_ALIASES, fold_case=True) as reader:
+            if reader.fieldnames is None:
+                raise CommandError("CSV file is missing a header row.")
+            self._validate_header(reader.fieldnames)
 
-        if strict and not dry_run:
-            with transaction.atomic():
-                totals = self._process_rows(rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
-        else:
-            totals = self._process_rows(rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            if strict and not dry_run:
+                with transaction.atomic():
+                    totals = self._process_rows(reader, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            else:
+                totals = self._process_rows(reader, dry_run=dry_run, strict=strict, batch_size=batch_size)
+
+        if totals["total_rows"] == 0:
+            self.stdout.write(self.style.WARNING("No rows found. Nothing to import."))
+            return
 
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("Import completed."))
         self.stdout.write(f"Rows processed: {totals['total_rows']}")
         self.stdout.write(f"Inserted: {totals['inserted']}")
         self.stdout.write(f"Updated: {totals['updated']}")
+        self.stdout.write(f"Unchanged: {totals['unchanged']}")
         self.stdout.write(f"Invalid: {totals['invalid']}")
         self.stdout.write(f"Dry run: {'yes' if dry_run else 'no'}")
 
         if strict and totals["invalid"] > 0:
             raise CommandError("Import failed in --strict mode due to invalid rows.")
 
-    def _process_rows(self, rows, dry_run, strict, batch_size):
-        totals = {"total_rows": 0, "inserted": 0, "updated": 0, "invalid": 0}
+        if not dry_run:
+            # Keep the dense per-month arrays read by main_page in step with the table.
+            with self.profiler.phase("dense matrices"):
+                for year, month in sorted(self.months):
+                    build_month(year, month)
+            self.stdout.write(f"Dense matrices rebuilt: {len(self.months)}")
+            record_import(MANIFEST_COMMAND, fingerprint, totals, monotonic() - started)
 
-        for index, row in enumerate(rows, start=2):
-            totals["total_rows"] += 1
-            try:
-                payload = self._normalize_row(row, index)
-                created = self._upsert(payload, dry_run=dry_run)
-                if created:
-                    totals["inserted"] += 1
-                else:
-                    totals["updated"] += 1
-            except CommandError as exc:
-                totals["invalid"] += 1
-                if strict:
-                    raise
-                self.stderr.write(self.style.WARNING(str(exc)))
-
-            if totals["total_rows"] % batch_size == 0:
-                self.stdout.write(
-                    f"Processed {totals['total_rows']} rows "
-                    f"(inserted={totals['inserted']}, updated={totals['updated']}, invalid={totals['invalid']})"
-                )
+    def _process_rows(self, rows, dry_run, strict, batch_size):
+        totals = {"total_rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0}
+        self.months = set()
+        # Each chunk is diffed against one snapshot of the stations and months it touches; rows
+        # identical to it are never written. A dry run writes nothing, so it keeps earlier chunks' keys.
+        existing = {}
+        chunks = self.profiler.iterate("read", chunked(enumerate(rows, start=2), batch_size), count=len)
+        for chunk in chunks:
+            with self.profiler.phase("db write"):
+                snapshot = self._existing_rows(row for _, row in chunk)
+            if dry_run:
+                for key, values in snapshot.items():
+                    existing.setdefault(key, values)
+            else:
+                existing = snapshot
+
+            for index, row in chunk:
+                totals["total_rows"] += 1
+                try:
+                    with self.profiler.phase("normalize") as phase:
+                        payload = self._normalize_row(row, index)
+                        phase.rows += 1
+                    self.months.add((payload["year"], payload["month"]))
+                    with self.profiler.phase("db write") as phase:
+                        outcome = self._diff(payload, existing)
+                        if outcome != "unchanged" and not dry_run:
+                            outcome = "inserted" if self._upsert(payload) else "updated"
+                        phase.rows += 1
+                    totals[outcome] += 1
+                except CommandError as exc:
+                    totals["invalid"] += 1
+                    if strict:
+                        raise
+                    self.stderr.write(self.style.WARNING(str(exc)))
+
+                if totals["total_rows"] % batch_size == 0:
+                    self.stdout.write(
+                        f"Processed {totals['total_rows']} rows "
+                        f"(inserted={totals['inserted']}, updated={totals['updated']}, "
+                        f"unchanged={totals['unchanged']}, invalid={totals['invalid']})"
+                    )
 
         return totals
 
-    def _read_rows(self, csv_path: Path):
-        with csv_path.open("r", encoding="utf-8-sig", newline="") as fp:
-            reader = csv.DictReader(fp)
-            if reader.fieldnames is None:
-                raise CommandError("CSV file is missing a header row.")
-            rows = []
-            for raw in reader:
-                row = {self._canonical_col(k): v for k, v in raw.items()}
-                rows.append(row)
-            return rows
-
-    def _canonical_col(self, name: str) -> str:
-        key = str(name).strip().lower()
-        return self.HEADER_ALIASES.get(key, key)
-
     def _validate_header(self, columns):
         missing = [name for name in REQUIRED_COLUMNS if name not in columns]
         extras = [name for name in columns if name not in REQUIRED_COLUMNS]
@@ -165,18 +202,39 @@ class Command(BaseCommand):
             "sum_values_pass": sum_values_pass,
         }
 
-    def _upsert(self, payload, dry_run=False):
+    def _upsert(self, payload):
         lookup = {
             "from_station_name": payload["from_station_name"],
             "to_station_name": payload["to_station_name"],
             "month": payload["month"],
             "year": payload["year"],
         }
-        defaults = {"sum_values_pass": payload["sum_values_pass"]}
-
-        if dry_run:
-            exists = PassengerMatrix.objects.filter(**lookup).exists()
-            return not exists
+        defaults = {"sum_values_pass": payload["sum_values_pass"], **PassengerMatrix.station_keys(payload, self.stations)}
 
         _, created = PassengerMatrix.objects.update_or_create(defaults=defaults, **lookup)
         return created
+
+    def _existing_rows(self, rows):
+        years, months, stations = set(), set(), set()
+        for row in rows:
+            try:
+                years.add(int(str(row["year"]).strip()))
+                months.add(int(str(row["month"]).strip()))
+            except (TypeError, ValueError):
+                continue
+            stations.add(str(row["from_station_name"]).strip())
+
+        queryset = PassengerMatrix.objects.filter(
+            year__in=years, month__in=months, from_station_name__in=stations
+        ).values_list("from_station_name", "to_station_name", "month", "year", "sum_values_pass")
+        return {values[:4]: values[4:] for values in queryset}
+
+    def _diff(self, payload, existing):
+        key = (payload["from_station_name"], payload["to_station_name"], payload["month"], payload["year"])
+        values = (payload["sum_values_pass"],)
+        previous = existing.get(key)
+        # Later rows with the same key see this one, as update_or_create would.
+        existing[key] = values
+        if previous is None:
+            return "inserted"
+        return "unchanged" if previous == values else "updated"
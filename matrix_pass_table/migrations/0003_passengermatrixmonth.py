@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matrix_pass_table', '0002_passengermatrix_uniq_pass_matrix_pair_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassengerMatrixMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('stations', models.JSONField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('data', models.BinaryField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'month'), name='uniq_pass_matrix_month')],
+            },
+        ),
+    ]
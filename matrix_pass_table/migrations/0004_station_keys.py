@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matrix_pass_table', '0003_passengermatrixmonth'),
+        ('stations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='passengermatrix',
+            name='from_station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='stations.station'),
+        ),
+        migrations.AddField(
+            model_name='passengermatrix',
+            name='to_station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='stations.station'),
+        ),
+        migrations.AddIndex(
+            model_name='passengermatrix',
+            index=models.Index(fields=['from_station', 'year', 'month'], name='pass_matrix_from_month_idx'),
+        ),
+    ]
@@ -1,10 +1,18 @@
 # <matrix passengers>/models.py
 from django.db import models
 
+from stations.lookup import StationKeyMixin
+
+
+class PassengerMatrix(StationKeyMixin, models.Model):
+    STATION_KEYS = (("from_station", "from_station_name", None), ("to_station", "to_station_name", None))
 
-class PassengerMatrix(models.Model):
     from_station_name = models.CharField(max_length=255)
     to_station_name = models.CharField(max_length=255)
+    from_station = models.ForeignKey(
+        "stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False, related_name="+"
+    )
+    to_station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, related_name="+")
     month = models.IntegerField()
     year = models.IntegerField()
     sum_values_pass = models.IntegerField()
@@ -16,6 +24,28 @@ class PassengerMatrix(models.Model):
                 name="uniq_pass_matrix_pair_month"
             )
         ]
+        indexes = [
+            models.Index(fields=("from_station", "year", "month"), name="pass_matrix_from_month_idx"),
+        ]
 
     def __str__(self):
         return f"{self.from_station_name} -> {self.to_station_name} ({self.month}/{self.year})"
+
+
+class PassengerMatrixMonth(models.Model):
+    # Dense copy of one month of PassengerMatrix: an int32 .npy array indexed by `stations`,
+    # rows are from_station_name and columns to_station_name. Built by matrix_pass_table.dense.
+    year = models.IntegerField()
+    month = models.IntegerField()
+    stations = models.JSONField()
+    checksum = models.CharField(max_length=64)
+    data = models.BinaryField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["year", "month"], name="uniq_pass_matrix_month")
+        ]
+
+    def __str__(self):
+        return f"{len(self.stations)}x{len(self.stations)} matrix ({self.month}/{self.year})"
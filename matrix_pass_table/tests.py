@@ -3,9 +3,14 @@ from pathlib import Path
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from matrix_pass_table.models import PassengerMatrix
+import numpy as np
+
+from matrix_pass_table import dense as dense_module
+from matrix_pass_table.dense import MISSING, build_month, load_month
+from matrix_pass_table.models import PassengerMatrix, PassengerMatrixMonth
+from stations.lookup import StationResolver
 
 
 class ImportMatrixPassTableCommandTests(TestCase):
@@ -95,3 +100,117 @@ class ImportMatrixPassTableCommandTests(TestCase):
 
         with self.assertRaises(CommandError):
             call_command("import_matrix_pass_table", "--file", str(csv_path))
+
+
+class PassengerMatrixMonthTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        settings_override = override_settings(OD_MATRIX_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(dense_module._opened.clear)
+        dense_module._opened.clear()
+
+    def _write_csv(self, content: str) -> Path:
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, encoding="utf-8", newline="")
+        try:
+            tmp.write(content)
+            path = Path(tmp.name)
+            self.addCleanup(path.unlink, missing_ok=True)
+            return path
+        finally:
+            tmp.close()
+
+    def test_import_builds_dense_month(self):
+        csv_path = self._write_csv(
+            "from_station_name,to_station_name,month,year,sum_values_pass\n"
+            "Tel Aviv,Haifa,3,2026,100\n"
+            "Tel Aviv,Ashdod,3,2026,0\n"
+            "Haifa,Tel Aviv,3,2026,80\n"
+            "Haifa,Tel Aviv,4,2026,7\n"
+        )
+
+        call_command("import_matrix_pass_table", "--file", str(csv_path))
+
+        self.assertEqual(PassengerMatrixMonth.objects.count(), 2)
+        dense = load_month(2026, 3)
+        self.assertEqual(dense.stations, ["Ashdod", "Haifa", "Tel Aviv"])
+        self.assertEqual(dense.row("Tel Aviv"), [("Ashdod", 0), ("Haifa", 100)])
+        self.assertEqual(dense.row("Haifa"), [("Tel Aviv", 80)])
+        self.assertEqual(dense.matrix[dense.index["Ashdod"], dense.index["Haifa"]], MISSING)
+        self.assertEqual(dense.row("Eilat"), [])
+
+    def test_load_month_memory_maps_cached_array(self):
+        PassengerMatrix.objects.create(
+            from_station_name="A", to_station_name="B", month=5, year=2026, sum_values_pass=9
+        )
+        entry = build_month(2026, 5)
+
+        dense = load_month(2026, 5)
+
+        self.assertIsInstance(dense.matrix, np.memmap)
+        self.assertTrue((self.cache_dir / f"{entry.checksum}.npy").exists())
+        self.assertEqual(load_month(2026, 5).row("A"), [("B", 9)])
+
+    def test_build_month_reflects_updates_and_deletes(self):
+        row = PassengerMatrix.objects.create(
+            from_station_name="A", to_station_name="B", month=5, year=2026, sum_values_pass=9
+        )
+        first = build_month(2026, 5)
+        row.sum_values_pass = 12
+        row.save()
+
+        second = build_month(2026, 5)
+
+        self.assertNotEqual(first.checksum, second.checksum)
+        self.assertEqual(load_month(2026, 5).row("A"), [("B", 12)])
+        row.delete()
+        self.assertIsNone(build_month(2026, 5))
+        self.assertIsNone(load_month(2026, 5))
+
+    def test_dry_run_does_not_build(self):
+        csv_path = self._write_csv(
+            "from_station_name,to_station_name,month,year,sum_values_pass\n"
+            "Tel Aviv,Haifa,3,2026,100\n"
+        )
+
+        call_command("import_matrix_pass_table", "--file", str(csv_path), "--dry-run")
+
+        self.assertFalse(PassengerMatrixMonth.objects.exists())
+
+    def test_main_page_pivot_matches_table(self):
+        for to_station, value in (("Haifa", 100), ("Ashdod", 0)):
+            PassengerMatrix.objects.create(
+                from_station_name="Tel Aviv", to_station_name=to_station, month=3, year=2026, sum_values_pass=value
+            )
+        PassengerMatrix.objects.create(
+            from_station_name="Haifa", to_station_name="Lod", month=3, year=2026, sum_values_pass=5
+        )
+        params = {"station": "Tel Aviv", "year": "2026", "month": "3"}
+        from_table = self.client.get("/main_page/", params).context
+
+        build_month(2026, 3)
+        from_dense = self.client.get("/main_page/", params).context
+
+        self.assertEqual(from_table["matrix_cols"], ["Ashdod", "Haifa"])
+        self.assertEqual(from_dense["matrix_cols"], from_table["matrix_cols"])
+        self.assertEqual(from_dense["matrix_rows"], from_table["matrix_rows"])
+
+    def test_main_page_pivot_finds_other_spellings_like_the_table(self):
+        StationResolver().resolve("תל אביב - סבידור מרכז", 3700)
+        StationResolver().resolve("ת\"א סבידור", 3700)
+        for from_station, to_station, value in (("תל אביב -  סבידור מרכז", "חיפה", 100), ("ת\"א סבידור", "לוד", 7)):
+            PassengerMatrix.objects.create(
+                from_station_name=from_station, to_station_name=to_station, month=3, year=2026, sum_values_pass=value
+            )
+        params = {"station": "ת\"א סבידור", "year": "2026", "month": "3"}
+        from_table = self.client.get("/main_page/", params).context
+
+        build_month(2026, 3)
+        from_dense = self.client.get("/main_page/", params).context
+
+        self.assertEqual(from_table["matrix_cols"], ["חיפה", "לוד"])
+        self.assertEqual(from_dense["matrix_cols"], from_table["matrix_cols"])
+        self.assertEqual(from_dense["matrix_rows"], from_table["matrix_rows"])
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_table', '0002_ranking_uniq_ranking_month_station'),
+        ('stations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ranking',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddIndex(
+            model_name='ranking',
+            index=models.Index(fields=['station', 'year', 'month'], name='ranking_station_month_idx'),
+        ),
+    ]
@@ -1,11 +1,16 @@
 # ranking talbe/models.py
 from django.db import models
 
+from stations.lookup import StationKeyMixin
+
+
+class Ranking(StationKeyMixin, models.Model):
+    STATION_KEYS = (("station", "train_station_name", None),)
 
-class Ranking(models.Model):
     year = models.IntegerField()
     month = models.IntegerField()
     train_station_name = models.CharField(max_length=255)
+    station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     ascending_pass = models.IntegerField()
     descending_pass = models.IntegerField()
     rank = models.CharField(max_length=255)
@@ -14,6 +19,9 @@ class Ranking(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["year", "month", "train_station_name"], name="uniq_ranking_month_station")
         ]
+        indexes = [
+            models.Index(fields=("station", "year", "month"), name="ranking_station_month_idx"),
+        ]
 
     def __str__(self):
         return f"{self.train_station_name} {self.month}/{self.year}"
@@ -1,11 +1,18 @@
 import tempfile
+from decimal import Decimal
+from io import StringIO
 from pathlib import Path
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
-from django.test import TestCase
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 
+from convergence.models import ConvergenceBusToRail
+from convergence.summary import build_station_months
 from rating_table.models import Ranking
+from stations.models import Station, StationAlias
 
 
 class ImportRatingTableCommandTests(TestCase):
@@ -63,6 +70,58 @@ class ImportRatingTableCommandTests(TestCase):
 
         self.assertFalse(Ranking.objects.filter(year=2026, month=3, train_station_name="Haifa").exists())
 
+    def test_dry_run_diffs_in_memory(self):
+        Ranking.objects.create(year=2026, month=3, train_station_name="Haifa", ascending_pass=50, descending_pass=60, rank="B")
+        Ranking.objects.create(year=2026, month=3, train_station_name="Lod", ascending_pass=1, descending_pass=2, rank="C")
+        csv_path = self._write_csv(
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            "2026,3,Haifa,50,60,B\n"
+            "2026,3,Lod,5,6,C\n"
+            "2026,3,Acre,7,8,D\n"
+            "2026,3,Acre,7,8,D\n"
+        )
+        out = StringIO()
+
+        # One manifest lookup and one snapshot per --batch-size chunk of rows.
+        with self.assertNumQueries(2):
+            call_command("import_rating_table", "--file", str(csv_path), "--dry-run", stdout=out)
+
+        self.assertIn("Inserted: 1", out.getvalue())
+        self.assertIn("Updated: 1", out.getvalue())
+        self.assertIn("Unchanged: 2", out.getvalue())
+
+    def test_dry_run_carries_keys_across_chunks(self):
+        csv_path = self._write_csv(
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            "2026,3,Acre,7,8,D\n"
+            "2026,3,Acre,7,8,D\n"
+            "2026,3,Acre,9,8,D\n"
+        )
+        out = StringIO()
+
+        call_command("import_rating_table", "--file", str(csv_path), "--dry-run", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Inserted: 1", out.getvalue())
+        self.assertIn("Updated: 1", out.getvalue())
+        self.assertIn("Unchanged: 1", out.getvalue())
+
+    def test_identical_rows_are_not_rewritten(self):
+        Ranking.objects.create(year=2026, month=3, train_station_name="Haifa", ascending_pass=50, descending_pass=60, rank="B")
+        csv_path = self._write_csv(
+            "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
+            "2026,3,Haifa,50,60,B\n"
+        )
+        out = StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("import_rating_table", "--file", str(csv_path), stdout=out)
+
+        ranking_sql = [q["sql"] for q in queries.captured_queries if "rating_table_ranking" in q["sql"]]
+        self.assertEqual(len(ranking_sql), 1)
+        self.assertTrue(ranking_sql[0].startswith("SELECT"))
+        self.assertIn("Updated: 0", out.getvalue())
+        self.assertIn("Unchanged: 1", out.getvalue())
+
     def test_strict_mode_rolls_back_all_writes(self):
         csv_path = self._write_csv(
             "year,month,train_station_name,ascending_pass,descending_pass,rank\n"
@@ -83,3 +142,42 @@ class ImportRatingTableCommandTests(TestCase):
 
         with self.assertRaises(CommandError):
             call_command("import_rating_table", "--file", str(csv_path))
+
+
+class MainPageTests(TestCase):
+    def test_station_sync_data_comes_from_the_summary(self):
+        ConvergenceBusToRail.objects.create(
+            year="2026", month=3, week_period="יום חול", train_station_name="עכו", rail_direction="צפון",
+            on_time_percentage_by_train_station=Decimal("80"),
+        )
+        ConvergenceBusToRail.objects.create(
+            year="2026", month=3, week_period="יום חול", train_station_name="עכו", rail_direction="דרום",
+            on_time_percentage_by_train_station=Decimal("80"),
+        )
+        build_station_months([202603])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get("/main_page/")
+
+        self.assertEqual(response.context["convergence_station_data"], [{
+            "year": 2026, "month": 3, "station_id": Station.objects.get(name="עכו").pk, "train_station_name": "עכו",
+            "week_period": "יום חול", "on_time_percentage_by_train_station": Decimal("80.00"),
+        }])
+        self.assertFalse(any("convergence_convergencebustorail" in query["sql"] for query in queries))
+
+    def test_selected_station_is_matched_to_the_summary_by_id(self):
+        # The summary names the station "עכו"; the rating table (and the station filter) spells it differently.
+        ConvergenceBusToRail.objects.create(
+            year="2026", month=3, week_period="יום חול", train_station_name="עכו", rail_direction="צפון",
+            on_time_percentage_by_train_station=Decimal("80"),
+        )
+        station = Station.objects.get(name="עכו")
+        StationAlias.objects.create(name="עכו מרכז", station=station)
+        Ranking.objects.create(year=2026, month=3, train_station_name="עכו מרכז", ascending_pass=1, descending_pass=1)
+        build_station_months([202603])
+
+        response = Client().get("/main_page/", {"station": "עכו מרכז", "year": "2026", "month": "3"})
+
+        self.assertEqual(response.context["selected_station_ids"], [station.pk])
+        self.assertEqual(response.context["station_options"], [{"station_name": "עכו מרכז", "station_id": station.pk}])
+        self.assertEqual([row["station_id"] for row in response.context["convergence_station_data"]], [station.pk])
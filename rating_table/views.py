@@ -3,9 +3,12 @@
 from django.shortcuts import render
 
 from bus_info_per_train_station_table.models import BusInfo
+from matrix_pass_table.dense import load_month
 from matrix_pass_table.models import PassengerMatrix
 from rating_table.models import Ranking
-from convergence.models import ConvergenceBusToRail
+from convergence.models import StationMonthSummary
+from stations.lookup import station_ids
+from stations.models import StationAlias
 
 
 
@@ -18,28 +21,35 @@ def main_page(request):
     m = request.GET.get("month", "").strip()
     month = int(m) if m else None
 
+    # One row per station, month and week period, built by the convergence import. The page
+    # matches stations on station_id: the summary names them by Station.name, which need not
+    # be the spelling the rating table (and so the station filter) uses.
     convergence_station_data = list(
-        ConvergenceBusToRail.objects.values(
+        StationMonthSummary.objects.order_by("year_month", "train_station_name", "week_period").values(
             "year",
             "month",
+            "station_id",
             "train_station_name",
+            "week_period",
             "on_time_percentage_by_train_station",
         )
     )
 
+    ids = station_ids(station_name) if station_name else []
+
     has_full_filters = bool(station_name) and (year is not None) and (month is not None)
     if has_full_filters:
         ranking_qs = Ranking.objects.filter(
-            train_station_name=station_name,
+            station_id__in=ids,
             year=year,
             month=month,
         )
         matrix_qs = PassengerMatrix.objects.filter(
-            from_station_name=station_name,
+            from_station_id__in=ids,
             year=year,
             month=month,
         )
-        bus_qs = BusInfo.objects.filter(train_station_name=station_name)
+        bus_qs = BusInfo.objects.filter(station_id__in=ids)
     else:
         ranking_qs = Ranking.objects.none()
         matrix_qs = PassengerMatrix.objects.none()
@@ -64,7 +74,19 @@ def main_page(request):
         )
     ]
 
-    matrix_raw = list(matrix_qs.values("from_station_name", "to_station_name", "sum_values_pass"))
+    # The dense month array answers the pivot with one row slice; the table is
+    # only scanned for months imported before the arrays existed.
+    dense = load_month(year, month) if has_full_filters else None
+    if dense is not None:
+        # Rows are stored under whichever spelling their file used; match them the way the table's station keys do.
+        spellings = set(StationAlias.objects.filter(station_id__in=ids).values_list("name", flat=True))
+        matrix_raw = [
+            {"from_station_name": origin, "to_station_name": to_station, "sum_values_pass": value}
+            for origin in dense.origins(spellings)
+            for to_station, value in dense.row(origin)
+        ]
+    else:
+        matrix_raw = list(matrix_qs.values("from_station_name", "to_station_name", "sum_values_pass"))
     if not matrix_raw:
         matrix_cols = []
         matrix_rows = []
@@ -123,7 +145,7 @@ def main_page(request):
 
     pairs_qs = Ranking.objects.all()
     if station_name:
-        pairs_qs = pairs_qs.filter(train_station_name=station_name)
+        pairs_qs = pairs_qs.filter(station_id__in=ids)
     year_month_pairs = [
         {"year": y, "month": m}
         for y, m in pairs_qs.values_list("year", "month").distinct().order_by("year", "month")
@@ -132,8 +154,8 @@ def main_page(request):
     # station list JSON source
     stations_qs = Ranking.objects.all()
     station_options = [
-        {"station_name": s}
-        for s in stations_qs.values_list("train_station_name", flat=True).distinct().order_by("train_station_name")
+        {"station_name": s, "station_id": station_id}
+        for s, station_id in stations_qs.values_list("train_station_name", "station_id").distinct().order_by("train_station_name")
     ]
 
     # filter options source (from BusInfo model fields)
@@ -159,6 +181,7 @@ def main_page(request):
         "bus_info": bus_info,
         "year_month_pairs": year_month_pairs,
         "station_options": station_options,
+        "selected_station_ids": ids,
         "bus_direction_options": bus_direction_options,
         "week_period_options": week_period_options,
         "convergence_station_data": convergence_station_data,
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
     "train_times",
     "train_stations_order",
     "history",
+    "imports",
+    "stations",
 ]
 
 MIDDLEWARE = [
@@ -132,4 +134,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = BASE_DIR / "staticfiles"
\ No newline at end of file
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+
+# Parsed XLSX sheets are cached here by content hash so repeat imports skip
+# openpyxl parsing. Set to None to disable.
+SHEET_CACHE_DIR = BASE_DIR / ".cache" / "sheets"
+
+# Dense per-month passenger matrices are copied here from the database and
+# memory-mapped by main_page. Set to None to read them from the database blob.
+OD_MATRIX_CACHE_DIR = BASE_DIR / ".cache" / "od_matrix"
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+from django.conf import settings
+
+
+def file_sha256(source_path):
+    digest = hashlib.sha256()
+    with Path(source_path).open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_root():
+    # SHEET_CACHE_DIR = None disables the cache. Entries live under a pandas-version
+    # subdirectory so an upgrade never unpickles frames written by another release.
+    configured = getattr(settings, "SHEET_CACHE_DIR", None)
+    if not configured:
+        return None
+    return Path(configured).expanduser() / f"pandas-{pd.__version__}"
+
+
+def _entry_path(root, digest, sheet_name):
+    return root / f"{digest}.{quote(str(sheet_name), safe='')}.pkl"
+
+
+def _trusted(path):
+    """
+    True if `path` belongs to this process's user and nobody else can write to it.
+    Unpickling runs code, so only entries this user alone could have written are loaded.
+    """
+    st = path.stat()
+    getuid = getattr(os, "getuid", None)
+    return (getuid is None or st.st_uid == getuid()) and not st.st_mode & 0o022
+
+
+def _load(root, entry):
+    try:
+        if not (_trusted(root) and _trusted(entry)):
+            return None
+        with entry.open("rb") as fp:
+            df = pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        # Missing, truncated or foreign file: treat as a miss and let the next store replace it.
+        return None
+    return df if isinstance(df, pd.DataFrame) else None
+
+
+def _store(root, entry, df):
+    try:
+        # Private to this user; _load() refuses entries anyone else could have written.
+        root.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Write-then-rename so concurrent importers never read a half-written entry.
+        fd, tmp_name = tempfile.mkstemp(dir=root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(df, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, entry)
+    except OSError:
+        # The cache is an optimization only; a read-only or full disk must not fail the import.
+        pass
+
+
+def read_excel_sheets(source_path, sheet_names, use_cache=True):
+    """
+    Return {sheet_name: DataFrame} for an XLSX file, opening the workbook only for cache misses.
+
+    Cached frames are keyed by the file's SHA-256 and the sheet name, so editing the file
+    invalidates them. A sheet that fails to parse maps to the raised exception instead of
+    a DataFrame; failures are never cached.
+    """
+    source_path = Path(source_path)
+    root = cache_root() if use_cache else None
+    digest = file_sha256(source_path) if root is not None else None
+
+    sheets = {}
+    if root is not None:
+        for sheet_name in sheet_names:
+            df = _load(root, _entry_path(root, digest, sheet_name))
+            if df is not None:
+                sheets[sheet_name] = df
+
+    missing = [sheet_name for sheet_name in sheet_names if sheet_name not in sheets]
+    if not missing:
+        return sheets
+
+    with pd.ExcelFile(source_path) as book:
+        for sheet_name in missing:
+            try:
+                df = book.parse(sheet_name)
+            except Exception as exc:
+                sheets[sheet_name] = exc
+                continue
+            sheets[sheet_name] = df
+            if root is not None:
+                _store(root, _entry_path(root, digest, sheet_name), df)
+
+    return sheets
+
+
+def read_excel_cached(source_path, sheet_name=0, use_cache=True):
+    result = read_excel_sheets(source_path, [sheet_name], use_cache=use_cache)[sheet_name]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -7,4 +7,5 @@ urlpatterns = [
     path("train_times/", include("train_times.urls")),
     path("convergence/", include("convergence.urls")),
     path("history/", include("history.urls")),
+    path("imports/", include("imports.urls")),
 ]
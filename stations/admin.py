@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+from .models import Station, StationAlias
+
+
+admin.site.register(Station)
+admin.site.register(StationAlias)
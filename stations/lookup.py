@@ -0,0 +1,149 @@
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+
+from imports.ingest import clean_text
+from stations.models import Station, StationAlias
+
+
+def normalize_name(name):
+    """Station name without surrounding or repeated whitespace; the form aliases are stored in."""
+    return " ".join(clean_text(name).split())
+
+
+class StationResolver:
+    """
+    Maps the station names (and codes, where a source has them) found in imported
+    rows to Station ids, creating the station or alias on first sight.
+
+    A code ties a new spelling to the station already holding that code, and keys
+    rows whose name is blank. Answers are cached, so an import costs a query or two
+    per distinct name, not per row.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def resolve(self, name, code=None):
+        name = normalize_name(name)
+        if not name:
+            # Not cached: the code's station may still be created by a later row of the same import.
+            return Station.objects.filter(code=code).values_list("pk", flat=True).first() if code is not None else None
+        key = (name, code)
+        if key not in self._cache:
+            self._cache[key] = self._lookup(name, code)
+        return self._cache[key]
+
+    def _lookup(self, name, code):
+        station_id = StationAlias.objects.filter(name=name).values_list("station_id", flat=True).first()
+        if station_id is not None and (code is None or Station.objects.filter(code=code).exists()):
+            return station_id
+
+        if connection.in_atomic_block and connection.vendor != "sqlite":
+            # Inside an import's transaction, writes go through a connection of their own:
+            # concurrent imports then neither wait on each other's uncommitted rows nor miss
+            # rows the other committed after this transaction's snapshot was taken. (SQLite has
+            # one writer, and a second connection to an in-memory test database sees another one.)
+            own = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                return commit_station(own, name, code)
+            finally:
+                own.close()
+
+        if station_id is not None:
+            # First time this station is seen with its code, e.g. rating rows imported before train times.
+            Station.objects.filter(pk=station_id, code=None).update(code=code)
+            return station_id
+
+        station = Station.objects.filter(code=code).first() if code is not None else None
+        try:
+            with transaction.atomic():
+                if station is None:
+                    station = Station.objects.create(name=name, code=code)
+                StationAlias.objects.create(name=name, station=station)
+        except IntegrityError:
+            # Another import added the same spelling, or a station already holds this name or
+            # code; read back whichever it was, as commit_station does.
+            station = Station.objects.filter(name=name).first()
+            if station is None and code is not None:
+                station = Station.objects.filter(code=code).first()
+            alias, _ = StationAlias.objects.get_or_create(name=name, defaults={"station": station})
+            return alias.station_id
+        return station.pk
+
+
+def commit_station(conn, name, code):
+    """
+    StationResolver's lookup as single autocommitted statements on `conn`: the station id of
+    `name`, creating the station and alias if needed. A statement that loses a race to
+    another import is answered by reading back what that import committed.
+    """
+    station, alias = (conn.ops.quote_name(model._meta.db_table) for model in (Station, StationAlias))
+
+    def first(sql, params):
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    with conn.cursor() as cursor:
+        station_id = first(f"SELECT station_id FROM {alias} WHERE name = %s", [name])
+        if station_id is not None:
+            if code is not None:
+                try:
+                    # First time this station is seen with its code, e.g. rating rows imported before train times.
+                    cursor.execute(f"UPDATE {station} SET code = %s WHERE id = %s AND code IS NULL", [code, station_id])
+                except IntegrityError:
+                    pass  # The code already belongs to a station.
+            return station_id
+
+        station_id = first(f"SELECT id FROM {station} WHERE code = %s", [code]) if code is not None else None
+        if station_id is None:
+            try:
+                cursor.execute(f"INSERT INTO {station} (name, code) VALUES (%s, %s)", [name, code])
+            except IntegrityError:
+                pass  # Another import created the station with this name or code.
+            station_id = first(f"SELECT id FROM {station} WHERE name = %s", [name])
+            if station_id is None:
+                station_id = first(f"SELECT id FROM {station} WHERE code = %s", [code])
+        try:
+            cursor.execute(f"INSERT INTO {alias} (name, station_id) VALUES (%s, %s)", [name, station_id])
+        except IntegrityError:
+            pass  # Another import added the same spelling.
+        return first(f"SELECT station_id FROM {alias} WHERE name = %s", [name])
+
+
+def station_ids(name):
+    """Ids of the stations `name` is a spelling of (normally one)."""
+    return list(StationAlias.objects.filter(name=normalize_name(name)).values_list("station_id", flat=True))
+
+
+def station_ids_containing(text):
+    """Ids of the stations with a spelling that contains `text`, for typed-in fragments."""
+    aliases = StationAlias.objects.filter(name__icontains=normalize_name(text))
+    return sorted(set(aliases.values_list("station_id", flat=True)))
+
+
+class StationKeyMixin:
+    """
+    For models that name a station in free text. STATION_KEYS lists (foreign key,
+    name field, code field or None); save() fills a key that is still empty.
+    Bulk writers bypass save() and set the keys with a StationResolver.
+    """
+
+    STATION_KEYS = ()
+
+    def save(self, *args, station_resolver=None, **kwargs):
+        # Callers saving many rows pass one resolver, so its cache (and on MySQL, its
+        # connection for new stations) is not set up again for every row.
+        for key, name_field, code_field in self.STATION_KEYS:
+            if getattr(self, f"{key}_id") is None:
+                station_resolver = station_resolver or StationResolver()
+                code = getattr(self, code_field) if code_field else None
+                setattr(self, f"{key}_id", station_resolver.resolve(getattr(self, name_field), code))
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def station_keys(cls, values, resolver):
+        """Foreign key ids for the station names in `values` (a row as a dict), as keyword arguments."""
+        return {
+            f"{key}_id": resolver.resolve(values.get(name_field), values.get(code_field) if code_field else None)
+            for key, name_field, code_field in cls.STATION_KEYS
+        }
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:10
+
+from django.db import migrations
+
+
+# (app, model, foreign key, name field, code field). Tables with station codes come
+# first, so differently spelled names that share a code become one station.
+STATION_COLUMNS = (
+    ("train_times", "TrainTime", "station", "StationName", "train_station_code"),
+    ("convergence", "ConvergenceBusToRail", "station", "train_station_name", "train_station_code"),
+    ("convergence", "ConvergenceRailToBus", "station", "train_station_name", "train_station_code"),
+    ("convergence", "RawBusData", "station", "train_station_name", None),
+    ("rating_table", "Ranking", "station", "train_station_name", None),
+    ("matrix_pass_table", "PassengerMatrix", "from_station", "from_station_name", None),
+    ("matrix_pass_table", "PassengerMatrix", "to_station", "to_station_name", None),
+    ("bus_info_per_train_station_table", "BusInfo", "station", "train_station_name", None),
+)
+
+
+def backfill_station_keys(apps, schema_editor):
+    # Mirrors stations.lookup.StationResolver, which historical models cannot use.
+    Station = apps.get_model("stations", "Station")
+    StationAlias = apps.get_model("stations", "StationAlias")
+    by_alias = dict(StationAlias.objects.values_list("name", "station_id"))
+    by_code = dict(Station.objects.exclude(code=None).values_list("code", "id"))
+
+    for app_label, model_name, key, name_field, code_field in STATION_COLUMNS:
+        model = apps.get_model(app_label, model_name)
+        columns = (name_field, code_field) if code_field else (name_field,)
+        for values in model.objects.values_list(*columns).distinct():
+            raw_name, code = values[0], values[1] if code_field else None
+            name = " ".join(str(raw_name or "").split())
+            if not name:
+                # Keyed by code alone once every named row has been seen.
+                continue
+            station_id = by_alias.get(name)
+            if station_id is not None and code is not None and code not in by_code:
+                # First time this station is seen with its code, as StationResolver records it.
+                if Station.objects.filter(pk=station_id, code=None).update(code=code):
+                    by_code[code] = station_id
+            if station_id is None:
+                station_id = by_code.get(code) if code is not None else None
+                if station_id is None:
+                    station_id = Station.objects.create(name=name, code=code).pk
+                    if code is not None:
+                        by_code[code] = station_id
+                StationAlias.objects.create(name=name, station_id=station_id)
+                by_alias[name] = station_id
+            rows = model.objects.filter(**{name_field: raw_name, f"{key}_id": None})
+            if code_field:
+                rows = rows.filter(**{code_field: code})
+            rows.update(**{f"{key}_id": station_id})
+
+    for app_label, model_name, key, name_field, code_field in STATION_COLUMNS:
+        if not code_field:
+            continue
+        model = apps.get_model(app_label, model_name)
+        for code, station_id in by_code.items():
+            model.objects.filter(**{f"{key}_id": None, code_field: code}).update(**{f"{key}_id": station_id})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0001_initial'),
+        ('bus_info_per_train_station_table', '0003_station_keys'),
+        ('convergence', '0028_station_keys'),
+        ('matrix_pass_table', '0004_station_keys'),
+        ('rating_table', '0003_station_keys'),
+        ('train_times', '0008_station_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_station_keys, migrations.RunPython.noop),
+    ]
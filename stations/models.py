@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class Station(models.Model):
+    # One row per physical station. Fact tables keep the name their source file used
+    # and point here through a foreign key; every spelling seen is a StationAlias.
+    code = models.IntegerField(unique=True, null=True, blank=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code is not None else self.name
+
+
+class StationAlias(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name="aliases")
+
+    class Meta:
+        verbose_name_plural = "station aliases"
+
+    def __str__(self):
+        return f"{self.name} -> {self.station.name}"
@@ -0,0 +1,198 @@
+import importlib
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+
+from convergence.models import ConvergenceBusToRail, RawBusData
+from matrix_pass_table.models import PassengerMatrix
+from rating_table.models import Ranking
+from stations.lookup import StationResolver, commit_station, station_ids, station_ids_containing
+from stations.models import Station, StationAlias
+from train_times.models import TrainTime
+
+
+class StationResolverTests(TestCase):
+    def test_spellings_with_the_same_code_share_a_station(self):
+        resolver = StationResolver()
+
+        first = resolver.resolve("מרכזית המפרץ/קו החוף", 1220)
+        second = resolver.resolve("מרכזית מפרץ-חוף", 1220)
+
+        self.assertEqual(first, second)
+        station = Station.objects.get()
+        self.assertEqual((station.name, station.code), ("מרכזית המפרץ/קו החוף", 1220))
+        self.assertEqual(station.aliases.count(), 2)
+
+    def test_whitespace_does_not_make_a_new_station(self):
+        resolver = StationResolver()
+
+        self.assertEqual(resolver.resolve(" חיפה  מרכז "), resolver.resolve("חיפה מרכז"))
+        self.assertEqual(list(StationAlias.objects.values_list("name", flat=True)), ["חיפה מרכז"])
+        self.assertIsNone(resolver.resolve("  "))
+
+    def test_code_seen_later_is_recorded(self):
+        station_id = StationResolver().resolve("עכו")
+
+        StationResolver().resolve("עכו", 1500)
+
+        self.assertEqual(Station.objects.get(pk=station_id).code, 1500)
+        self.assertEqual(StationResolver().resolve("עכו מרכז", 1500), station_id)
+
+    def test_answers_are_cached(self):
+        resolver = StationResolver()
+        resolver.resolve("עכו", 1500)
+
+        with self.assertNumQueries(0):
+            resolver.resolve("עכו", 1500)
+
+    def test_committed_lookup_matches_the_resolver(self):
+        acre = commit_station(connection, "עכו", None)
+
+        self.assertEqual(commit_station(connection, "עכו", 1500), acre)
+        self.assertEqual(Station.objects.get(pk=acre).code, 1500)
+        self.assertEqual(commit_station(connection, "עכו מרכז", 1500), acre)
+        haifa = commit_station(connection, "חיפה מרכז", 2100)
+        self.assertNotEqual(haifa, acre)
+        self.assertEqual(commit_station(connection, "חיפה מרכז", 1500), haifa)
+        self.assertEqual(Station.objects.get(pk=haifa).code, 2100)
+        self.assertEqual(StationAlias.objects.count(), 3)
+
+    def test_name_held_by_a_station_without_the_alias_is_recovered(self):
+        # The station exists (say, created by another import's half-finished lookup) but no alias
+        # names it yet, so the resolver's create loses on Station.name rather than on the alias.
+        acre = Station.objects.create(name="עכו", code=1500)
+
+        self.assertEqual(StationResolver().resolve("עכו"), acre.pk)
+        self.assertEqual(StationAlias.objects.get(name="עכו").station, acre)
+
+    def test_known_spelling_is_read_on_the_current_connection(self):
+        acre = StationResolver().resolve("עכו", 1500)
+
+        # Inside a MySQL transaction only new stations need a connection of their own.
+        with mock.patch.object(connection, "vendor", "mysql"), \
+                mock.patch("stations.lookup.connections.create_connection") as create_connection:
+            self.assertEqual(StationResolver().resolve("עכו", 1500), acre)
+
+        create_connection.assert_not_called()
+
+    def test_lookup_helpers(self):
+        acre = StationResolver().resolve("עכו", 1500)
+        StationResolver().resolve("עכו מרכז", 1500)
+        haifa = StationResolver().resolve("חיפה מרכז")
+
+        self.assertEqual(station_ids(" עכו "), [acre])
+        self.assertEqual(station_ids("נהריה"), [])
+        self.assertEqual(station_ids_containing("מרכז"), sorted([acre, haifa]))
+
+
+class StationKeyTests(TestCase):
+    def test_save_fills_missing_keys(self):
+        row = PassengerMatrix.objects.create(
+            year=2026, month=3, from_station_name="עכו", to_station_name="נהריה", sum_values_pass=5
+        )
+
+        self.assertEqual(row.from_station.name, "עכו")
+        self.assertEqual(row.to_station.name, "נהריה")
+
+    def test_save_uses_the_callers_resolver(self):
+        resolver = StationResolver()
+        resolver.resolve("עכו")
+        resolver.resolve("נהריה")
+        row = PassengerMatrix(year=2026, month=3, from_station_name="עכו", to_station_name="נהריה", sum_values_pass=5)
+
+        with self.assertNumQueries(1):
+            row.save(station_resolver=resolver)
+
+        self.assertEqual(row.from_station.name, "עכו")
+
+    def test_imports_set_keys(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ranking.csv"
+            path.write_text(
+                "year,month,train_station_name,ascending_pass,descending_pass,rank\n2026,3, עכו ,100,120,1 מתוך 1\n",
+                encoding="utf-8",
+            )
+            call_command("import_rating_table", "--file", str(path), stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Ranking.objects.get().station.name, "עכו")
+
+    def test_dry_run_creates_no_stations(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ranking.csv"
+            path.write_text(
+                "year,month,train_station_name,ascending_pass,descending_pass,rank\n2026,3,עכו,100,120,1 מתוך 1\n",
+                encoding="utf-8",
+            )
+            call_command("import_rating_table", "--file", str(path), "--dry-run", stdout=StringIO())
+
+        self.assertFalse(Station.objects.exists())
+
+    def test_convergence_page_finds_rows_under_another_spelling(self):
+        TrainTime.objects.create(
+            Year=2026, Month=3, WeekPeriod="יום חול", train_station_code=1220, StationName="מרכזית המפרץ/קו החוף",
+            Train_number=101, event_type=TrainTime.EventType.TO_TLV, planned_time="08:00:00",
+            PassengersAscending=1, PassengersDescending=1,
+        )
+        ConvergenceBusToRail.objects.create(
+            year="2026", month=3, week_period="יום חול", train_station_name="מרכזית מפרץ-חוף",
+            train_station_code=1220, rail_direction="צפון", train_number=101,
+        )
+
+        response = Client().get("/convergence/", {"station": "מרכזית המפרץ/קו החוף", "year": "2026", "month": "3"})
+
+        self.assertEqual(len(response.context["bus_to_rail_df"]), 1)
+
+
+class BackfillMigrationTests(TestCase):
+    def test_existing_rows_get_keys(self):
+        migration = importlib.import_module("stations.migrations.0002_backfill_station_keys")
+        # bulk_create skips save(), so these rows start without keys like rows imported before the migration.
+        TrainTime.objects.bulk_create([
+            TrainTime(
+                Year=2026, Month=3, WeekPeriod="יום חול", train_station_code=1220, StationName="מרכזית המפרץ/קו החוף",
+                Train_number=101, event_type=TrainTime.EventType.TO_TLV, planned_time="08:00:00",
+                PassengersAscending=1, PassengersDescending=1, row_hash="a",
+            )
+        ])
+        ConvergenceBusToRail.objects.bulk_create([
+            ConvergenceBusToRail(
+                year="2026", month=3, week_period="יום חול", train_station_name="מרכזית מפרץ-חוף",
+                train_station_code=1220, rail_direction="צפון",
+            )
+        ])
+        RawBusData.objects.bulk_create([
+            RawBusData(
+                year="2026", month=3, year_month=202603, week_period="יום חול", train_station_name=" עכו ",
+                rail_direction="צפון",
+            )
+        ])
+
+        migration.backfill_station_keys(apps, None)
+
+        bay = Station.objects.get(code=1220)
+        self.assertEqual(TrainTime.objects.get().station, bay)
+        self.assertEqual(ConvergenceBusToRail.objects.get().station, bay)
+        self.assertEqual(RawBusData.objects.get().station.name, "עכו")
+        self.assertEqual(Station.objects.count(), 2)
+
+    def test_code_seen_after_the_name_is_recorded(self):
+        migration = importlib.import_module("stations.migrations.0002_backfill_station_keys")
+        ConvergenceBusToRail.objects.bulk_create([
+            ConvergenceBusToRail(year="2026", month=3, week_period="יום חול", train_station_name="עכו", rail_direction="צפון"),
+            ConvergenceBusToRail(
+                year="2026", month=4, week_period="יום חול", train_station_name="עכו", train_station_code=1500,
+                rail_direction="צפון",
+            ),
+        ])
+
+        migration.backfill_station_keys(apps, None)
+
+        # Same station row an import through StationResolver would leave behind.
+        self.assertEqual(list(Station.objects.values_list("name", "code")), [("עכו", 1500)])
+        self.assertEqual(set(ConvergenceBusToRail.objects.values_list("station__code", flat=True)), {1500})
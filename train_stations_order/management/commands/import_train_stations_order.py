@@ -1,10 +1,14 @@
-import csv
+from contextlib import contextmanager
 from pathlib import Path
+from time import monotonic
 
-import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from imports.ingest import chunked, clean_text, open_csv, to_int
+from imports.manifest import previous_import, record_import, skip_message, source_fingerprint
+from imports.profiling import ProfiledCommandMixin, add_profile_arguments
+from shiluvim.sheet_cache import read_excel_cached
 from train_stations_order.models import Ranking
 
 
@@ -16,8 +20,14 @@ COLUMN_ALIASES = {
     "StationName": "train_station_name",
 }
 
+MODE_INSERT = "insert"
+MODE_REPLACE_ROUTES = "replace-routes"
 
-class Command(BaseCommand):
+
+MANIFEST_COMMAND = "import_train_stations_order"
+
+
+class Command(ProfiledCommandMixin, BaseCommand):
     help = (
         "Import rows into train_stations_order_ranking from CSV/XLSX "
         "using deduplicating insert semantics."
@@ -39,7 +49,27 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Reserved for future bulk operations; currently used for progress reporting only.",
+            help="Number of rows inserted per bulk operation (also the progress reporting interval).",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Re-parse XLSX input instead of loading it from SHEET_CACHE_DIR.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-import the file even if the import manifest shows it unchanged.",
+        )
+        add_profile_arguments(parser)
+        parser.add_argument(
+            "--mode",
+            choices=(MODE_INSERT, MODE_REPLACE_ROUTES),
+            default=MODE_INSERT,
+            help=(
+                "'insert' adds rows that do not exist yet; 'replace-routes' treats each train_num's rows "
+                "as its full route and swaps out routes whose station sequence changed."
+            ),
         )
 
     def handle(self, *args, **options):
@@ -47,57 +77,89 @@ class Command(BaseCommand):
         dry_run = options["dry_run"]
         strict = options["strict"]
         batch_size = options["batch_size"]
+        mode = options["mode"]
 
         if batch_size <= 0:
             raise CommandError("--batch-size must be a positive integer.")
         if not source_path.exists():
             raise CommandError(f"Source file not found: {source_path}")
 
-        rows = self._read_rows(source_path)
-        if not rows:
+        fingerprint = source_fingerprint(source_path)
+        if not options["force"]:
+            manifest = previous_import(MANIFEST_COMMAND, fingerprint)
+            if manifest is not None:
+                self.stdout.write(self.style.WARNING(skip_message(source_path, manifest)))
+                return
+        started = monotonic()
+
+        with self._open_rows(source_path, use_cache=not options["no_cache"]) as rows:
+            chunks = self._payload_chunks(rows, strict=strict, batch_size=batch_size)
+            if mode == MODE_REPLACE_ROUTES:
+                totals = self._replace_routes(chunks, dry_run=dry_run, batch_size=batch_size)
+            elif strict and not dry_run:
+                with transaction.atomic():
+                    totals = self._process_rows(chunks, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            else:
+                totals = self._process_rows(chunks, dry_run=dry_run, strict=strict, batch_size=batch_size)
+        if totals["total_rows"] == 0:
             self.stdout.write(self.style.WARNING("No rows found. Nothing to import."))
             return
 
-        payloads = []
-        for index, row in enumerate(rows, start=2):
-            try:
-                payloads.append(self._normalize_row(row, index))
-            except CommandError:
-                if strict:
-                    raise
-                payloads.append({"__invalid__": True, "__row_number__": index})
-
-        if strict and not dry_run:
-            with transaction.atomic():
-                totals = self._process_rows(payloads, dry_run=dry_run, strict=strict, batch_size=batch_size)
-        else:
-            totals = self._process_rows(payloads, dry_run=dry_run, strict=strict, batch_size=batch_size)
-
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("Import completed."))
         self.stdout.write(f"Rows processed: {totals['total_rows']}")
         self.stdout.write(f"Inserted: {totals['inserted']}")
-        self.stdout.write(f"Existing (duplicate): {totals['existing']}")
+        if mode == MODE_REPLACE_ROUTES:
+            self.stdout.write(f"Deleted: {totals['deleted']}")
+            self.stdout.write(f"Routes replaced: {totals['routes_replaced']}")
+            self.stdout.write(f"Routes unchanged: {totals['routes_unchanged']}")
+            self.stdout.write(f"Routes skipped (invalid rows): {totals['routes_skipped']}")
+        else:
+            self.stdout.write(f"Existing (duplicate): {totals['existing']}")
         self.stdout.write(f"Invalid: {totals['invalid']}")
         self.stdout.write(f"Dry run: {'yes' if dry_run else 'no'}")
 
         if strict and totals["invalid"] > 0:
             raise CommandError("Import failed in --strict mode due to invalid rows.")
 
-    def _read_rows(self, source_path: Path):
+        if not dry_run:
+            record_import(MANIFEST_COMMAND, fingerprint, totals, monotonic() - started)
+
+    @contextmanager
+    def _open_rows(self, source_path: Path, use_cache=True):
+        # CSV rows are streamed from the open file; Excel sheets are read whole (and cached) by pandas anyway.
         suffix = source_path.suffix.lower()
         if suffix == ".csv":
-            with source_path.open("r", encoding="utf-8-sig", newline="") as fp:
-                reader = csv.DictReader(fp)
+            with open_csv(source_path, aliases=COLUMN_ALIASES) as reader:
                 if reader.fieldnames is None:
                     raise CommandError("CSV file is missing a header row.")
-                return list(reader)
+                yield reader
+            return
 
         if suffix in (".xlsx", ".xls"):
-            return pd.read_excel(source_path).to_dict(orient="records")
+            yield read_excel_cached(source_path, use_cache=use_cache).to_dict(orient="records")
+            return
 
         raise CommandError("Unsupported file extension. Use .csv, .xlsx, or .xls.")
 
+    def _payload_chunks(self, rows, strict, batch_size):
+        """Yield lists of up to batch_size normalized rows; an invalid row becomes an __invalid__ marker."""
+        chunks = self.profiler.iterate("read", chunked(enumerate(rows, start=2), batch_size), count=len)
+        for chunk in chunks:
+            payloads = []
+            with self.profiler.phase("normalize") as phase:
+                for index, row in chunk:
+                    try:
+                        payloads.append(self._normalize_row(row, index))
+                    except CommandError:
+                        if strict:
+                            raise
+                        payloads.append(
+                            {"__invalid__": True, "__row_number__": index, "__train_num__": self._train_num_or_none(row)}
+                        )
+                phase.rows += len(chunk)
+            yield payloads
+
     def _normalize_keys(self, row):
         normalized = {}
         for key, value in row.items():
@@ -107,13 +169,10 @@ class Command(BaseCommand):
         return normalized
 
     def _normalize_int(self, value, field_name, row_number):
-        text = "" if value is None else str(value).strip()
-        if text == "" or text.lower() == "nan":
+        number = to_int(value)
+        if number is None:
             raise CommandError(f"Row {row_number}: {field_name} must be a valid integer.")
-        try:
-            return int(float(text))
-        except (TypeError, ValueError) as exc:
-            raise CommandError(f"Row {row_number}: {field_name} must be a valid integer.") from exc
+        return number
 
     def _normalize_row(self, row, row_number):
         row = self._normalize_keys(row)
@@ -121,7 +180,7 @@ class Command(BaseCommand):
         if missing:
             raise CommandError(f"Row {row_number}: missing columns: {', '.join(missing)}")
 
-        train_station_name = "" if row.get("train_station_name") is None else str(row["train_station_name"]).strip()
+        train_station_name = clean_text(row.get("train_station_name"))
         if not train_station_name:
             raise CommandError(f"Row {row_number}: train_station_name cannot be blank.")
 
@@ -132,34 +191,126 @@ class Command(BaseCommand):
             "train_station_name": train_station_name,
         }
 
-    def _process_rows(self, payloads, dry_run, strict, batch_size):
+    def _process_rows(self, chunks, dry_run, strict, batch_size):
         totals = {"total_rows": 0, "inserted": 0, "existing": 0, "invalid": 0}
+        # Dry runs check each chunk against a snapshot of its trains instead of querying per row,
+        # and keep the keys of earlier chunks, as a real run would find them stored.
+        existing = set()
 
-        for payload in payloads:
-            totals["total_rows"] += 1
-            if payload.get("__invalid__"):
-                totals["invalid"] += 1
-                if strict:
-                    raise CommandError(f"Row {payload['__row_number__']}: invalid data.")
-            else:
-                created = self._insert_if_new(payload, dry_run=dry_run)
-                if created:
-                    totals["inserted"] += 1
-                else:
-                    totals["existing"] += 1
-
-            if totals["total_rows"] % batch_size == 0:
-                self.stdout.write(
-                    f"Processed {totals['total_rows']} rows "
-                    f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
-                )
+        for payloads in chunks:
+            with self.profiler.phase("db write") as phase:
+                if dry_run:
+                    existing |= self._existing_rows(payloads)
+                for payload in payloads:
+                    totals["total_rows"] += 1
+                    if payload.get("__invalid__"):
+                        totals["invalid"] += 1
+                        if strict:
+                            raise CommandError(f"Row {payload['__row_number__']}: invalid data.")
+                    else:
+                        created = self._insert_if_new(payload, dry_run=dry_run, existing=existing)
+                        if created:
+                            totals["inserted"] += 1
+                        else:
+                            totals["existing"] += 1
+
+                    if totals["total_rows"] % batch_size == 0:
+                        self.stdout.write(
+                            f"Processed {totals['total_rows']} rows "
+                            f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
+                        )
+                phase.rows += len(payloads)
 
         return totals
 
-    def _insert_if_new(self, payload, dry_run=False):
+    def _insert_if_new(self, payload, dry_run=False, existing=None):
         if dry_run:
-            exists = Ranking.objects.filter(**payload).exists()
-            return not exists
+            key = tuple(payload[name] for name in CANONICAL_COLUMNS)
+            if key in existing:
+                return False
+            existing.add(key)
+            return True
 
         _, created = Ranking.objects.get_or_create(**payload)
         return created
+
+    def _existing_rows(self, payloads):
+        valid = [p for p in payloads if not p.get("__invalid__")]
+        queryset = Ranking.objects.filter(train_num__in={p["train_num"] for p in valid})
+        return set(queryset.values_list(*CANONICAL_COLUMNS))
+
+    def _train_num_or_none(self, row):
+        try:
+            return self._normalize_int(self._normalize_keys(row).get("train_num"), "train_num", 0)
+        except CommandError:
+            return None
+
+    def _replace_routes(self, chunks, dry_run, batch_size):
+        totals = {
+            "total_rows": 0,
+            "inserted": 0,
+            "deleted": 0,
+            "invalid": 0,
+            "routes_replaced": 0,
+            "routes_unchanged": 0,
+            "routes_skipped": 0,
+        }
+
+        # Only the stops of each train are kept while the file streams by, not its rows.
+        routes = {}
+        broken = set()
+        for payload in (payload for payloads in chunks for payload in payloads):
+            totals["total_rows"] += 1
+            if payload.get("__invalid__"):
+                totals["invalid"] += 1
+                self.stderr.write(self.style.WARNING(f"Row {payload['__row_number__']}: invalid data."))
+                # A route missing a stop must not replace the stored one.
+                if payload["__train_num__"] is not None:
+                    broken.add(payload["__train_num__"])
+                continue
+            routes.setdefault(payload["train_num"], set()).add(
+                (payload["train_station_order"], payload["train_station_id"], payload["train_station_name"])
+            )
+
+        for train_num in broken & routes.keys():
+            totals["routes_skipped"] += 1
+            del routes[train_num]
+
+        with self.profiler.phase("db write") as phase:
+            self._swap_routes(routes, totals, dry_run, batch_size)
+            phase.rows += totals["total_rows"]
+        return totals
+
+    def _swap_routes(self, routes, totals, dry_run, batch_size):
+        stored = {}
+        queryset = Ranking.objects.filter(train_num__in=routes).values_list(
+            "train_num", "train_station_order", "train_station_id", "train_station_name"
+        )
+        for train_num, *stop in queryset:
+            stored.setdefault(train_num, []).append(tuple(stop))
+
+        changed = []
+        for train_num, stops in routes.items():
+            if sorted(stops) == sorted(stored.get(train_num, [])):
+                totals["routes_unchanged"] += 1
+            else:
+                changed.append(train_num)
+        totals["routes_replaced"] = len(changed)
+        totals["deleted"] = sum(len(stored.get(train_num, [])) for train_num in changed)
+
+        new_rows = [
+            Ranking(
+                train_num=train_num,
+                train_station_order=order,
+                train_station_id=station_id,
+                train_station_name=station_name,
+            )
+            for train_num in changed
+            for order, station_id, station_name in sorted(routes[train_num])
+        ]
+        totals["inserted"] = len(new_rows)
+
+        if changed and not dry_run:
+            with transaction.atomic():
+                Ranking.objects.filter(train_num__in=changed).delete()
+                Ranking.objects.bulk_create(new_rows, batch_size=batch_size)
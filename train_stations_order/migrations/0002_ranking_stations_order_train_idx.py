@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_stations_order', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ranking',
+            index=models.Index(fields=['train_num', 'train_station_order'], name='stations_order_train_idx'),
+        ),
+    ]
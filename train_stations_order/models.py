@@ -8,5 +8,10 @@ class Ranking(models.Model):
     train_station_order = models.IntegerField()
     train_station_name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=("train_num", "train_station_order"), name="stations_order_train_idx"),
+        ]
+
     def __str__(self):
         return f"Train {self.train_num} - {self.train_station_name} ({self.train_station_order})"
@@ -1,4 +1,5 @@
 import tempfile
+from io import StringIO
 from pathlib import Path
 
 import pandas as pd
@@ -78,6 +79,26 @@ class ImportTrainStationsOrderCommandTests(TestCase):
 
         self.assertFalse(Ranking.objects.filter(train_num=10).exists())
 
+    def test_rows_stream_in_chunks_with_the_same_counts(self):
+        Ranking.objects.create(train_num=11, train_station_id=3200, train_station_order=1, train_station_name="Haifa")
+        csv_path = self._write_csv(
+            "train_num,train_station_id,train_station_order,train_station_name\n"
+            "11,3200,1,Haifa\n"
+            "11,3300,2,Ashkelon\n"
+            "11,3300,2,Ashkelon\n"
+        )
+
+        dry_run = StringIO()
+        call_command("import_train_stations_order", "--file", str(csv_path), "--batch-size", "1", "--dry-run", stdout=dry_run)
+        real_run = StringIO()
+        call_command("import_train_stations_order", "--file", str(csv_path), "--batch-size", "1", stdout=real_run)
+
+        for output in (dry_run.getvalue(), real_run.getvalue()):
+            self.assertIn("Rows processed: 3", output)
+            self.assertIn("Inserted: 1", output)
+            self.assertIn("Existing (duplicate): 2", output)
+        self.assertEqual(Ranking.objects.filter(train_num=11).count(), 2)
+
     def test_missing_required_columns_fails(self):
         csv_path = self._write_csv(
             "train_num,train_station_id,train_station_name\n"
@@ -86,3 +107,62 @@ class ImportTrainStationsOrderCommandTests(TestCase):
 
         with self.assertRaises(CommandError):
             call_command("import_train_stations_order", "--file", str(csv_path))
+
+    def _replace_routes(self, csv_path):
+        out = StringIO()
+        call_command(
+            "import_train_stations_order",
+            "--file", str(csv_path),
+            "--mode", "replace-routes",
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_replace_routes_swaps_changed_route_and_drops_stale_stops(self):
+        Ranking.objects.create(train_num=12, train_station_id=1, train_station_order=1, train_station_name="A")
+        Ranking.objects.create(train_num=12, train_station_id=2, train_station_order=2, train_station_name="B")
+        Ranking.objects.create(train_num=12, train_station_id=9, train_station_order=3, train_station_name="Stale")
+        Ranking.objects.create(train_num=13, train_station_id=5, train_station_order=1, train_station_name="C")
+        csv_path = self._write_csv(
+            "train_num,train_station_id,train_station_order,train_station_name\n"
+            "12,1,1,A\n"
+            "12,2,2,B\n"
+            "13,5,1,C\n"
+            "14,7,1,D\n"
+        )
+
+        output = self._replace_routes(csv_path)
+
+        self.assertIn("Routes replaced: 2", output)
+        self.assertIn("Routes unchanged: 1", output)
+        self.assertIn("Deleted: 3", output)
+        route = Ranking.objects.filter(train_num=12).order_by("train_station_order")
+        self.assertEqual(list(route.values_list("train_station_name", flat=True)), ["A", "B"])
+        self.assertTrue(Ranking.objects.filter(train_num=14).exists())
+
+    def test_replace_routes_keeps_route_with_invalid_row(self):
+        Ranking.objects.create(train_num=15, train_station_id=1, train_station_order=1, train_station_name="A")
+        Ranking.objects.create(train_num=15, train_station_id=2, train_station_order=2, train_station_name="B")
+        csv_path = self._write_csv(
+            "train_num,train_station_id,train_station_order,train_station_name\n"
+            "15,1,1,A\n"
+            "15,2,x,B\n"
+        )
+
+        output = self._replace_routes(csv_path)
+
+        self.assertIn("Routes skipped (invalid rows): 1", output)
+        self.assertEqual(Ranking.objects.filter(train_num=15).count(), 2)
+
+
+class StationsOrderIndexTests(TestCase):
+    def test_train_lookups_use_train_index(self):
+        queries = [
+            Ranking.objects.filter(train_num=101).order_by("train_station_order", "id"),
+            Ranking.objects.filter(train_num__in=[101, 102]).order_by("train_num", "train_station_order", "id"),
+        ]
+
+        for queryset in queries:
+            with self.subTest(sql=str(queryset.query)):
+                self.assertIn("stations_order_train_idx", queryset.explain())
@@ -1,11 +1,16 @@
-import csv
+from contextlib import contextmanager
 from datetime import time
 from pathlib import Path
+from time import monotonic
 
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from imports.ingest import chunked, clean_text, open_csv, to_int
+from imports.manifest import previous_import, record_import, skip_message, source_fingerprint
+from imports.profiling import ProfiledCommandMixin, add_profile_arguments
+from stations.lookup import StationResolver
 from train_times.models import TrainTime
 
 
@@ -23,7 +28,10 @@ REQUIRED_BASE_COLUMNS = (
 )
 
 
-class Command(BaseCommand):
+MANIFEST_COMMAND = "import_train_times"
+
+
+class Command(ProfiledCommandMixin, BaseCommand):
     help = (
         "Import rows into train_times_traintime from a unified CSV file "
         "using deduplicating insert semantics."
@@ -45,8 +53,14 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Reserved for future bulk operations; currently used for progress reporting only.",
+            help="Number of rows checked and inserted per bulk operation (also the progress reporting interval).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-import the file even if the import manifest shows it unchanged.",
         )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
         source_file = options.get("file")
@@ -57,13 +71,29 @@ class Command(BaseCommand):
         if batch_size <= 0:
             raise CommandError("--batch-size must be a positive integer.")
 
-        payloads = self._load_file(source_file, strict=strict)
+        source_path = Path(source_file).expanduser()
+        if not source_path.exists():
+            raise CommandError(f"Source file not found: {source_path}")
 
-        if strict and not dry_run:
-            with transaction.atomic():
-                totals = self._process_rows(payloads, dry_run=dry_run, strict=strict, batch_size=batch_size)
-        else:
-            totals = self._process_rows(payloads, dry_run=dry_run, strict=strict, batch_size=batch_size)
+        fingerprint = source_fingerprint(source_path)
+        if not options["force"]:
+            manifest = previous_import(MANIFEST_COMMAND, fingerprint)
+            if manifest is not None:
+                self.stdout.write(self.style.WARNING(skip_message(source_path, manifest)))
+                return
+        started = monotonic()
+        self.stations = StationResolver()
+
+        with self._open_rows(source_path) as (fieldnames, rows):
+            missing = [col for col in REQUIRED_BASE_COLUMNS if col not in fieldnames]
+            if missing:
+                raise CommandError(f"{source_path}: missing required columns: {', '.join(missing)}")
+
+            if strict and not dry_run:
+                with transaction.atomic():
+                    totals = self._process_rows(rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
+            else:
+                totals = self._process_rows(rows, dry_run=dry_run, strict=strict, batch_size=batch_size)
 
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("Import completed."))
@@ -76,66 +106,40 @@ class Command(BaseCommand):
         if strict and totals["invalid"] > 0:
             raise CommandError("Import failed in --strict mode due to invalid rows.")
 
-    def _load_file(self, file_path, strict):
-        source_path = Path(file_path).expanduser()
-        if not source_path.exists():
-            raise CommandError(f"Source file not found: {source_path}")
+        if not dry_run:
+            record_import(MANIFEST_COMMAND, fingerprint, totals, monotonic() - started)
 
-        rows, fieldnames = self._read_rows(source_path)
-        missing = [col for col in REQUIRED_BASE_COLUMNS if col not in fieldnames]
-        if missing:
-            raise CommandError(f"{source_path}: missing required columns: {', '.join(missing)}")
-
-        payloads = []
-        for index, row in enumerate(rows, start=2):
-            try:
-                payloads.append(self._normalize_row(row, index))
-            except CommandError:
-                if strict:
-                    raise
-                payloads.append({"__invalid__": True, "__row_number__": index})
-        return payloads
-
-    def _read_rows(self, source_path: Path):
+    @contextmanager
+    def _open_rows(self, source_path: Path):
+        # Yields (fieldnames, row iterator). CSV rows are read lazily while the context is open.
         suffix = source_path.suffix.lower()
 
         if suffix == ".csv":
-            encodings = ("utf-8-sig", "cp1255", "iso-8859-8")
-            last_exc = None
-            for enc in encodings:
-                try:
-                    with source_path.open("r", encoding=enc, newline="") as fp:
-                        reader = csv.DictReader(fp)
-                        if reader.fieldnames is None:
-                            raise CommandError(f"{source_path}: missing header row.")
-                        return list(reader), reader.fieldnames
-                except UnicodeDecodeError as exc:
-                    last_exc = exc
-            raise CommandError(
-                f"{source_path}: cannot decode CSV. Tried {encodings}. Last error: {last_exc}"
-            )
+            with open_csv(source_path) as reader:
+                if reader.fieldnames is None:
+                    raise CommandError(f"{source_path}: missing header row.")
+                yield reader.fieldnames, reader
+            return
 
         if suffix in (".xlsx", ".xls"):
-            df = pd.read_excel(source_path)
-            fieldnames = list(df.columns)
-            return df.to_dict(orient="records"), fieldnames
+            with self.profiler.phase("read"):
+                df = pd.read_excel(source_path)
+            yield list(df.columns), iter(df.to_dict(orient="records"))
+            return
 
         raise CommandError("Unsupported file extension. Use .csv, .xlsx, or .xls.")
 
     def _normalize_int(self, value, field_name, row_number):
-        text = "" if value is None else str(value).strip()
-        if text == "":
+        number = to_int(value)
+        if number is None:
             raise CommandError(f"Row {row_number}: {field_name} must be a valid integer.")
-        try:
-            return int(float(text))
-        except (TypeError, ValueError) as exc:
-            raise CommandError(f"Row {row_number}: {field_name} must be a valid integer.") from exc
+        return number
 
-    def _normalize_passenger(self, value):
-        text = "" if value is None else str(value).strip()
-        if text == "" or text.lower() == "nan":
+    def _normalize_passenger(self, value, field_name, row_number):
+        # Blank passenger counts mean nobody got on or off.
+        if not clean_text(value):
             return 0
-        return int(float(text))
+        return self._normalize_int(value, field_name, row_number)
 
     def _normalize_time(self, value, row_number):
         text = "" if value is None else str(value).strip()
@@ -176,43 +180,68 @@ class Command(BaseCommand):
             "Train_number": self._normalize_int(row.get("Train_number"), "Train_number", row_number),
             "event_type": self._normalize_event_type(row.get("event_type"), row_number),
             "planned_time": planned_time,
-            "PassengersAscending": self._normalize_passenger(row.get("PassengersAscending")),
-            "PassengersDescending": self._normalize_passenger(row.get("PassengersDescending")),
+            "PassengersAscending": self._normalize_passenger(
+                row.get("PassengersAscending"), "PassengersAscending", row_number
+            ),
+            "PassengersDescending": self._normalize_passenger(
+                row.get("PassengersDescending"), "PassengersDescending", row_number
+            ),
         }
 
-    def _process_rows(self, payloads, dry_run, strict, batch_size):
+    def _process_rows(self, rows, dry_run, strict, batch_size):
         totals = {"total_rows": 0, "inserted": 0, "existing": 0, "invalid": 0}
+        # Real runs find duplicates of earlier chunks in the table itself, so only one chunk
+        # is held at a time. Dry runs write nothing and must remember every fingerprint instead.
+        seen = set() if dry_run else None
+
+        chunks = self.profiler.iterate("read", chunked(enumerate(rows, start=2), batch_size), count=len)
+        for chunk in chunks:
+            payloads = []
+            with self.profiler.phase("normalize") as phase:
+                for index, row in chunk:
+                    totals["total_rows"] += 1
+                    try:
+                        payloads.append(self._normalize_row(row, index))
+                    except CommandError:
+                        totals["invalid"] += 1
+                        if strict:
+                            raise
+                phase.rows += len(chunk)
+
+            with self.profiler.phase("db write") as phase:
+                self._insert_batch(payloads, seen, totals, dry_run=dry_run)
+                phase.rows += len(payloads)
+
+        return totals
 
+    def _insert_batch(self, payloads, seen, totals, dry_run=False):
+        # seen, when given, holds fingerprints already handled earlier in this file.
+        batch = {}
         for payload in payloads:
-            totals["total_rows"] += 1
-            if payload.get("__invalid__"):
-                totals["invalid"] += 1
-                if strict:
-                    raise CommandError(f"Row {payload['__row_number__']}: invalid data.")
+            row_hash = TrainTime.fingerprint(payload)
+            if row_hash in batch or (seen is not None and row_hash in seen):
+                totals["existing"] += 1
             else:
-                try:
-                    created = self._insert_if_new(payload, dry_run=dry_run)
-                    if created:
-                        totals["inserted"] += 1
-                    else:
-                        totals["existing"] += 1
-                except CommandError as exc:
-                    totals["invalid"] += 1
-                    if strict:
-                        raise
-                    self.stderr.write(self.style.WARNING(str(exc)))
-
-            if totals["total_rows"] % batch_size == 0:
-                self.stdout.write(
-                    f"Processed {totals['total_rows']} rows "
-                    f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
-                )
-
-        return totals
+                batch[row_hash] = payload
+        if seen is not None:
+            seen.update(batch)
+
+        stored = set(TrainTime.objects.filter(row_hash__in=batch).values_list("row_hash", flat=True))
+        new_rows = {row_hash: payload for row_hash, payload in batch.items() if row_hash not in stored}
+        totals["existing"] += len(stored)
+        totals["inserted"] += len(new_rows)
+
+        if new_rows and not dry_run:
+            # ignore_conflicts only matters if another import inserts the same rows concurrently.
+            TrainTime.objects.bulk_create(
+                [
+                    TrainTime(row_hash=row_hash, **payload, **TrainTime.station_keys(payload, self.stations))
+                    for row_hash, payload in new_rows.items()
+                ],
+                ignore_conflicts=True,
+            )
 
-    def _insert_if_new(self, payload, dry_run=False):
-        if dry_run:
-            exists = TrainTime.objects.filter(**payload).exists()
-            return not exists
-        _, created = TrainTime.objects.get_or_create(**payload)
-        return created
+        self.stdout.write(
+            f"Processed {totals['total_rows']} rows "
+            f"(inserted={totals['inserted']}, existing={totals['existing']}, invalid={totals['invalid']})"
+        )
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:05
+
+import hashlib
+
+from django.db import migrations, models
+
+
+FINGERPRINT_FIELDS = (
+    "Year",
+    "Month",
+    "WeekPeriod",
+    "train_station_code",
+    "StationName",
+    "Train_number",
+    "event_type",
+    "planned_time",
+    "PassengersAscending",
+    "PassengersDescending",
+)
+
+
+def backfill_row_hash(apps, schema_editor):
+    # Mirrors TrainTime.fingerprint; historical models do not carry custom methods.
+    TrainTime = apps.get_model("train_times", "TrainTime")
+    seen = set()
+    duplicate_ids = []
+    pending = []
+
+    for row in TrainTime.objects.order_by("id").iterator(chunk_size=2000):
+        parts = [str(getattr(row, name)) for name in FINGERPRINT_FIELDS]
+        row.row_hash = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+        if row.row_hash in seen:
+            # Exact copies of an earlier row carry no information and would break the unique index.
+            duplicate_ids.append(row.id)
+            continue
+        seen.add(row.row_hash)
+        pending.append(row)
+        if len(pending) >= 2000:
+            TrainTime.objects.bulk_update(pending, ["row_hash"])
+            pending = []
+
+    if pending:
+        TrainTime.objects.bulk_update(pending, ["row_hash"])
+    for start in range(0, len(duplicate_ids), 2000):
+        TrainTime.objects.filter(id__in=duplicate_ids[start:start + 2000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_times', '0005_delete_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traintime',
+            name='row_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_row_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='traintime',
+            name='row_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('train_times', '0006_traintime_row_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traintime',
+            index=models.Index(fields=['StationName', 'Year', 'Month', 'event_type'], name='train_time_station_month_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0001_initial'),
+        ('train_times', '0007_traintime_train_time_station_month_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='traintime',
+            name='train_time_station_month_idx',
+        ),
+        migrations.AddField(
+            model_name='traintime',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='stations.station'),
+        ),
+        migrations.AddIndex(
+            model_name='traintime',
+            index=models.Index(fields=['station', 'Year', 'Month', 'event_type'], name='train_time_station_month_idx'),
+        ),
+    ]
@@ -1,16 +1,36 @@
 # train_times/models.py
+import hashlib
+
 from django.db import models
 
-class TrainTime(models.Model):
+from stations.lookup import StationKeyMixin
+
+class TrainTime(StationKeyMixin, models.Model):
     class EventType(models.TextChoices):
         TO_TLV = "to_tlv", "To TLV"
         FROM_TLV = "from_tlv", "From TLV"
 
+    # Every column takes part in deduplication; row_hash is their fingerprint.
+    FINGERPRINT_FIELDS = (
+        "Year",
+        "Month",
+        "WeekPeriod",
+        "train_station_code",
+        "StationName",
+        "Train_number",
+        "event_type",
+        "planned_time",
+        "PassengersAscending",
+        "PassengersDescending",
+    )
+    STATION_KEYS = (("station", "StationName", "train_station_code"),)
+
     Year = models.IntegerField()
     Month = models.IntegerField()
     WeekPeriod = models.CharField(max_length=20)  # e.g. "יום חול", "שישי", "שבת"
     train_station_code = models.IntegerField()
     StationName = models.CharField(max_length=255)
+    station = models.ForeignKey("stations.Station", on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     Train_number = models.IntegerField()
 
     event_type = models.CharField(max_length=10, choices=EventType.choices)
@@ -19,8 +39,22 @@ class TrainTime(models.Model):
     PassengersAscending = models.IntegerField()
     PassengersDescending = models.IntegerField()
 
+    row_hash = models.CharField(max_length=64, unique=True, editable=False)
 
-    def __str__(self):
-        return f"{self.StationName} #{self.Train_number} {self.event_type} {self.planned_time} ({self.Month}/{self.Year})"
+    class Meta:
+        indexes = [
+            # The train times page narrows by station, then year and month, then direction.
+            models.Index(fields=("station", "Year", "Month", "event_type"), name="train_time_station_month_idx"),
+        ]
+
+    @classmethod
+    def fingerprint(cls, values):
+        parts = [str(cls._meta.get_field(name).to_python(values[name])) for name in cls.FINGERPRINT_FIELDS]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
 
+    def save(self, *args, **kwargs):
+        self.row_hash = self.fingerprint({name: getattr(self, name) for name in self.FINGERPRINT_FIELDS})
+        super().save(*args, **kwargs)
 
+    def __str__(self):
+        return f"{self.StationName} #{self.Train_number} {self.event_type} {self.planned_time} ({self.Month}/{self.Year})"
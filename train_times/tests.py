@@ -1,5 +1,6 @@
 import tempfile
 from datetime import time
+from io import StringIO
 from pathlib import Path
 
 from django.core.management import call_command
@@ -64,6 +65,80 @@ class ImportTrainTimesCommandTests(TestCase):
 
         self.assertFalse(TrainTime.objects.filter(StationName="Haifa").exists())
 
+    def test_dry_run_checks_duplicates_in_memory(self):
+        TrainTime.objects.create(
+            Year=2026,
+            Month=1,
+            WeekPeriod="Weekday",
+            train_station_code=1400,
+            StationName="Haifa",
+            Train_number=8,
+            event_type=TrainTime.EventType.TO_TLV,
+            planned_time=time(6, 0, 0),
+            PassengersAscending=3,
+            PassengersDescending=4,
+        )
+        csv_file = self._write_csv(
+            "Year,Month,WeekPeriod,train_station_code,StationName,Train_number,Planned_Train_Arrivel_Time,PassengersAscending,PassengersDescending,event_type\n"
+            "2026,1,Weekday,1400,Haifa,8,06:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Haifa,9,07:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Haifa,9,07:00:00,3,4,to_tlv\n"
+        )
+        out = StringIO()
+
+        with self.assertNumQueries(2):
+            call_command("import_train_times", "--file", str(csv_file), "--dry-run", stdout=out)
+
+        self.assertIn("Inserted: 1", out.getvalue())
+        self.assertIn("Existing (duplicate): 2", out.getvalue())
+
+    def test_reimport_counts_existing_rows_without_duplicating(self):
+        csv_file = self._write_csv(
+            "Year,Month,WeekPeriod,train_station_code,StationName,Train_number,Planned_Train_Arrivel_Time,PassengersAscending,PassengersDescending,event_type\n"
+            "2026,1,Weekday,1400,Haifa,8,06:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Haifa,9,07:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Haifa,10,08:00:00,3,4,to_tlv\n"
+        )
+        call_command("import_train_times", "--file", str(csv_file), "--batch-size", "2", stdout=StringIO())
+        out = StringIO()
+
+        call_command("import_train_times", "--file", str(csv_file), "--batch-size", "2", "--force", stdout=out)
+
+        self.assertIn("Inserted: 0", out.getvalue())
+        self.assertIn("Existing (duplicate): 3", out.getvalue())
+        self.assertEqual(TrainTime.objects.count(), 3)
+
+    def test_duplicates_in_later_chunks_are_found_in_the_table(self):
+        csv_file = self._write_csv(
+            "Year,Month,WeekPeriod,train_station_code,StationName,Train_number,Planned_Train_Arrivel_Time,PassengersAscending,PassengersDescending,event_type\n"
+            "2026,1,Weekday,1400,Lod,8,06:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Lod,8,06:00:00,3,4,to_tlv\n"
+            "2026,1,Weekday,1400,Lod,9,bad,3,4,to_tlv\n"
+        )
+        out = StringIO()
+
+        call_command("import_train_times", "--file", str(csv_file), "--batch-size", "1", stdout=out)
+
+        self.assertIn("Inserted: 1", out.getvalue())
+        self.assertIn("Existing (duplicate): 1", out.getvalue())
+        self.assertIn("Invalid: 1", out.getvalue())
+        self.assertEqual(TrainTime.objects.filter(StationName="Lod").count(), 1)
+
+    def test_cp1255_file_is_decoded(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        tmp.write(
+            (
+                "Year,Month,WeekPeriod,train_station_code,StationName,Train_number,Planned_Train_Arrivel_Time,PassengersAscending,PassengersDescending,event_type\n"
+                "2026,1,יום חול,1400,לוד,8,06:00:00,3,4,to_tlv\n"
+            ).encode("cp1255")
+        )
+        tmp.close()
+        self.addCleanup(Path(tmp.name).unlink, missing_ok=True)
+
+        call_command("import_train_times", "--file", tmp.name, stdout=StringIO())
+
+        self.assertTrue(TrainTime.objects.filter(StationName="לוד", WeekPeriod="יום חול").exists())
+
     def test_missing_input_files_fails(self):
         with self.assertRaises(CommandError):
             call_command("import_train_times")
@@ -76,3 +151,21 @@ class ImportTrainTimesCommandTests(TestCase):
 
         with self.assertRaises(CommandError):
             call_command("import_train_times", "--file", str(csv_file))
+
+
+class TrainTimeIndexTests(TestCase):
+    INDEX = "train_time_station_month_idx"
+
+    def test_page_queries_use_station_month_index(self):
+        station = TrainTime.objects.filter(station_id__in=[1])
+        queries = [
+            station.values_list("Year", flat=True).distinct(),
+            station.filter(Year=2026).values_list("Month", flat=True).distinct(),
+            TrainTime.objects.filter(
+                event_type=TrainTime.EventType.TO_TLV, station_id__in=[1], Year=2026, Month=3
+            ).values("Train_number", "planned_time"),
+        ]
+
+        for queryset in queries:
+            with self.subTest(sql=str(queryset.query)):
+                self.assertIn(self.INDEX, queryset.explain())
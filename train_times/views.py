@@ -1,6 +1,7 @@
 ﻿from django.shortcuts import render
 from train_times.models import TrainTime
 from train_stations_order.models import Ranking
+from stations.lookup import station_ids
 
 def _format_time(value):
     if value is None:
@@ -47,7 +48,8 @@ def train_times(request):
         }
     )
 
-    station_qs = base_qs.filter(StationName=station)
+    ids = station_ids(station)
+    station_qs = base_qs.filter(station_id__in=ids)
     year_options = sorted(
         {
             int(v)
@@ -77,8 +79,8 @@ def train_times(request):
     dep_qs = base_qs.filter(event_type=TrainTime.EventType.FROM_TLV)
 
     if station:
-        arr_qs = arr_qs.filter(StationName=station)
-        dep_qs = dep_qs.filter(StationName=station)
+        arr_qs = arr_qs.filter(station_id__in=ids)
+        dep_qs = dep_qs.filter(station_id__in=ids)
     if year is not None:
         arr_qs = arr_qs.filter(Year=year)
         dep_qs = dep_qs.filter(Year=year)